@@ -1,4 +1,7 @@
 class Animatable:
+    __slots__ = ()  # Lets subclasses such as Vehicle use __slots__
+    static = False  # Never moves or changes: drawn once into Display's cached static layer
+
     def draw(self, screen):
         """Abstract method meant to be implemented by subclasses:
         - Vehicle
@@ -7,4 +10,8 @@ class Animatable:
         - Traffic Signal
         """
         pass
+
+    def get_blit(self) -> tuple:
+        """(image, position) to draw, for Display's batched Surface.blits"""
+        return self.image, (self.x, self.y)
     
\ No newline at end of file
@@ -5,36 +5,71 @@ from Road.Road import Road
 
 
 class Display:
+    """Draws the simulation window in two layers.
+
+    The background and the static animatables (roads and the intersection) are composed once into a
+    cached surface. Every frame, the areas the previous frame's sprites (signals, vehicles, HUD text)
+    covered are restored from it, the sprites are drawn with a single Surface.blits call, and only the
+    rectangles of sprites that appeared, moved, changed image or disappeared are pushed to the window.
+    """
+
     def __init__(self, screen, images: dict):
         self.screen = screen
         self.images = images
         self.font = pygame.font.SysFont(None, 36)
+        self.static_layer = None  # Background and static animatables (see update_static_layer)
+        self.static_key = None    # What static_layer was composed from
+        self.sprite_rects = {}    # (image id, rect) -> rect of every sprite drawn in the previous frame
+        self.text_cache = {}      # HUD text -> rendered surface, for the texts of the previous frame
 
-    def redrawSimulationWindow(self, handler, timer: float, real_time: float, frame_count: int) -> None:
-        """Redraw the entire simulation window with the current state"""
-        self.screen.blit(self.images["background"], (0, 0))
+    def update_static_layer(self, handler) -> bool:
+        """Compose the static layer again if the scenario's static animatables changed. Returns True if it did"""
+        static_animatables = [animatable for animatable in handler.scenario.getAnimatables() if animatable.static]
+        static_key = (id(self.images["background"]), self.screen.get_size(), tuple(map(id, static_animatables)))
+        if static_key == self.static_key:
+            return False
+        self.static_layer = pygame.Surface(self.screen.get_size(), 0, self.screen)
+        self.static_layer.blit(self.images["background"], (0, 0))
+        self.static_layer.blits([animatable.get_blit() for animatable in static_animatables], doreturn=False)
+        self.static_key = static_key
+        return True
 
-        # Draw all animatable components in the scenario
-        handler.drawAnimatables(self.screen)
+    def render_text(self, text: str, rendered: dict) -> pygame.Surface:
+        """HUD text surface, rendered again only if the text changed since the previous frame"""
+        surface = self.text_cache.get(text)
+        if surface is None:
+            surface = self.font.render(text, True, (255, 255, 255))
+        rendered[text] = surface
+        return surface
 
-        # Draw all simulatable components in the scenario (just vehicles for now)
-        handler.drawSimulatables(self.screen)
+    def redrawSimulationWindow(self, handler, timer: float, real_time: float, frame_count: int) -> None:
+        """Redraw the simulation window with the current state, pushing only the changed areas to the window"""
+        full_update = self.update_static_layer(handler)
+        if full_update:
+            self.screen.blit(self.static_layer, (0, 0))
+        else:
+            # Erase the previous frame's sprites
+            self.screen.blits([(self.static_layer, rect, rect) for rect in self.sprite_rects.values()], doreturn=False)
+
+        # Dynamic animatable components in the scenario (signals and vehicles), in the order they were added
+        sprites = [animatable.get_blit() for animatable in handler.scenario.getAnimatables() if not animatable.static]
 
         # HUD: Display virtual timer and real-time elapsed
-        timer_text = self.font.render(f'Timer: {timer:.2f}', True, (255, 255, 255))
-        real_time_text = self.font.render(f'Real Time: {real_time:.2f}', True, (255, 255, 255))
-        frame_count_text = self.font.render(f'Frame: {frame_count}', True, (255, 255, 255))
-        self.screen.blit(timer_text, (10, 10))
-        self.screen.blit(real_time_text, (10, 40))
-        self.screen.blit(frame_count_text, (10, 70))
+        rendered = {}
+        sprites.append((self.render_text(f'Timer: {timer:.2f}', rendered), (10, 10)))
+        sprites.append((self.render_text(f'Real Time: {real_time:.2f}', rendered), (10, 40)))
+        sprites.append((self.render_text(f'Frame: {frame_count}', rendered), (10, 70)))
 
         # FOR DEBUGGING: draw vehicle counts behind intersections
         y_position = 100
         for road in handler.scenario.getRoads():
             vehicle_count = road.get_number_of_vehicles_behind_intersection()
-            vehicle_count_text = self.font.render(f'Vehicles Behind {road.getRoadID()}: {vehicle_count}', True, (255, 255, 255))
-            self.screen.blit(vehicle_count_text, (10, y_position))
+            sprites.append((self.render_text(f'Vehicles Behind {road.getRoadID()}: {vehicle_count}', rendered), (10, y_position)))
             y_position += 30
+        self.text_cache = rendered
+
+        rects = self.screen.blits(sprites)
+        sprite_rects = {(id(image), tuple(rect)): rect for (image, _), rect in zip(sprites, rects)}
 
         # FOR DEBUGGING: draw per-road spawn rectangles and all vehicle rects (keeps visuals in sync)
         # scenario = handler.scenario
@@ -52,5 +87,14 @@ class Display:
         #             sx, sy = SimulationGraphicConfig.LANE_STARTING_POSITIONS[lane_key]
         #             spawn_rect = pygame.Rect(int(sx), int(sy), SimulationGraphicConfig.VEHICLE_WIDTH, SimulationGraphicConfig.VEHICLE_HEIGHT)
         #             pygame.draw.rect(self.screen, (255, 0, 0), spawn_rect, 1)
+        # full_update = True  # The debug rects aren't tracked as sprites
 
-        pygame.display.update()
\ No newline at end of file
+        if full_update:
+            pygame.display.update()
+        else:
+            # A sprite drawn with the same image at the same place left its pixels unchanged; the others
+            # changed their old and new areas (overlapping unchanged sprites were redrawn within those)
+            changed_rects = [rect for key, rect in self.sprite_rects.items() if key not in sprite_rects]
+            changed_rects += [rect for key, rect in sprite_rects.items() if key not in self.sprite_rects]
+            pygame.display.update(changed_rects)
+        self.sprite_rects = sprite_rects
@@ -0,0 +1,184 @@
+from Graphics.SimulationGraphicConfig import SimulationGraphicConfig
+from SimulationToolbox.Scenario import Scenario
+from SimulationToolbox.ScenarioHandler import ScenarioHandler
+from SimulationToolbox.SimulationConfig import SimulationConfig
+from SimulationToolbox.ScenarioSnapshot import restore_snapshot
+from Experiments.ResultCache import get_cache
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import csv
+import hashlib
+import itertools
+import math
+import os
+import random
+import time
+
+# Summary metrics of one run, in results table column order
+SWEEP_METRICS = (
+    "average_waiting_vehicles",
+    "vertical_average_waiting_vehicles",
+    "horizontal_average_waiting_vehicles",
+    "average_vehicle_wait_time",
+    "p50_vehicle_wait_time",
+    "p95_vehicle_wait_time",
+    "p99_vehicle_wait_time",
+    "vehicles",
+    "warmup_time",
+    "virtual_time",
+    "wall_time",
+)
+
+# SimulationConfig values that a run forked from a snapshot still reads while it runs; the others were
+# fixed when the snapshot's scenario was built (road rates and schedules, step length, signal durations, ...)
+SNAPSHOT_FORK_PARAMETERS = (
+    "MIN_GREEN_DURATION",
+    "MAX_GREEN_DURATION",
+    "VERTICAL_ROAD_CAR_THRESHOLD",
+    "HORIZONTAL_ROAD_CAR_THRESHOLD",
+)
+
+def expand_grid(grid: dict, seeds: list) -> list:
+    """Every combination of the grid's parameter values with every seed, as (overrides, seed) pairs"""
+    names = list(grid)
+    points = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        for seed in seeds:
+            points.append((dict(zip(names, values)), seed))
+    return points
+
+def check_snapshot_overrides(names) -> None:
+    """Raise ValueError for overrides that runs forked from a snapshot would silently ignore"""
+    fixed = [name for name in names if name not in SNAPSHOT_FORK_PARAMETERS]
+    if fixed:
+        raise ValueError(f"Runs forked from a snapshot can only vary {', '.join(SNAPSHOT_FORK_PARAMETERS)}, "
+                         f"not {', '.join(fixed)} (fixed when the snapshot's scenario was built)")
+
+def summarize_run(handler: ScenarioHandler, wall_time: float) -> dict:
+    """Summary metrics (see SWEEP_METRICS) of a finished headless run"""
+    spawn_indices, _ = handler.getFinalWaitTimes()
+    summary = {
+        "average_waiting_vehicles": handler.calculateTotalAverageWaitingVehicles(),
+        "vertical_average_waiting_vehicles": handler.calculateVerticalAverageWaitingVehicles(),
+        "horizontal_average_waiting_vehicles": handler.calculateHorizontalAverageWaitingVehicles(),
+        "average_vehicle_wait_time": handler.calculateAverageVehicleWaitingTime(),
+        "vehicles": len(spawn_indices),
+        "warmup_time": handler.metrics.get("warmup_time", 0.0),
+        "virtual_time": handler.metrics["total_virtual_time"],
+        "wall_time": wall_time,
+    }
+    if "wait_statistics" in handler.metrics:
+        wait_summary = handler.metrics["wait_statistics"].get().summary()
+        for percentile in ("p50", "p95", "p99"):
+            summary[f"{percentile}_vehicle_wait_time"] = wait_summary[percentile]
+    else:
+        for percentile in ("p50", "p95", "p99"):
+            summary[f"{percentile}_vehicle_wait_time"] = math.nan
+    return summary
+
+def run_headless(engine: str = "step", stop_virtual_time: float = None, config: SimulationConfig = None) -> ScenarioHandler:
+    """Build a scenario with the given config (default SimulationConfig()) and run it headless with the given engine"""
+    handler = ScenarioHandler(Scenario(SimulationGraphicConfig.load_placeholder_images(), config))
+    if stop_virtual_time is not None:
+        handler.stop_virtual_time = stop_virtual_time
+    if engine == "event":
+        handler.runEventSimulation()
+    else:
+        handler.runHeadlessSimulation()
+    return handler
+
+def run_sweep_point(overrides: dict, seed: int, engine: str = "step", stop_virtual_time: float = None, cache_dir: str = None,
+                    config: SimulationConfig = None, snapshot_path: str = None) -> dict:
+    """Run one headless simulation with the given SimulationConfig overrides (on top of `config`) and seed.
+
+    The overrides go into a config instance of this run only, so pool workers reused for later points
+    are unaffected. `seed` is the run seed (RUN_SEED): every road and lane draws from its own stream
+    derived from it, so all points with the same seed see the same arrivals whichever worker runs them.
+    With a snapshot_path, the run is forked from that ScenarioSnapshot instead of starting empty: the
+    overrides are applied to the snapshot's config, the roads' streams are reseeded with `seed`
+    (scheduled arrivals not yet due are redrawn) and the stepped run continues. Only the values read
+    while running (SNAPSHOT_FORK_PARAMETERS) can differ between forks; overriding one fixed when the
+    scenario was built (traffic intensities, step length, ...) raises ValueError. With a cache_dir, results of identical runs are
+    taken from (and new results added to) the ResultCache there. Returns the results table row.
+    """
+    handler = None
+    controller_params = None
+    if snapshot_path is not None:
+        check_snapshot_overrides(overrides)
+        with open(snapshot_path, "rb") as file:
+            snapshot = file.read()
+        handler = restore_snapshot(snapshot)
+        handler.checkpoint_path = None  # Forks must not overwrite the snapshot they start from
+        for name, value in {"VERBOSE": False, "RUN_SEED": seed, **overrides}.items():
+            handler.config.set(name, value)
+        config = handler.config
+        engine = "step"
+        stop_virtual_time = handler.stop_virtual_time if stop_virtual_time is None else stop_virtual_time
+        controller_params = {"snapshot": hashlib.sha256(snapshot).hexdigest()}
+    else:
+        config = (config if config is not None else SimulationConfig()).copy({"VERBOSE": False, "RUN_SEED": seed, **overrides})
+    cache = get_cache(cache_dir) if cache_dir is not None else None
+    key = cache.get_key(seed, engine, stop_virtual_time, controller_params, config) if cache is not None else None
+    cached = cache.load(key) if cache is not None else None
+    if cached is not None:
+        summary = cached["summary"]
+    else:
+        random.seed(seed)
+        wall_clock_start = time.perf_counter()
+        if handler is not None:
+            handler.scenario.seedRandomStreams(seed)
+            handler.stop_virtual_time = stop_virtual_time
+            handler.resumeHeadlessSimulation()
+        else:
+            handler = run_headless(engine, stop_virtual_time, config)
+        summary = summarize_run(handler, time.perf_counter() - wall_clock_start)
+        if cache is not None:
+            cache.store(key, summary, handler.metrics)
+    return {**overrides, "seed": seed, **summary}
+
+class ParameterSweep:
+    """Headless runs for every combination of a parameter grid and a seed list, fanned out over a
+    process pool. Rows are written to the results table as runs finish, in completion order."""
+
+    def __init__(self, grid: dict, seeds: list, engine: str = "step", stop_virtual_time: float = None, workers: int = None,
+                 cache_dir: str = None, config: SimulationConfig = None, snapshot_path: str = None):
+        self.grid = grid
+        self.seeds = list(seeds)
+        self.engine = engine
+        self.stop_virtual_time = stop_virtual_time
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.cache_dir = cache_dir  # ResultCache directory shared by the workers (None: no caching)
+        self.config = config        # Base config the grid values override (None: SimulationConfig defaults)
+        self.snapshot_path = snapshot_path  # ScenarioSnapshot every run is forked from (None: runs start empty)
+        if snapshot_path is not None:
+            check_snapshot_overrides(grid)
+
+    def get_columns(self) -> list:
+        return [*self.grid, "seed", *SWEEP_METRICS]
+
+    def run(self, results_path: str = None, on_result=None) -> list:
+        """Run all points; each finished row is appended to the CSV at results_path (if given) and
+        passed to on_result(row, finished, total) (if given). Returns the rows in completion order."""
+        points = expand_grid(self.grid, self.seeds)
+        rows = []
+        results_file = open(results_path, "w", newline="") if results_path is not None else None
+        try:
+            writer = None
+            if results_file is not None:
+                writer = csv.DictWriter(results_file, fieldnames=self.get_columns())
+                writer.writeheader()
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(run_sweep_point, overrides, seed, self.engine, self.stop_virtual_time, self.cache_dir, self.config, self.snapshot_path)
+                           for overrides, seed in points]
+                for future in as_completed(futures):
+                    row = future.result()
+                    rows.append(row)
+                    if writer is not None:
+                        writer.writerow(row)
+                        results_file.flush()
+                    if on_result is not None:
+                        on_result(row, len(rows), len(points))
+        finally:
+            if results_file is not None:
+                results_file.close()
+        return rows
@@ -0,0 +1,134 @@
+from Experiments.ParameterSweep import expand_grid, run_sweep_point
+from Graphics.SimulationGraphicConfig import SimulationGraphicConfig
+from SimulationToolbox.Scenario import Scenario
+from SimulationToolbox.ScenarioHandler import ScenarioHandler
+from SimulationToolbox.SimulationConfig import SimulationConfig
+from SimulationToolbox.QueueModelSimulator import QueueModelSimulator
+
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import os
+import numpy as np
+
+# Summary metrics the queue model is calibrated and validated on
+CALIBRATION_METRICS = ("average_waiting_vehicles", "average_vehicle_wait_time")
+
+def run_queue_model_batch(configs: list, replications: int, stop_virtual_time: float = None, base_config: SimulationConfig = None, seed: int = 0) -> dict:
+    """Run `replications` queue model instances of every config in one lock-step batch and return
+    each summary metric (see QueueModelSimulator.get_summaries) as a (configs, replications) array.
+
+    The layout and step length are base_config's (default SimulationConfig()); the configs may differ
+    in everything the queue model reads per instance: signal timings and thresholds, QUEUE_MODEL_*
+    values and the traffic intensity both roads are built with (TRAFFIC_INTENSITIES["medium"], as in
+    Scenario.buildScenario).
+    """
+    base_config = base_config if base_config is not None else SimulationConfig()
+    handler = ScenarioHandler(Scenario(SimulationGraphicConfig.load_placeholder_images(), base_config))
+    handler.scenario.buildScenario()
+    stop_virtual_time = stop_virtual_time if stop_virtual_time is not None else handler.stop_virtual_time
+    instances = [config for config in configs for _ in range(replications)]
+    spawn_probability = np.array([config.TRAFFIC_INTENSITIES["medium"] / base_config.SUBSTEPS for config in instances])
+    spawn_probabilities = {road.getRoadID(): spawn_probability for road in handler.scenario.getRoads()}
+    simulator = QueueModelSimulator(handler.scenario, handler.step_time, spawn_probabilities, instances, np.random.default_rng(seed))
+    simulator.run(stop_virtual_time)
+    return {name: values.reshape(len(configs), replications) for name, values in simulator.get_summaries().items()}
+
+def screen_configurations(grid: dict, replications: int = 10, stop_virtual_time: float = None, config: SimulationConfig = None, seed: int = 0) -> list:
+    """Queue model estimate of every combination of the grid's values (on top of `config`), as rows of
+    the overrides and each summary metric's mean over the replications"""
+    config = config if config is not None else SimulationConfig()
+    points = [overrides for overrides, _ in expand_grid(grid, [None])]
+    summaries = run_queue_model_batch([config.copy(overrides) for overrides in points], replications, stop_virtual_time, config, seed)
+    return [{**overrides, **{name: float(values[index].mean()) for name, values in summaries.items()}} for index, overrides in enumerate(points)]
+
+def run_reference_points(points: list, seeds: list, engine: str = "event", stop_virtual_time: float = None, workers: int = None,
+                         cache_dir: str = None, config: SimulationConfig = None) -> list:
+    """Run every overrides dictionary in `points` on every seed with a microscopic engine in a process
+    pool, and return each point's rows (one per seed, see summarize_run)"""
+    with ProcessPoolExecutor(max_workers=workers if workers is not None else os.cpu_count()) as executor:
+        futures = [[executor.submit(run_sweep_point, overrides, seed, engine, stop_virtual_time, cache_dir, config) for seed in seeds]
+                   for overrides in points]
+        return [[future.result() for future in point_futures] for point_futures in futures]
+
+def get_rank_correlation(a: np.ndarray, b: np.ndarray) -> float:
+    """Spearman rank correlation (ties broken by order)"""
+    if len(a) < 2:
+        return float("nan")
+    rank_a = np.argsort(np.argsort(a)).astype(np.float64)
+    rank_b = np.argsort(np.argsort(b)).astype(np.float64)
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+
+class QueueModelCalibration:
+    """Calibration and validation of the queue model against the microscopic model.
+
+    Every combination of the grid (signal timings, traffic intensity, ...) is run with the event
+    engine (same results as the stepped loop, several times faster) for every seed, in a process pool and optionally through
+    the ResultCache. Every other grid point is used for calibration and the rest for validation. The
+    calibration runs every candidate (QUEUE_MODEL_SATURATION_HEADWAY, QUEUE_MODEL_JAM_SPACING_METERS)
+    pair on the calibration points in one queue model batch and picks the pair with the smallest mean
+    squared relative error of the CALIBRATION_METRICS. The validation reports, for the held-out points,
+    each metric's mean absolute relative error and the rank correlation between the two models, which
+    is what matters when the queue model preselects configurations for the microscopic one.
+    """
+
+    def __init__(self, grid: dict, seeds: list, stop_virtual_time: float = None, workers: int = None, cache_dir: str = None,
+                 config: SimulationConfig = None, replications: int = 20):
+        self.points = [overrides for overrides, _ in expand_grid(grid, [None])]
+        self.seeds = list(seeds)
+        self.stop_virtual_time = stop_virtual_time
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.config = config if config is not None else SimulationConfig()
+        self.replications = replications  # Queue model instances per point (its runs are cheap)
+        self.calibration_points = list(range(0, len(self.points), 2))
+        self.validation_points = list(range(1, len(self.points), 2)) or self.calibration_points
+        self.reference = None  # Metric name -> microscopic mean per point
+
+    def run_reference(self) -> dict:
+        """Microscopic means of the CALIBRATION_METRICS per grid point, over the seeds"""
+        rows = run_reference_points(self.points, self.seeds, "event", self.stop_virtual_time, self.workers, self.cache_dir, self.config)
+        self.reference = {name: np.array([np.mean([row[name] for row in point_rows]) for point_rows in rows]) for name in CALIBRATION_METRICS}
+        return self.reference
+
+    def estimate(self, points: list, parameters: list, seed: int = 0) -> dict:
+        """Queue model means of the CALIBRATION_METRICS, (parameter pairs, points) arrays"""
+        configs = [self.config.copy({**self.points[point], "QUEUE_MODEL_SATURATION_HEADWAY": headway, "QUEUE_MODEL_JAM_SPACING_METERS": spacing})
+                   for headway, spacing in parameters for point in points]
+        summaries = run_queue_model_batch(configs, self.replications, self.stop_virtual_time, self.config, seed)
+        return {name: summaries[name].mean(axis=1).reshape(len(parameters), len(points)) for name in CALIBRATION_METRICS}
+
+    def calibrate(self, headways: list, spacings: list) -> dict:
+        """Best (headway, jam spacing) pair on the calibration points, with every pair's error"""
+        if self.reference is None:
+            self.run_reference()
+        parameters = list(itertools.product(headways, spacings))
+        estimates = self.estimate(self.calibration_points, parameters)
+        errors = np.zeros(len(parameters))
+        for name in CALIBRATION_METRICS:
+            reference = self.reference[name][self.calibration_points]
+            errors += (((estimates[name] - reference) / np.maximum(np.abs(reference), 1e-9)) ** 2).mean(axis=1)
+        errors /= len(CALIBRATION_METRICS)
+        best = int(np.argmin(errors))
+        return {
+            "QUEUE_MODEL_SATURATION_HEADWAY": parameters[best][0],
+            "QUEUE_MODEL_JAM_SPACING_METERS": parameters[best][1],
+            "errors": {parameters[index]: float(error) for index, error in enumerate(errors)},
+        }
+
+    def validate(self, headway: float, spacing: float) -> dict:
+        """Per metric: mean absolute relative error and rank correlation on the validation points, and both models' values"""
+        if self.reference is None:
+            self.run_reference()
+        estimates = self.estimate(self.validation_points, [(headway, spacing)], seed=1)
+        report = {}
+        for name in CALIBRATION_METRICS:
+            reference = self.reference[name][self.validation_points]
+            estimate = estimates[name][0]
+            report[name] = {
+                "mean_relative_error": float(np.mean(np.abs(estimate - reference) / np.maximum(np.abs(reference), 1e-9))),
+                "rank_correlation": get_rank_correlation(estimate, reference),
+                "reference": reference.tolist(),
+                "estimate": estimate.tolist(),
+            }
+        return report
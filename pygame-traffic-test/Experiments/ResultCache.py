@@ -0,0 +1,190 @@
+from Metrics.TimeSeriesStore import TimeSeriesStore
+from Metrics.TripRecords import TripRecords
+from SimulationToolbox.SimulationConfig import SimulationConfig
+
+import hashlib
+import json
+import numpy as np
+import os
+import tempfile
+import time
+
+# Root of the simulation code, hashed into every cache key (see get_code_version)
+CODE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+code_version = None
+open_caches = {}  # Directory -> ResultCache of this process, see get_cache
+
+def get_code_version() -> str:
+    """Hash of every module in the simulation packages, so results are never reused across code changes"""
+    global code_version
+    if code_version is None:
+        digest = hashlib.sha256()
+        for directory, subdirectories, files in sorted(os.walk(CODE_ROOT)):
+            subdirectories[:] = sorted(name for name in subdirectories if not name.startswith((".", "__")))
+            if directory == CODE_ROOT:
+                continue  # Entry point scripts (main.py, sweep.py, ...) don't affect results
+            for name in sorted(files):
+                if name.endswith(".py"):
+                    path = os.path.join(directory, name)
+                    digest.update(os.path.relpath(path, CODE_ROOT).encode())
+                    with open(path, "rb") as file:
+                        digest.update(file.read())
+        code_version = digest.hexdigest()
+    return code_version
+
+def get_cache(directory: str):
+    """This process's ResultCache for `directory`, so runs made one after another (e.g. by a pool worker)
+    share its running size total instead of each walking the directory"""
+    cache = open_caches.get(directory)
+    if cache is None:
+        cache = open_caches[directory] = ResultCache(directory)
+    return cache
+
+def get_effective_config(config: SimulationConfig = None) -> dict:
+    """Every SimulationConfig and SimulationGraphicConfig constant of `config` (default SimulationConfig()),
+    except VERBOSE, which only affects printing"""
+    config = config if config is not None else SimulationConfig()
+    effective = {}
+    for prefix, values in (("SimulationConfig", config.get_values()), ("SimulationGraphicConfig", config.graphics.get_values())):
+        for name, value in values.items():
+            if name != "VERBOSE":
+                effective[f"{prefix}.{name}"] = value
+    return effective
+
+
+class ResultCache:
+    """On-disk cache of headless run results, addressed by a hash of everything that determines them.
+
+    The key covers the full effective config, the seed, the engine and stop time, any controller
+    parameters and the simulation code version. Each entry is one compressed NPZ file holding the run's
+    summary row, trip records and waiting count time series. Hits refresh the file's modification time,
+    which serves as the LRU clock: when the cache grows beyond max_bytes, least recently used entries
+    are deleted first. Entries are written to a temporary file and renamed, so concurrent workers can
+    share one cache directory.
+
+    The cache size is walked once and then kept as a running total, updated by store and prune, so a
+    store only walks the directory when the total goes over max_bytes. Each process only adds its own
+    entries to its total, so with several workers the cache may exceed max_bytes by what the others
+    stored since their last prune.
+    """
+
+    MAX_BYTES = 1024 ** 3  # Default size bound: 1 GiB
+
+    def __init__(self, directory: str, max_bytes: int = None):
+        self.directory = directory
+        self.max_bytes = self.MAX_BYTES if max_bytes is None else max_bytes
+        self.total_size = None  # Running size of all entries in bytes (None: not walked yet)
+        os.makedirs(directory, exist_ok=True)
+
+    def get_key(self, seed: int, engine: str, stop_virtual_time: float = None, controller_params: dict = None,
+                config: SimulationConfig = None) -> str:
+        """Key of a run with the given config (default SimulationConfig())"""
+        config = config if config is not None else SimulationConfig()
+        description = {
+            "config": get_effective_config(config),
+            "seed": seed,
+            "engine": engine,
+            "stop_virtual_time": config.STOP_VIRTUAL_TIME if stop_virtual_time is None else stop_virtual_time,
+            "controller_params": controller_params or {},
+            "code_version": get_code_version(),
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True, default=repr).encode()).hexdigest()
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.npz")
+
+    def load(self, key: str) -> dict | None:
+        """Cached result ({"summary": ..., "trips": ..., "time_series": ...}) or None on a miss"""
+        path = self.get_path(key)
+        try:
+            with np.load(path) as entry:
+                result = {
+                    "summary": json.loads(str(entry["summary"])),
+                    "trips": {name[len("trips."):]: entry[name] for name in entry.files if name.startswith("trips.")},
+                    "time_series": {name[len("time_series."):]: entry[name] for name in entry.files if name.startswith("time_series.")},
+                }
+            os.utime(path)  # Mark as recently used
+        except (FileNotFoundError, OSError, ValueError, KeyError):
+            return None  # Missing, being evicted or truncated: treat as a miss
+        return result
+
+    def store(self, key: str, summary: dict, metrics: dict) -> None:
+        """Cache a finished run: its summary row plus the trip records and time series in `metrics`"""
+        arrays = {"summary": np.array(json.dumps(summary))}
+        trips = metrics.get("trips")
+        if isinstance(trips, TripRecords):
+            for name in trips.COLUMNS:
+                arrays[f"trips.{name}"] = trips.column(name)
+        time_series = metrics.get("time_series")
+        if not isinstance(time_series, TimeSeriesStore):
+            time_series = TimeSeriesStore.from_arrays(metrics["times"], **{name: metrics[name] for name in TimeSeriesStore.WAITING_COUNT_CHANNELS})
+        time_series.flush()
+        times, _, _, mean_values = time_series.read_summary()
+        arrays["time_series.times"] = np.asarray(times)
+        for index, name in enumerate(time_series.channels):
+            arrays[f"time_series.{name}"] = np.asarray(mean_values[:, index])
+
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.total_size is None:
+            self.total_size = self.get_total_size()
+        try:
+            replaced_size = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced_size = 0
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(file_descriptor, "wb") as file:
+            np.savez_compressed(file, **arrays)
+        self.total_size += os.path.getsize(temporary_path) - replaced_size
+        os.replace(temporary_path, path)
+        if self.total_size > self.max_bytes:
+            self.prune(self.max_bytes)
+
+    # ----------------------------------
+    # === INSPECTION AND EVICTION
+    # ----------------------------------
+    def get_entries(self) -> list:
+        """(key, size in bytes, last used time) of every entry, least recently used first"""
+        entries = []
+        for directory, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".npz"):
+                    continue
+                try:
+                    status = os.stat(os.path.join(directory, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((name[:-len(".npz")], status.st_size, status.st_mtime))
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    def get_total_size(self) -> int:
+        return sum(size for _, size, _ in self.get_entries())
+
+    def remove(self, key: str) -> bool:
+        try:
+            os.remove(self.get_path(key))
+        except FileNotFoundError:
+            return False  # Already evicted by another process
+        return True
+
+    def prune(self, max_bytes: int = None, older_than_seconds: float = None) -> int:
+        """Evict least recently used entries until the cache fits in max_bytes, and entries not used
+        for older_than_seconds. Returns the number of entries removed."""
+        entries = self.get_entries()
+        total_size = sum(size for _, size, _ in entries)
+        now = time.time()
+        removed = 0
+        for key, size, last_used in entries:
+            too_big = max_bytes is not None and total_size > max_bytes
+            too_old = older_than_seconds is not None and now - last_used > older_than_seconds
+            if not too_big and not too_old:
+                continue
+            if self.remove(key):
+                removed += 1
+            total_size -= size
+        self.total_size = total_size
+        return removed
+
+    def clear(self) -> int:
+        return self.prune(max_bytes=0)
@@ -0,0 +1,149 @@
+from Experiments.ParameterSweep import SWEEP_METRICS, run_sweep_point
+from Metrics.SteadyStateDetector import get_student_t_quantile_975
+from SimulationToolbox.SimulationConfig import SimulationConfig
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import csv
+import math
+import os
+import random
+
+# Signal timings and thresholds searched by default: name -> (low, high)
+DEFAULT_SEARCH_SPACE = {
+    "MIN_GREEN_DURATION": (2.0, 10.0),
+    "MAX_GREEN_DURATION": (6.0, 20.0),
+    "BOTH_SIGNALS_RED_DURATION": (0.5, 2.0),
+    "VERTICAL_ROAD_CAR_THRESHOLD": (1.0, 10.0),
+    "HORIZONTAL_ROAD_CAR_THRESHOLD": (1.0, 10.0),
+}
+
+def get_mean_confidence_interval(values: list) -> tuple:
+    """Mean and Student-t 95% confidence half-width of a small sample (half-width NaN below two values)"""
+    count = len(values)
+    mean = sum(values) / count
+    if count < 2:
+        return mean, math.nan
+    variance = sum((value - mean) ** 2 for value in values) / (count - 1)
+    return mean, get_student_t_quantile_975(count - 1) * math.sqrt(variance / count)
+
+def sample_candidates(search_space: dict, count: int, rng: random.Random) -> list:
+    """`count` Latin hypercube samples of the search space (every parameter's range is cut into `count`
+    strata and each stratum is used once), as overrides dictionaries. A minimum green sampled above the
+    maximum green is swapped with it."""
+    columns = {}
+    for name, (low, high) in search_space.items():
+        strata = list(range(count))
+        rng.shuffle(strata)
+        columns[name] = [round(low + (high - low) * (stratum + rng.random()) / count, 2) for stratum in strata]
+    candidates = [{name: values[index] for name, values in columns.items()} for index in range(count)]
+    for candidate in candidates:
+        if candidate.get("MIN_GREEN_DURATION", -math.inf) > candidate.get("MAX_GREEN_DURATION", math.inf):
+            candidate["MIN_GREEN_DURATION"], candidate["MAX_GREEN_DURATION"] = candidate["MAX_GREEN_DURATION"], candidate["MIN_GREEN_DURATION"]
+    return candidates
+
+
+class SignalTimingOptimizer:
+    """Successive halving over signal timing candidates with common random numbers.
+
+    Candidates are Latin hypercube samples of the search space plus the base config's own values
+    (candidate 0, the baseline). In each rung, every surviving candidate is run headless on the same
+    first seeds (min_seeds, then eta times more per rung, up to max_seeds), so all candidates see the
+    same arrival streams and their differences aren't sampling noise; only the best 1/eta by mean
+    objective go on. Runs of a candidate on seeds it already ran are kept, so each rung only adds the
+    new seeds. Finally the winner and the baseline are run on all max_seeds seeds, and the winner is
+    reported with a 95% confidence interval of its objective and of its paired difference to the baseline.
+
+    Runs are fanned out over a process pool like ParameterSweep, and can share its ResultCache.
+    """
+
+    def __init__(self, search_space: dict = None, candidates: int = 27, eta: int = 3, min_seeds: int = 2, max_seeds: int = 18,
+                 objective: str = "average_vehicle_wait_time", engine: str = "step", stop_virtual_time: float = None,
+                 workers: int = None, cache_dir: str = None, config: SimulationConfig = None, seed: int = 0):
+        if objective not in SWEEP_METRICS:
+            raise ValueError(f"Unknown objective: {objective} (use one of {', '.join(SWEEP_METRICS)})")
+        self.search_space = search_space if search_space is not None else DEFAULT_SEARCH_SPACE
+        self.eta = eta
+        self.min_seeds = min_seeds
+        self.max_seeds = max_seeds
+        self.objective = objective  # SWEEP_METRICS column to minimize
+        self.engine = engine
+        self.stop_virtual_time = stop_virtual_time
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.cache_dir = cache_dir
+        self.config = config if config is not None else SimulationConfig()
+        self.seeds = list(range(max_seeds))  # Run seeds; every candidate uses a prefix of them
+
+        baseline = {name: self.config.get_values()[name] for name in self.search_space}
+        self.candidates = [baseline, *sample_candidates(self.search_space, candidates, random.Random(seed))]
+        self.rows = {}  # (candidate index, seed) -> results row
+
+    def get_columns(self) -> list:
+        return ["candidate", "rung", *self.search_space, "seed", *SWEEP_METRICS]
+
+    def get_objectives(self, index: int, seeds: list) -> list:
+        return [self.rows[(index, seed)][self.objective] for seed in seeds]
+
+    def evaluate(self, executor: ProcessPoolExecutor, indices: list, seeds: list, rung: int, writer=None) -> None:
+        """Run every candidate in `indices` on every seed it hasn't run yet; rows are collected (and
+        written) as runs finish, in completion order"""
+        points = [(index, seed) for index in indices for seed in seeds if (index, seed) not in self.rows]
+        futures = {executor.submit(run_sweep_point, self.candidates[index], seed, self.engine, self.stop_virtual_time, self.cache_dir, self.config): (index, seed)
+                   for index, seed in points}
+        for future in as_completed(futures):
+            index, seed = futures[future]
+            row = future.result()
+            self.rows[(index, seed)] = row
+            if writer is not None:
+                writer.writerow({"candidate": index, "rung": rung, **row})
+
+    def run(self, results_path: str = None, on_rung=None) -> dict:
+        """Run the search; every run's row is appended to the CSV at results_path (if given) and
+        on_rung(rung, seeds, ranking) is called after each rung with the survivors' (index, mean)
+        pairs, best first. Returns the report (see get_report)."""
+        survivors = list(range(len(self.candidates)))
+        seed_count = min(self.min_seeds, self.max_seeds)
+        rung = 0
+        results_file = open(results_path, "w", newline="") if results_path is not None else None
+        try:
+            writer = None
+            if results_file is not None:
+                writer = csv.DictWriter(results_file, fieldnames=self.get_columns(), extrasaction="ignore")
+                writer.writeheader()
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                while True:
+                    seeds = self.seeds[:seed_count]
+                    self.evaluate(executor, survivors, seeds, rung, writer)
+                    ranking = sorted(((index, sum(self.get_objectives(index, seeds)) / len(seeds)) for index in survivors), key=lambda pair: pair[1])
+                    if on_rung is not None:
+                        on_rung(rung, seeds, ranking)
+                    if len(survivors) == 1 or seed_count == self.max_seeds:
+                        break
+                    survivors = [index for index, _ in ranking[:max(1, len(survivors) // self.eta)]]
+                    seed_count = min(seed_count * self.eta, self.max_seeds)
+                    rung += 1
+                best = ranking[0][0]
+                # The winner and the baseline on all seeds, for the confidence intervals and the paired comparison
+                seeds = self.seeds
+                self.evaluate(executor, [best, 0], seeds, rung + 1, writer)
+        finally:
+            if results_file is not None:
+                results_file.close()
+        return self.get_report(best, seeds)
+
+    def get_report(self, best: int, seeds: list) -> dict:
+        """Winner's overrides, its objective and its paired improvement over the baseline (mean, 95%
+        half-width) on `seeds`, and the simulation effort compared to running every candidate on every seed"""
+        best_objectives = self.get_objectives(best, seeds)
+        baseline_objectives = self.get_objectives(0, seeds)
+        virtual_time = sum(row["virtual_time"] for row in self.rows.values())
+        return {
+            "parameters": self.candidates[best],
+            "candidate": best,
+            "seeds": len(seeds),
+            "objective": get_mean_confidence_interval(best_objectives),
+            "baseline_objective": get_mean_confidence_interval(baseline_objectives),
+            "improvement": get_mean_confidence_interval([baseline - value for baseline, value in zip(baseline_objectives, best_objectives)]),
+            "runs": len(self.rows),
+            "simulated_hours": virtual_time / 3600.0,
+            "exhaustive_runs": len(self.candidates) * self.max_seeds,
+        }
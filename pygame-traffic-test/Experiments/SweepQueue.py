@@ -0,0 +1,222 @@
+from Experiments.ParameterSweep import SWEEP_METRICS, expand_grid, run_sweep_point
+from SimulationToolbox.SimulationConfig import SimulationConfig
+
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+class SweepQueue:
+    """Sweep points and their results in one SQLite file, shared by any number of worker processes.
+
+    Workers claim a pending point with a lease, renew the lease while they run it (see LeaseHeartbeat)
+    and store its results row. Points whose lease expired (the worker crashed or was killed) are handed out again, up to MAX_ATTEMPTS times, so a
+    sweep resumes where it stopped by simply starting workers again. Submitting the same points twice
+    does not duplicate them. Every claim runs in its own write transaction, so workers on several
+    hosts can share the file as long as their shared filesystem supports SQLite file locking.
+    """
+
+    LEASE_SECONDS = 600.0   # A claimed point is handed out again if its lease isn't renewed or completed within this time
+    MAX_ATTEMPTS = 3        # Claims per point before it is marked failed
+
+    def __init__(self, path: str):
+        self.path = path
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        self.connection = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY,
+            parameters TEXT NOT NULL,
+            seed INTEGER NOT NULL,
+            engine TEXT NOT NULL,
+            stop_virtual_time REAL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires REAL,
+            error TEXT,
+            UNIQUE (parameters, seed, engine, stop_virtual_time))""")
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS results (
+            task_id INTEGER PRIMARY KEY REFERENCES tasks (id),
+            row TEXT NOT NULL,
+            worker TEXT NOT NULL,
+            finished_at REAL NOT NULL)""")
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def submit(self, grid: dict, seeds: list, engine: str = "step", stop_virtual_time: float = None) -> int:
+        """Add every grid point and seed combination not already queued; returns the number added"""
+        # A NULL stop time would never be UNIQUE, so the default is stored as -1
+        stop_value = -1.0 if stop_virtual_time is None else stop_virtual_time
+        rows = [(json.dumps(overrides, sort_keys=True), seed, engine, stop_value) for overrides, seed in expand_grid(grid, seeds)]
+        with self.transaction():
+            before = self.connection.total_changes
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO tasks (parameters, seed, engine, stop_virtual_time) VALUES (?, ?, ?, ?)", rows)
+            return self.connection.total_changes - before
+
+    def claim(self, worker: str, lease_seconds: float = None) -> dict | None:
+        """Lease the next pending (or expired) point to `worker`; None when nothing is left to claim"""
+        lease_seconds = self.LEASE_SECONDS if lease_seconds is None else lease_seconds
+        now = time.time()
+        with self.transaction():
+            task = self.connection.execute(
+                """SELECT id, parameters, seed, engine, stop_virtual_time FROM tasks
+                   WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) AND attempts < ?
+                   ORDER BY id LIMIT 1""", (now, self.MAX_ATTEMPTS)).fetchone()
+            if task is None:
+                # Expired leases that used up their attempts are failures
+                self.connection.execute(
+                    "UPDATE tasks SET status = 'failed', error = 'lease expired' WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, self.MAX_ATTEMPTS))
+                return None
+            task_id, parameters, seed, engine, stop_virtual_time = task
+            self.connection.execute(
+                "UPDATE tasks SET status = 'leased', attempts = attempts + 1, lease_owner = ?, lease_expires = ? WHERE id = ?",
+                (worker, now + lease_seconds, task_id))
+        return {
+            "id": task_id,
+            "overrides": json.loads(parameters),
+            "seed": seed,
+            "engine": engine,
+            "stop_virtual_time": None if stop_virtual_time < 0.0 else stop_virtual_time,
+        }
+
+    def renew(self, task_id: int, worker: str, lease_seconds: float = None) -> bool:
+        """Extend `worker`'s lease on a point; False if the worker no longer holds it"""
+        lease_seconds = self.LEASE_SECONDS if lease_seconds is None else lease_seconds
+        with self.transaction():
+            cursor = self.connection.execute("UPDATE tasks SET lease_expires = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                                             (time.time() + lease_seconds, task_id, worker))
+            return cursor.rowcount > 0
+
+    def complete(self, task_id: int, worker: str, row: dict) -> None:
+        """Store a point's results row; a late duplicate (after the lease moved on) is ignored"""
+        with self.transaction():
+            self.connection.execute("INSERT OR IGNORE INTO results (task_id, row, worker, finished_at) VALUES (?, ?, ?, ?)",
+                                    (task_id, json.dumps(row), worker, time.time()))
+            self.connection.execute("UPDATE tasks SET status = 'done', lease_owner = NULL, lease_expires = NULL WHERE id = ?", (task_id,))
+
+    def fail(self, task_id: int, worker: str, error: str) -> None:
+        """Give a point back after an error; it is retried until it has been claimed MAX_ATTEMPTS times"""
+        with self.transaction():
+            self.connection.execute(
+                """UPDATE tasks SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END,
+                   error = ?, lease_owner = NULL, lease_expires = NULL
+                   WHERE id = ? AND status = 'leased' AND lease_owner = ?""",
+                (self.MAX_ATTEMPTS, error, task_id, worker))
+
+    def get_status_counts(self) -> dict:
+        """Number of points per status (pending, leased, done, failed)"""
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        for status, count in self.connection.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def get_results(self) -> list:
+        """Results rows of all finished points, in task order"""
+        return [json.loads(row) for (row,) in self.connection.execute("SELECT row FROM results ORDER BY task_id")]
+
+    def export_csv(self, path: str) -> int:
+        """Write the results table of all finished points to a CSV; returns the number of rows"""
+        rows = self.get_results()
+        parameters = []
+        for row in rows:
+            parameters.extend(name for name in row if name not in parameters and name != "seed" and name not in SWEEP_METRICS)
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=[*parameters, "seed", *SWEEP_METRICS])
+            writer.writeheader()
+            writer.writerows(rows)
+        return len(rows)
+
+    def transaction(self):
+        return SweepQueueTransaction(self.connection)
+
+
+class SweepQueueTransaction:
+    """BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error): takes the write lock up front, so two workers
+    can't both read the same pending point before either marks it leased"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.connection.execute("ROLLBACK" if exception_type is not None else "COMMIT")
+        return False
+
+
+class LeaseHeartbeat:
+    """Renews a worker's lease on a point from a background thread, every third of the lease time, for
+    as long as the worker runs it: a run may take longer than the lease, but a point is only handed out
+    again once its worker stopped renewing (crashed or was killed)"""
+
+    def __init__(self, path: str, task_id: int, worker: str, lease_seconds: float = None):
+        self.path = path
+        self.task_id = task_id
+        self.worker = worker
+        self.lease_seconds = SweepQueue.LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.stopped.set()
+        self.thread.join()
+        return False
+
+    def run(self) -> None:
+        # SQLite connections can't be shared between threads: the heartbeat opens its own
+        queue = SweepQueue(self.path)
+        try:
+            while not self.stopped.wait(self.lease_seconds / 3):
+                if not queue.renew(self.task_id, self.worker, self.lease_seconds):
+                    return
+        finally:
+            queue.close()
+
+
+def get_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def run_queue_worker(path: str, lease_seconds: float = None, cache_dir: str = None, config: SimulationConfig = None,
+                     snapshot_path: str = None) -> int:
+    """Claim and run points from the queue at `path` until none is left; returns the number completed.
+    Points override `config` (default SimulationConfig()), or fork from the snapshot at snapshot_path (see
+    run_sweep_point); workers sharing a queue should use the same ones."""
+    queue = SweepQueue(path)
+    worker = get_worker_name()
+    completed = 0
+    try:
+        while True:
+            task = queue.claim(worker, lease_seconds)
+            if task is None:
+                return completed
+            try:
+                with LeaseHeartbeat(path, task["id"], worker, lease_seconds):
+                    row = run_sweep_point(task["overrides"], task["seed"], task["engine"], task["stop_virtual_time"], cache_dir, config, snapshot_path)
+            except Exception as error:
+                queue.fail(task["id"], worker, repr(error))
+                continue
+            queue.complete(task["id"], worker, row)
+            completed += 1
+    finally:
+        queue.close()
+
+def run_queue_workers(path: str, workers: int = None, lease_seconds: float = None, cache_dir: str = None,
+                      config: SimulationConfig = None, snapshot_path: str = None) -> int:
+    """Run `workers` local worker processes (default: all cores) on the queue; returns the points completed"""
+    workers = workers if workers is not None else os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_queue_worker, path, lease_seconds, cache_dir, config, snapshot_path) for _ in range(workers)]
+        return sum(future.result() for future in futures)
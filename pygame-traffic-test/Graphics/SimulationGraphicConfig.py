@@ -1,6 +1,12 @@
+from SimulationToolbox.InstanceConfig import InstanceConfig
+
 import pygame
 
-class SimulationGraphicConfig:
+class SimulationGraphicConfig(InstanceConfig):
+    """Screen layout and asset constants; instances override them per scenario (see InstanceConfig).
+    Derived constants (LANE_STARTING_POSITIONS, STOP_LINE_POSITIONS, ...) are not recomputed when the
+    constants they were derived from are overridden; override them directly."""
+
     # Screen Dimensions
     SCREEN_WIDTH = 1280
     SCREEN_HEIGHT = 720
@@ -32,6 +38,12 @@ class SimulationGraphicConfig:
         images["signal_red"] = pygame.image.load(SimulationGraphicConfig.SIGNAL_RED_PATH)
         return images
 
+    def load_placeholder_images():
+        """Image dictionary with the same keys as load_images() but no surfaces, for headless runs"""
+        keys = ["car_west", "car_north", "background", "road_vertical", "road_horizontal",
+                "intersection", "signal_green", "signal_yellow", "signal_red"]
+        return {key: None for key in keys}
+
     # Road Constants
     ROAD_WIDTH = 160
     ROAD_VERTICAL_LENGTH = SCREEN_HEIGHT
@@ -2,6 +2,8 @@ from Animation.Animatable import Animatable
 from Graphics.SimulationGraphicConfig import SimulationGraphicConfig
 
 class Intersection(Animatable):
+    static = True  # Part of Display's cached static layer
+
     def __init__(self, x, y, image):
         self.x = x
         self.y = y
@@ -0,0 +1,150 @@
+import math
+import numpy as np
+
+def get_student_t_quantile_975(degrees_of_freedom: int) -> float:
+    """97.5% quantile of Student's t distribution (Cornish-Fisher expansion, within 0.001 for 3+ degrees of freedom)"""
+    z = 1.959963984540054
+    df = float(degrees_of_freedom)
+    return (z + (z ** 3 + z) / (4 * df) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+
+def get_mser_truncation(values: np.ndarray) -> int:
+    """MSER truncation point: the number of leading values d (at most half of them) minimizing the
+    squared standard error of the mean of the rest, sum((Y_i - mean_d)^2) / (n - d)^2.
+    Returns len(values) when the minimum falls in the second half, i.e. the series isn't stationary yet."""
+    n = len(values)
+    if n < 2:
+        return n
+    # Tail sums of Y and Y^2 give every candidate's sum of squared deviations in one pass
+    tail_sums = np.cumsum(values[::-1])[::-1]
+    tail_square_sums = np.cumsum((values * values)[::-1])[::-1]
+    tail_counts = np.arange(n, 0, -1, dtype=np.float64)
+    squared_deviations = np.maximum(tail_square_sums - tail_sums * tail_sums / tail_counts, 0.0)
+    statistics = squared_deviations / (tail_counts * tail_counts)
+    truncation = int(np.argmin(statistics[:n - 1]))  # The last candidate (one value left) is meaningless
+    return truncation if truncation <= n // 2 else n
+
+
+class SteadyStateDetector:
+    """Warm-up detection and batch-means stopping rule for a run of equal fixed steps.
+
+    The run is cut into batches of batch_steps steps. Each batch records its time-average number of
+    waiting vehicles and the sum and count of the wait times of vehicles leaving during it. At every
+    batch end (once min_virtual_time has passed), the warm-up is the larger MSER truncation of the two
+    batch series; the remaining batches are regrouped into batch_count equal batch means, and the run
+    has converged once the 95% confidence interval of both means (average waiting vehicles and average
+    vehicle wait time) is narrower than relative_precision of the mean on either side.
+    """
+
+    def __init__(self, step_time: float, batch_seconds: float, batch_count: int, relative_precision: float, min_virtual_time: float):
+        self.step_time = step_time
+        self.batch_steps = max(1, round(batch_seconds / step_time))
+        self.batch_count = batch_count
+        self.relative_precision = relative_precision
+        self.min_batches = math.ceil(min_virtual_time / (self.batch_steps * step_time))
+
+        self.batch_integrals = []   # (total, vertical, horizontal) waiting count integral of each finished batch
+        self.batch_wait_sums = []   # Sum of the wait times of vehicles leaving in each batch
+        self.batch_wait_counts = [] # Number of vehicles leaving in each batch
+        self.current_integrals = [0.0, 0.0, 0.0]
+        self.current_steps = 0
+
+        self.warmup_batches = 0
+        self.converged = False
+        self.confidence_intervals = {}  # Metric name -> (mean, 95% half-width) at the last check
+
+    @staticmethod
+    def from_config(config, step_time: float) -> "SteadyStateDetector":
+        return SteadyStateDetector(step_time, config.STEADY_STATE_BATCH_SECONDS, config.STEADY_STATE_BATCHES,
+                                   config.STEADY_STATE_RELATIVE_PRECISION, config.STEADY_STATE_MIN_VIRTUAL_TIME)
+
+    def add_step(self, waiting_count: int, vertical_waiting_count: int, horizontal_waiting_count: int) -> None:
+        """Record one fixed step's waiting counts"""
+        self.close_full_batch()
+        integrals = self.current_integrals
+        integrals[0] += waiting_count * self.step_time
+        integrals[1] += vertical_waiting_count * self.step_time
+        integrals[2] += horizontal_waiting_count * self.step_time
+        self.current_steps += 1
+
+    def add_wait_time(self, exit_time: float, wait_time: float) -> None:
+        """Record the wait time of a vehicle that left in the step ending at exit_time"""
+        batch = max(round(exit_time / self.step_time) - 1, 0) // self.batch_steps
+        while len(self.batch_wait_sums) <= batch:
+            self.batch_wait_sums.append(0.0)
+            self.batch_wait_counts.append(0)
+        self.batch_wait_sums[batch] += wait_time
+        self.batch_wait_counts[batch] += 1
+
+    def close_full_batch(self) -> bool:
+        """Finish the current batch if all its steps (and so all its vehicle exits) are recorded, and
+        check for convergence once min_virtual_time has passed. Returns converged."""
+        if self.current_steps == self.batch_steps:
+            self.batch_integrals.append(tuple(self.current_integrals))
+            self.current_integrals = [0.0, 0.0, 0.0]
+            self.current_steps = 0
+            if len(self.batch_integrals) >= self.min_batches:
+                self.check()
+        return self.converged
+
+    def get_steps_to_batch_end(self) -> int:
+        """Steps left in the current batch: adaptive steps must end on batch ends, where convergence is checked"""
+        return self.batch_steps - self.current_steps
+
+    def check(self, warmup_batches: int = None) -> bool:
+        """Update warmup_batches (by MSER unless given), confidence_intervals and converged from the finished batches"""
+        batches = len(self.batch_integrals)
+        waiting = np.array([integrals[0] for integrals in self.batch_integrals]) / (self.batch_steps * self.step_time)
+        wait_sums = np.zeros(batches)
+        wait_counts = np.zeros(batches)
+        recorded = min(batches, len(self.batch_wait_sums))
+        wait_sums[:recorded] = self.batch_wait_sums[:recorded]
+        wait_counts[:recorded] = self.batch_wait_counts[:recorded]
+
+        # Batches nobody left in have no mean wait time: MSER runs over the others, mapped back to batch indices
+        if warmup_batches is None:
+            wait_batches = np.flatnonzero(wait_counts)
+            wait_truncation = get_mser_truncation(wait_sums[wait_batches] / wait_counts[wait_batches])
+            wait_warmup = wait_batches[wait_truncation] if wait_truncation < len(wait_batches) else batches
+            warmup_batches = max(get_mser_truncation(waiting), int(wait_warmup))
+        self.warmup_batches = warmup_batches
+
+        self.converged = False
+        self.confidence_intervals = {}
+        group_size = (batches - self.warmup_batches) // self.batch_count
+        if self.warmup_batches >= batches or group_size == 0:
+            return False
+        # Equal groups of consecutive batches, the leftover batches at the start joining the warm-up
+        first = batches - group_size * self.batch_count
+        groups = {
+            "average_waiting_vehicles": waiting[first:].reshape(self.batch_count, group_size).mean(axis=1),
+            "average_vehicle_wait_time": (wait_sums[first:].reshape(self.batch_count, group_size).sum(axis=1)
+                                          / np.maximum(wait_counts[first:].reshape(self.batch_count, group_size).sum(axis=1), 1)),
+        }
+        t_quantile = get_student_t_quantile_975(self.batch_count - 1)
+        self.converged = True
+        for name, means in groups.items():
+            mean = float(means.mean())
+            half_width = t_quantile * float(means.std(ddof=1)) / math.sqrt(self.batch_count)
+            self.confidence_intervals[name] = (mean, half_width)
+            if half_width > self.relative_precision * abs(mean):
+                self.converged = False
+        return self.converged
+
+    def get_warmup_time(self) -> float:
+        return self.warmup_batches * self.batch_steps * self.step_time
+
+    def get_warmup_integrals(self) -> tuple:
+        """(total, vertical, horizontal) waiting count integrals over the warm-up batches"""
+        warmup_integrals = self.batch_integrals[:self.warmup_batches]
+        return tuple(sum(integrals[index] for integrals in warmup_integrals) for index in range(3))
+
+    def finish(self) -> None:
+        """Final warm-up and confidence intervals at the end of the run. If no warm-up end was found
+        (the series never settled), nothing is truncated and the intervals cover the whole run."""
+        if not self.batch_integrals:
+            return
+        self.check()
+        if self.warmup_batches >= len(self.batch_integrals):
+            self.check(0)
+            self.converged = False
@@ -0,0 +1,282 @@
+from SimulationToolbox.SimulationConfig import SimulationConfig
+
+import numpy as np
+import os
+import tempfile
+
+class TimeSeriesStore:
+    """Time series of several channels sampled at the same times, kept in typed arrays.
+
+    Samples are appended one at a time to a small Python buffer and written to the policy's storage in
+    chunks of SimulationConfig.TIME_SERIES_CHUNK samples:
+    - "memory": growable arrays holding every sample (unbounded, exact)
+    - "ring": the last TIME_SERIES_CAPACITY samples only
+    - "pyramid": min/max/mean downsampling, older samples are summarized at coarser resolution
+    - "memmap": every sample, spilled to a file on disk and read back through a memory map
+    Use TimeSeriesStore.create() to build the store for a policy.
+    """
+
+    WAITING_COUNT_CHANNELS = ("waiting_counts", "vertical_waiting_counts", "horizontal_waiting_counts")
+
+    def __init__(self, channels: tuple):
+        self.channels = tuple(channels)
+        self.channel_index = {name: index for index, name in enumerate(self.channels)}
+        self.chunk_size = SimulationConfig.TIME_SERIES_CHUNK
+        self.pending = []  # Samples not yet written: (time, value per channel)
+        self.sample_count = 0  # Samples appended so far, including those no longer kept
+
+    @staticmethod
+    def create(channels: tuple, policy: str = None, config: SimulationConfig = None) -> "TimeSeriesStore":
+        """Store for the given policy (default config.TIME_SERIES_POLICY), sized by `config`
+        (a SimulationConfig instance, default the SimulationConfig class values)"""
+        config = SimulationConfig if config is None else config
+        policy = config.TIME_SERIES_POLICY if policy is None else policy
+        if policy == "memory":
+            store = GrowableTimeSeries(channels)
+        elif policy == "ring":
+            store = RingBufferTimeSeries(channels, config.TIME_SERIES_CAPACITY)
+        elif policy == "pyramid":
+            store = PyramidTimeSeries(channels, config.TIME_SERIES_CAPACITY)
+        elif policy == "memmap":
+            store = MemmapTimeSeries(channels, config.TIME_SERIES_SPILL_PATH)
+        else:
+            raise ValueError(f"Unknown time series policy: {policy}")
+        store.chunk_size = config.TIME_SERIES_CHUNK
+        return store
+
+    @staticmethod
+    def from_arrays(times, **series) -> "TimeSeriesStore":
+        """In-memory store holding already recorded series (e.g. the lists of the event engine)"""
+        store = GrowableTimeSeries(tuple(series))
+        if len(times) > 0:
+            store.write_chunk(np.asarray(times, dtype=np.float64),
+                              np.column_stack([np.asarray(values, dtype=np.float64) for values in series.values()]))
+            store.sample_count = len(times)
+        return store
+
+    def __len__(self) -> int:
+        return self.sample_count
+
+    def append(self, time: float, values: tuple) -> None:
+        """Add one sample: the time and one value per channel, in channel order"""
+        self.pending.append((time, *values))
+        self.sample_count += 1
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered samples to storage"""
+        if not self.pending:
+            return
+        samples = np.array(self.pending, dtype=np.float64)
+        self.pending.clear()
+        self.write_chunk(samples[:, 0], samples[:, 1:])
+
+    def write_chunk(self, times: np.ndarray, values: np.ndarray) -> None:
+        """Store samples: times has shape (n,), values (n, channels)"""
+        raise NotImplementedError
+
+    def read_summary(self) -> tuple:
+        """Stored times (n,) and min, max and mean values (each (n, channels)) in time order.
+        Policies keeping raw samples return the same array three times."""
+        raise NotImplementedError
+
+    def get(self, name: str) -> tuple:
+        """Times and values (mean values for summarized samples) of one channel"""
+        self.flush()
+        times, _, _, mean_values = self.read_summary()
+        return times, mean_values[:, self.channel_index[name]]
+
+    def get_plot_series(self, name: str, max_points: int = None) -> tuple:
+        """Times, min, max and mean of one channel, reduced to at most max_points blocks
+        (default SimulationConfig.TIME_SERIES_PLOT_POINTS) so plots never draw every sample"""
+        max_points = SimulationConfig.TIME_SERIES_PLOT_POINTS if max_points is None else max_points
+        self.flush()
+        times, min_values, max_values, mean_values = self.read_summary()
+        channel = self.channel_index[name]
+        min_values, max_values, mean_values = min_values[:, channel], max_values[:, channel], mean_values[:, channel]
+        if len(times) <= max_points:
+            return np.asarray(times), np.asarray(min_values), np.asarray(max_values), np.asarray(mean_values)
+        block_size = -(-len(times) // max_points)
+        starts = np.arange(0, len(times), block_size)
+        block_lengths = np.diff(np.append(starts, len(times)))
+        return (np.asarray(times[starts]),
+                np.minimum.reduceat(min_values, starts),
+                np.maximum.reduceat(max_values, starts),
+                np.add.reduceat(mean_values, starts) / block_lengths)
+
+    def close(self) -> None:
+        """Release storage held outside the process memory (spill files)"""
+        pass
+
+
+class GrowableTimeSeries(TimeSeriesStore):
+    """Every sample in arrays that double in capacity when full"""
+
+    def __init__(self, channels: tuple, capacity: int = 1024):
+        super().__init__(channels)
+        self.size = 0
+        self.times = np.empty(capacity, dtype=np.float64)
+        self.values = np.empty((capacity, len(self.channels)), dtype=np.float64)
+
+    def write_chunk(self, times: np.ndarray, values: np.ndarray) -> None:
+        new_size = self.size + len(times)
+        if new_size > len(self.times):
+            capacity = max(new_size, 2 * len(self.times))
+            self.times = np.resize(self.times, capacity)
+            self.values = np.resize(self.values, (capacity, len(self.channels)))
+        self.times[self.size:new_size] = times
+        self.values[self.size:new_size] = values
+        self.size = new_size
+
+    def read_summary(self) -> tuple:
+        values = self.values[:self.size]
+        return self.times[:self.size], values, values, values
+
+
+class RingBufferTimeSeries(TimeSeriesStore):
+    """The most recent `capacity` samples; older samples are overwritten"""
+
+    def __init__(self, channels: tuple, capacity: int):
+        super().__init__(channels)
+        self.capacity = capacity
+        self.size = 0
+        self.start = 0  # Index of the oldest stored sample
+        self.times = np.empty(capacity, dtype=np.float64)
+        self.values = np.empty((capacity, len(self.channels)), dtype=np.float64)
+
+    def write_chunk(self, times: np.ndarray, values: np.ndarray) -> None:
+        if len(times) >= self.capacity:
+            # Only the newest samples survive
+            self.times[:] = times[-self.capacity:]
+            self.values[:] = values[-self.capacity:]
+            self.size = self.capacity
+            self.start = 0
+            return
+        end = (self.start + self.size) % self.capacity
+        indices = (end + np.arange(len(times))) % self.capacity
+        self.times[indices] = times
+        self.values[indices] = values
+        overflow = max(0, self.size + len(times) - self.capacity)
+        self.size = min(self.capacity, self.size + len(times))
+        self.start = (self.start + overflow) % self.capacity
+
+    def read_summary(self) -> tuple:
+        order = (self.start + np.arange(self.size)) % self.capacity
+        values = self.values[order]
+        return self.times[order], values, values, values
+
+
+class PyramidTimeSeries(TimeSeriesStore):
+    """Min/max/mean downsampling pyramid with at most `capacity` entries per level.
+
+    Level 0 holds raw samples. When a level is full, its older half is merged pairwise into the next
+    level, whose entries each summarize twice as many samples. Older parts of the run are thus kept at
+    coarser resolution, and memory grows only with the logarithm of the run length.
+    """
+
+    def __init__(self, channels: tuple, capacity: int):
+        super().__init__(channels)
+        if capacity < 4 or capacity % 4 != 0:
+            raise ValueError(f"Pyramid level capacity must be a positive multiple of 4, got {capacity}")
+        self.capacity = capacity
+        self.levels = []
+        self.add_level()
+
+    def add_level(self) -> None:
+        channel_count = len(self.channels)
+        self.levels.append({
+            "size": 0,
+            "times": np.empty(self.capacity, dtype=np.float64),     # Time of each entry's first sample
+            "min": np.empty((self.capacity, channel_count), dtype=np.float64),
+            "max": np.empty((self.capacity, channel_count), dtype=np.float64),
+            "mean": np.empty((self.capacity, channel_count), dtype=np.float64),
+        })
+
+    def write_chunk(self, times: np.ndarray, values: np.ndarray) -> None:
+        self.write_level(0, times, values, values, values)
+
+    def write_level(self, level_index: int, times, min_values, max_values, mean_values) -> None:
+        if level_index == len(self.levels):
+            self.add_level()
+        level = self.levels[level_index]
+        written = 0
+        while written < len(times):
+            if level["size"] == self.capacity:
+                self.merge_older_half(level_index)
+            count = min(len(times) - written, self.capacity - level["size"])
+            target = slice(level["size"], level["size"] + count)
+            source = slice(written, written + count)
+            level["times"][target] = times[source]
+            level["min"][target] = min_values[source]
+            level["max"][target] = max_values[source]
+            level["mean"][target] = mean_values[source]
+            level["size"] += count
+            written += count
+
+    def merge_older_half(self, level_index: int) -> None:
+        """Merge the older half of a full level pairwise into the next level"""
+        level = self.levels[level_index]
+        half = self.capacity // 2
+        self.write_level(level_index + 1,
+                         level["times"][0:half:2].copy(),
+                         np.minimum(level["min"][0:half:2], level["min"][1:half:2]),
+                         np.maximum(level["max"][0:half:2], level["max"][1:half:2]),
+                         (level["mean"][0:half:2] + level["mean"][1:half:2]) / 2.0)
+        for key in ("times", "min", "max", "mean"):
+            level[key][:half] = level[key][half:]
+        level["size"] = half
+
+    def read_summary(self) -> tuple:
+        # Higher levels hold older samples
+        levels = [level for level in reversed(self.levels) if level["size"] > 0]
+        if not levels:
+            empty = np.empty((0, len(self.channels)))
+            return np.empty(0), empty, empty, empty
+        return tuple(np.concatenate([level[key][:level["size"]] for level in levels]) for key in ("times", "min", "max", "mean"))
+
+
+class MemmapTimeSeries(TimeSeriesStore):
+    """Every sample, appended to a binary file (a temporary file if no path is given) and read back
+    through a read-only memory map, so only the pages being read are loaded"""
+
+    def __init__(self, channels: tuple, path: str = None):
+        super().__init__(channels)
+        self.path = path
+        self.file = tempfile.TemporaryFile() if path is None else open(path, "w+b")
+        self.size = 0
+
+    def __getstate__(self) -> dict:
+        """Pickled (e.g. in a ScenarioSnapshot) with the spilled samples, since the file can't be"""
+        state = self.__dict__.copy()
+        del state["file"]
+        self.file.flush()
+        self.file.seek(0)
+        state["spilled"] = self.file.read(self.size * (len(self.channels) + 1) * 8)
+        self.file.seek(0, os.SEEK_END)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """Restored into a temporary file of its own (next to the original's path, if it had one): the
+        original store, other restored copies or pool workers may still be using that path"""
+        spilled = state.pop("spilled")
+        self.__dict__.update(state)
+        self.file = tempfile.TemporaryFile() if self.path is None else tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(self.path)))
+        self.path = None
+        self.file.write(spilled)
+
+    def write_chunk(self, times: np.ndarray, values: np.ndarray) -> None:
+        self.file.write(np.column_stack((times, values)).astype(np.float64).tobytes())
+        self.size += len(times)
+
+    def read_summary(self) -> tuple:
+        if self.size == 0:
+            empty = np.empty((0, len(self.channels)))
+            return np.empty(0), empty, empty, empty
+        self.file.flush()
+        samples = np.memmap(self.file, dtype=np.float64, mode="r", shape=(self.size, len(self.channels) + 1))
+        values = samples[:, 1:]
+        return samples[:, 0], values, values, values
+
+    def close(self) -> None:
+        self.file.close()
@@ -0,0 +1,120 @@
+from SimulationToolbox.SimulationConfig import SimulationConfig
+
+import csv
+import numpy as np
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+class TripRecords:
+    """One row per finished vehicle trip, stored column by column in growable typed arrays.
+
+    Rows are appended when a vehicle leaves the scenario (or when the run ends), so they are in
+    exit order, the same order as the old final_wait_times list. Roads and lanes are stored as
+    small integer codes into roads (the run config's vertical and horizontal road ids) and LANES. Times are virtual seconds; stop_line_time is NaN for
+    vehicles that never crossed their stop line and exit_time is NaN for vehicles still on screen
+    when the run ended.
+    """
+
+    LANES = ("left_lane", "right_lane")
+    COLUMNS = {
+        "vehicle_id": np.int64,
+        "spawn_index": np.int64,
+        "road": np.int8,
+        "lane": np.int8,
+        "spawn_time": np.float64,
+        "stop_line_time": np.float64,
+        "exit_time": np.float64,
+        "total_wait": np.float64,
+        "num_stops": np.int32,
+    }
+
+    def __init__(self, config: SimulationConfig = None, capacity: int = 1024):
+        config = config if config is not None else SimulationConfig()
+        self.roads = (config.ROAD_IDS["Vertical Road"], config.ROAD_IDS["Horizontal Road"])
+        self.size = 0
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self.road_codes = {road_id: code for code, road_id in enumerate(self.roads)}
+        self.lane_codes = {lane_id: code for code, lane_id in enumerate(self.LANES)}
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, vehicle, exit_time: float) -> None:
+        """Record the trip of a vehicle leaving the scenario (exit_time NaN if it is still on screen)"""
+        if self.size == len(self.columns["vehicle_id"]):
+            self.grow()
+        row = self.size
+        columns = self.columns
+        columns["vehicle_id"][row] = vehicle.vehicle_id
+        columns["spawn_index"][row] = vehicle.spawn_index
+        columns["road"][row] = self.road_codes[vehicle.road_id]
+        columns["lane"][row] = self.lane_codes[vehicle.lane_id]
+        columns["spawn_time"][row] = vehicle.spawn_time
+        columns["stop_line_time"][row] = vehicle.stop_line_time
+        columns["exit_time"][row] = exit_time
+        columns["total_wait"][row] = vehicle.wait_time
+        columns["num_stops"][row] = vehicle.stop_count
+        self.size += 1
+
+    def grow(self) -> None:
+        """Double the capacity of every column"""
+        capacity = 2 * len(self.columns["vehicle_id"])
+        for name, column in self.columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def column(self, name: str) -> np.ndarray:
+        """View of the recorded values of one column"""
+        return self.columns[name][:self.size]
+
+    def get_final_wait_times(self) -> list:
+        """(spawn index, total wait) per trip in exit order, the format of metrics["final_wait_times"]"""
+        return list(zip(self.column("spawn_index").tolist(), self.column("total_wait").tolist()))
+
+    # ----------------------------------
+    # === EXPORT
+    # ----------------------------------
+    def save(self, path: str) -> None:
+        """Export to NPZ, CSV or Parquet, chosen by the file extension"""
+        if path.endswith(".npz"):
+            self.save_npz(path)
+        elif path.endswith(".csv"):
+            self.save_csv(path)
+        elif path.endswith(".parquet"):
+            self.save_parquet(path)
+        else:
+            raise ValueError(f"Unsupported trip record format: {path} (use .npz, .csv or .parquet)")
+
+    def save_npz(self, path: str) -> None:
+        """Columns as arrays plus the road and lane code tables"""
+        arrays = {name: self.column(name) for name in self.COLUMNS}
+        np.savez_compressed(path, road_ids=np.array(self.roads), lane_ids=np.array(self.LANES), **arrays)
+
+    def save_csv(self, path: str) -> None:
+        """One line per trip, with road and lane written out as ids"""
+        roads = np.array(self.roads)[self.column("road")]
+        lanes = np.array(self.LANES)[self.column("lane")]
+        columns = [roads if name == "road" else lanes if name == "lane" else self.column(name) for name in self.COLUMNS]
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(self.COLUMNS)
+            writer.writerows(zip(*(column.tolist() for column in columns)))
+
+    def save_parquet(self, path: str) -> None:
+        """Parquet table with road and lane as dictionary-encoded strings (needs pyarrow)"""
+        if pyarrow is None:
+            raise ImportError("Parquet export needs pyarrow (pip install pyarrow)")
+        arrays = []
+        for name in self.COLUMNS:
+            if name == "road":
+                arrays.append(pyarrow.DictionaryArray.from_arrays(self.column(name), list(self.roads)))
+            elif name == "lane":
+                arrays.append(pyarrow.DictionaryArray.from_arrays(self.column(name), list(self.LANES)))
+            else:
+                arrays.append(pyarrow.array(self.column(name)))
+        pyarrow.parquet.write_table(pyarrow.Table.from_arrays(arrays, names=list(self.COLUMNS)), path)
@@ -0,0 +1,186 @@
+from SimulationToolbox.SimulationConfig import SimulationConfig
+
+import math
+import numpy as np
+
+class RunningMoments:
+    """Count, mean and variance updated one value at a time (Welford), mergeable across runs (Chan et al.)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "RunningMoments") -> None:
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def variance(self) -> float:
+        """Sample variance (NaN for fewer than two values)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+
+class FixedBinHistogram:
+    """Counts in bins of equal width starting at 0; the last bin also counts everything beyond it"""
+
+    def __init__(self, bin_width: float = None, bin_count: int = None):
+        self.bin_width = SimulationConfig.WAIT_HISTOGRAM_BIN_WIDTH if bin_width is None else bin_width
+        self.bin_count = SimulationConfig.WAIT_HISTOGRAM_BINS if bin_count is None else bin_count
+        self.counts = np.zeros(self.bin_count, dtype=np.int64)
+
+    def add(self, value: float) -> None:
+        self.counts[min(int(value / self.bin_width), self.bin_count - 1)] += 1
+
+    def merge(self, other: "FixedBinHistogram") -> None:
+        if other.bin_width != self.bin_width or other.bin_count != self.bin_count:
+            raise ValueError("Cannot merge histograms with different bins")
+        self.counts += other.counts
+
+    def get_bin_edges(self) -> np.ndarray:
+        return np.arange(self.bin_count + 1) * self.bin_width
+
+
+class QuantileSketch:
+    """Quantile sketch with bounded relative error (DDSketch-style logarithmic buckets).
+
+    Positive values go to bucket ceil(log_gamma(value)), so every value in a bucket is within
+    relative_accuracy of the bucket's representative value; zeros (vehicles that never waited) have
+    their own bucket. Memory grows with the logarithm of the value range only, and sketches with the
+    same accuracy merge exactly by adding their bucket counts.
+    """
+
+    def __init__(self, relative_accuracy: float = None):
+        self.relative_accuracy = SimulationConfig.WAIT_SKETCH_RELATIVE_ACCURACY if relative_accuracy is None else relative_accuracy
+        self.gamma = (1.0 + self.relative_accuracy) / (1.0 - self.relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}   # Bucket key -> count
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= 0.0:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge quantile sketches with different accuracies")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Estimate of the q-quantile (0 <= q <= 1), NaN if the sketch is empty"""
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                estimate = 2.0 * self.gamma ** key / (self.gamma + 1.0)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+
+class WaitTimeDistribution:
+    """Welford moments, fixed-bin histogram and quantile sketch of one group of wait times"""
+
+    def __init__(self, config: SimulationConfig = None):
+        config = SimulationConfig if config is None else config
+        self.moments = RunningMoments()
+        self.histogram = FixedBinHistogram(config.WAIT_HISTOGRAM_BIN_WIDTH, config.WAIT_HISTOGRAM_BINS)
+        self.sketch = QuantileSketch(config.WAIT_SKETCH_RELATIVE_ACCURACY)
+
+    def add(self, wait_time: float) -> None:
+        self.moments.add(wait_time)
+        self.histogram.add(wait_time)
+        self.sketch.add(wait_time)
+
+    def merge(self, other: "WaitTimeDistribution") -> None:
+        self.moments.merge(other.moments)
+        self.histogram.merge(other.histogram)
+        self.sketch.merge(other.sketch)
+
+    def summary(self) -> dict:
+        return {
+            "count": self.moments.count,
+            "mean": self.moments.mean if self.moments.count else math.nan,
+            "std": math.sqrt(self.moments.variance()),
+            "min": self.moments.min if self.moments.count else math.nan,
+            "max": self.moments.max if self.moments.count else math.nan,
+            "p50": self.sketch.quantile(0.50),
+            "p95": self.sketch.quantile(0.95),
+            "p99": self.sketch.quantile(0.99),
+        }
+
+
+class WaitTimeStatistics:
+    """Streaming wait time distributions by road and lane, updated as vehicles leave.
+
+    Only the per-lane distributions are updated; road-wide and overall distributions are merged from
+    them on request. Statistics of several runs merge into fleet-wide ones in constant memory.
+    """
+
+    def __init__(self, config: SimulationConfig = None):
+        self.config = config  # Histogram and sketch settings (None: the SimulationConfig defaults)
+        self.lanes = {}  # (road id, lane id) -> WaitTimeDistribution
+
+    def add(self, road_id: str, lane_id: str, wait_time: float) -> None:
+        distribution = self.lanes.get((road_id, lane_id))
+        if distribution is None:
+            distribution = self.lanes[(road_id, lane_id)] = WaitTimeDistribution(self.config)
+        distribution.add(wait_time)
+
+    def merge(self, other: "WaitTimeStatistics") -> None:
+        for (road_id, lane_id), distribution in other.lanes.items():
+            self.lanes.setdefault((road_id, lane_id), WaitTimeDistribution(self.config)).merge(distribution)
+
+    def get(self, road_id: str = None, lane_id: str = None) -> WaitTimeDistribution:
+        """Distribution of one lane, one road (road_id only) or all vehicles (no arguments)"""
+        merged = WaitTimeDistribution(self.config)
+        for (lane_road_id, lane_lane_id), distribution in self.lanes.items():
+            if road_id is not None and lane_road_id != road_id:
+                continue
+            if lane_id is not None and lane_lane_id != lane_id:
+                continue
+            merged.merge(distribution)
+        return merged
+
+    def summary(self) -> dict:
+        """Summary statistics overall ("all"), per road and per "road/lane" """
+        summary = {"all": self.get().summary()}
+        for road_id in sorted({road_id for road_id, _ in self.lanes}):
+            summary[road_id] = self.get(road_id).summary()
+        for road_id, lane_id in sorted(self.lanes):
+            summary[f"{road_id}/{lane_id}"] = self.lanes[(road_id, lane_id)].summary()
+        return summary
@@ -0,0 +1,78 @@
+from Road.DemandProfile import DemandProfile
+
+import math
+import numpy as np
+
+class ArrivalSchedule:
+    """Precomputed arrival times of one road's vehicles, by lane.
+
+    Each lane is a Poisson process with half the road's rate (see DemandProfile), drawn from its own
+    generator (`rngs`, one per lane). Arrivals are drawn ahead of time for chunk_seconds of virtual time
+    at once: per lane, the arrival counts of every profile segment in one vectorized Poisson draw and
+    their times in one uniform draw, merged into a single time-ordered array. Only the current chunk is kept, and the next one is drawn, pulling
+    the next stretch of the profile, once it is used up.
+
+    Arrival times are in virtual seconds, so they don't depend on the frame rate or step length:
+    pop_due(time) returns the lanes of every arrival up to `time`, in arrival order.
+    """
+
+    def __init__(self, profile: DemandProfile, lane_ids: list, rngs: list, chunk_seconds: float = 300.0):
+        self.profile = profile
+        self.lane_ids = list(lane_ids)
+        self.rngs = list(rngs)
+        self.chunk_seconds = chunk_seconds
+        self.generated_until = 0.0  # Arrivals before this run time have been drawn
+        self.times = np.empty(0)    # Arrival times of the current chunk, ascending
+        self.lanes = np.empty(0, dtype=np.int64)  # Index into lane_ids per arrival
+        self.index = 0              # Next arrival of the current chunk
+        self.segments = []          # Profile segments of the current chunk
+
+    def reseed(self, rngs: list, time: float) -> None:
+        """Redraw the arrivals after run time `time` with new lane generators (forked runs draw different futures from one snapshot)"""
+        self.rngs = list(rngs)
+        segments = [(max(start, time), end, rate) for start, end, rate in self.segments if end > time]
+        self.draw_segments(segments)
+
+    def draw_chunk(self) -> None:
+        """Draw the arrivals of the next chunk_seconds of run time"""
+        start = self.generated_until
+        end = start + self.chunk_seconds
+        segments = self.profile.get_segments(start, end)
+        self.generated_until = end
+        self.draw_segments(segments)
+
+    def draw_segments(self, segments: list) -> None:
+        """Replace the current chunk by arrivals drawn for the (start, end, rate) segments"""
+        self.segments = segments
+        self.index = 0
+        if not segments:
+            self.times = np.empty(0)
+            self.lanes = np.empty(0, dtype=np.int64)
+            return
+        starts, ends, rates = (np.array(column, dtype=np.float64) for column in zip(*segments))
+        expected = (ends - starts) * rates / len(self.lane_ids)
+        times, lanes = [], []
+        for lane_index, rng in enumerate(self.rngs):
+            counts = rng.poisson(expected)
+            times.append(np.repeat(starts, counts) + np.repeat(ends - starts, counts) * rng.random(int(counts.sum())))
+            lanes.append(np.full(len(times[-1]), lane_index, dtype=np.int64))
+        times = np.concatenate(times)
+        order = np.argsort(times, kind="stable")
+        self.times = times[order]
+        self.lanes = np.concatenate(lanes)[order]
+
+    def get_next_time(self) -> float:
+        """Run time of the next arrival (infinity when the profile has ended)"""
+        while self.index >= len(self.times):
+            if self.generated_until >= self.profile.get_end_time():
+                return math.inf
+            self.draw_chunk()
+        return float(self.times[self.index])
+
+    def pop_due(self, time: float) -> list:
+        """Lane ids of the arrivals at or before `time`, in arrival order"""
+        lanes = []
+        while self.get_next_time() <= time:
+            lanes.append(self.lane_ids[self.lanes[self.index]])
+            self.index += 1
+        return lanes
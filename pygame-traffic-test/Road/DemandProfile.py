@@ -0,0 +1,165 @@
+from SimulationToolbox.SimulationConfig import SimulationConfig
+
+import csv
+import math
+
+SECONDS_PER_DAY = 86400.0
+
+class DemandProfile:
+    """Arrival rate of one road over virtual time, as piecewise-constant segments.
+
+    get_segments(start, end) returns the (segment start, segment end, vehicles per virtual second)
+    segments covering [start, end) in run time (virtual seconds since the run started). It is only
+    ever called for consecutive windows, so profiles can read their data lazily, one window at a time.
+    The base profile has the road's constant rate, which is its traffic intensity (a spawn chance per
+    nominal frame) per virtual second of a frame.
+    """
+
+    def __init__(self, rate: float, config: SimulationConfig = None):
+        self.config = config if config is not None else SimulationConfig()
+        self.rate = rate
+
+    @staticmethod
+    def create(road, config: SimulationConfig = None):
+        """Profile of a road as set by DEMAND_PROFILE: "constant", "rush_hour" or the path of a CSV trace"""
+        config = config if config is not None else road.config
+        rate = road.getTrafficIntensity() * config.FPS / config.SPEED_FACTOR
+        if config.DEMAND_PROFILE == "constant":
+            return DemandProfile(rate, config)
+        if config.DEMAND_PROFILE == "rush_hour":
+            return RushHourDemandProfile(rate, config)
+        if str(config.DEMAND_PROFILE).endswith(".csv"):
+            return CsvDemandProfile(config.DEMAND_PROFILE, road.getRoadID(), config)
+        raise ValueError(f"Unknown demand profile: {config.DEMAND_PROFILE} (use constant, rush_hour or a .csv file)")
+
+    def get_end_time(self) -> float:
+        """Run time after which there are no more arrivals"""
+        return math.inf
+
+    def get_segments(self, start: float, end: float) -> list:
+        return [(start, end, self.rate)]
+
+
+class RushHourDemandProfile(DemandProfile):
+    """The road's rate times a daily curve: DEMAND_RUSH_HOUR_BASE plus a Gaussian bump per
+    DEMAND_RUSH_HOUR_PEAKS entry (time of day, width and height in multiples of the rate), evaluated
+    every DEMAND_PROFILE_RESOLUTION virtual seconds. Run time 0 is DEMAND_PROFILE_START_TIME of the day."""
+
+    def __init__(self, rate: float, config: SimulationConfig = None):
+        super().__init__(rate, config)
+        self.start_time = self.config.DEMAND_PROFILE_START_TIME
+        self.resolution = self.config.DEMAND_PROFILE_RESOLUTION
+        self.base = self.config.DEMAND_RUSH_HOUR_BASE
+        self.peaks = [tuple(peak) for peak in self.config.DEMAND_RUSH_HOUR_PEAKS]
+
+    def get_multiplier(self, time_of_day: float) -> float:
+        multiplier = self.base
+        for center, width, height in self.peaks:
+            # Distance on the daily cycle, so a peak near midnight also raises the early hours
+            distance = (time_of_day - center + SECONDS_PER_DAY / 2) % SECONDS_PER_DAY - SECONDS_PER_DAY / 2
+            multiplier += height * math.exp(-0.5 * (distance / width) ** 2)
+        return multiplier
+
+    def get_segments(self, start: float, end: float) -> list:
+        segments = []
+        segment_start = start
+        while segment_start < end:
+            # Segments are aligned to the resolution grid, so their rates don't depend on the window sizes
+            segment_end = min(end, (math.floor(segment_start / self.resolution) + 1) * self.resolution)
+            time_of_day = (self.start_time + (segment_start + segment_end) / 2) % SECONDS_PER_DAY
+            segments.append((segment_start, segment_end, self.rate * self.get_multiplier(time_of_day)))
+            segment_start = segment_end
+        return segments
+
+
+class CsvDemandProfile(DemandProfile):
+    """Recorded counts from a CSV file with a "time" column (start of each counting interval, in
+    seconds of the trace, ascending) and a count column per road id, e.g.
+
+        time,vertical_road,horizontal_road
+        0,12,9
+        300,15,11
+
+    Each count is spread evenly over its interval, which ends at the next row's time (the last row's
+    interval is as long as the one before it; there are no arrivals after it). Run time 0 is
+    DEMAND_PROFILE_START_TIME of the trace. The file is read row by row as the run advances, so day-long
+    traces are never held in memory; pickling (snapshots) keeps the path and the position in the file.
+    """
+
+    def __init__(self, path: str, road_id: str, config: SimulationConfig = None):
+        super().__init__(0.0, config)
+        self.path = path
+        self.road_id = road_id
+        self.start_time = self.config.DEMAND_PROFILE_START_TIME
+        self.open()
+        self.current = self.read_row()  # (trace time, count) of the interval being consumed
+        self.next = self.read_row()
+        self.last_interval = 0.0
+        self.end_time = math.inf
+
+    def open(self, skip_rows: int = 0) -> None:
+        """Open the trace, positioned after its first skip_rows rows"""
+        self.file = open(self.path, newline="")
+        self.reader = csv.DictReader(self.file)
+        if self.road_id not in (self.reader.fieldnames or []):
+            raise KeyError(f"No {self.road_id} column in demand trace {self.path}")
+        for _ in range(skip_rows):
+            next(self.reader)
+        self.rows_read = skip_rows
+
+    def read_row(self):
+        row = next(self.reader, None)
+        if row is None:
+            return None
+        self.rows_read += 1
+        return float(row["time"]), float(row[self.road_id])
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["file"], state["reader"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.open(state["rows_read"])
+
+    def advance(self) -> None:
+        """Move on to the next counting interval"""
+        if self.next is not None:
+            self.last_interval = self.next[0] - self.current[0]
+        self.current = self.next
+        self.next = self.read_row()
+        if self.current is None:
+            self.file.close()
+
+    def get_interval(self) -> tuple:
+        """(start, end, rate) of the current counting interval in run time, or None after the trace"""
+        if self.current is None:
+            return None
+        time, count = self.current
+        end = self.next[0] if self.next is not None else time + self.last_interval
+        if end <= time:
+            return (time - self.start_time, time - self.start_time, 0.0)
+        return (time - self.start_time, end - self.start_time, count / (end - time))
+
+    def get_end_time(self) -> float:
+        return self.end_time
+
+    def get_segments(self, start: float, end: float) -> list:
+        segments = []
+        while self.current is not None:
+            interval_start, interval_end, rate = self.get_interval()
+            if interval_end <= start:
+                self.advance()  # Before the window (or before the run started)
+                continue
+            if interval_start >= end:
+                break
+            segment_start, segment_end = max(start, interval_start), min(end, interval_end)
+            if segment_end > segment_start:
+                segments.append((segment_start, segment_end, rate))
+            if interval_end > end:
+                break
+            self.advance()
+        if self.current is None:
+            self.end_time = min(self.end_time, end)
+        return segments
@@ -0,0 +1,56 @@
+class LaneQueue:
+    """Vehicles of one lane in driving order: head is the vehicle furthest along, tail the last spawned.
+
+    Vehicles can't overtake, so driving order is spawn order. The queue is a doubly linked list through
+    each vehicle's `leader` (the vehicle ahead) and `follower` (the vehicle behind) attributes, which
+    makes appending at the tail, removing any vehicle (normally the head, when it leaves the screen)
+    and leader lookup O(1).
+    """
+
+    def __init__(self):
+        self.head = None
+        self.tail = None
+        self.length = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self):
+        vehicle = self.head
+        while vehicle is not None:
+            # Read the follower first so the current vehicle can be removed while iterating
+            follower = vehicle.follower
+            yield vehicle
+            vehicle = follower
+
+    def __contains__(self, vehicle) -> bool:
+        return vehicle.lane_queue is self
+
+    def append(self, vehicle) -> None:
+        """Add a vehicle behind the current tail"""
+        vehicle.leader = self.tail
+        vehicle.follower = None
+        vehicle.lane_queue = self
+        if self.tail is None:
+            self.head = vehicle
+        else:
+            self.tail.follower = vehicle
+        self.tail = vehicle
+        self.length += 1
+
+    def remove(self, vehicle) -> None:
+        """Unlink a vehicle from the queue; does nothing if it isn't in this queue"""
+        if vehicle.lane_queue is not self:
+            return
+        if vehicle.leader is None:
+            self.head = vehicle.follower
+        else:
+            vehicle.leader.follower = vehicle.follower
+        if vehicle.follower is None:
+            self.tail = vehicle.leader
+        else:
+            vehicle.follower.leader = vehicle.leader
+        vehicle.leader = None
+        vehicle.follower = None
+        vehicle.lane_queue = None
+        self.length -= 1
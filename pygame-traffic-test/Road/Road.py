@@ -1,25 +1,45 @@
 import random
-import pygame
 from Animation.Animatable import Animatable
 from Graphics.SimulationGraphicConfig import SimulationGraphicConfig
 from SimulationToolbox.SimulationConfig import SimulationConfig
 from Vehicle.Vehicle import Vehicle
+from Vehicle.VehicleState import VehicleState
+from Road.LaneQueue import LaneQueue
 
 class Road(Animatable):
-    def __init__(self, x, y, length, traffic_intensity, road_id, image):
+    static = True  # Part of Display's cached static layer
+
+    def __init__(self, x, y, length, traffic_intensity, road_id, image, config: SimulationConfig = None):
+        self.config = config if config is not None else SimulationConfig()
         self.x = x
         self.y = y
-        self.width = SimulationGraphicConfig.ROAD_WIDTH
+        self.width = self.config.graphics.ROAD_WIDTH
         self.length = length
         self.image = image
         self.road_id = road_id
         self.traffic_intensity = traffic_intensity # Probability of spawning a vehicle per virtual minute
 
+        # Vehicles of each lane in driving order (head furthest along, tail last spawned)
         self.vehicle_lanes = {
-            "left_lane": [],
-            "right_lane": []
+            "left_lane": LaneQueue(),
+            "right_lane": LaneQueue()
         }
 
+        # Random streams of the spawn draws and lane choices (set by Scenario.seedRandomStreams); None: the global random module
+        self.spawn_random = None
+        self.lane_random = None
+
+        # Precomputed arrivals (ARRIVAL_MODEL "schedule", set by Scenario.buildScenario); None: one spawn draw per step
+        self.arrival_schedule = None
+
+        # Vehicles that left the screen, reused by create_vehicle instead of allocating new ones
+        self.vehicle_pool = []
+
+        # Live queue counters, updated by the vehicles on state changes and stop line crossings
+        self.waiting_count = 0              # Vehicles in 'waiting' state on this road
+        self.behind_stop_line_count = 0     # Vehicles still (partly) behind the stop line
+        self.lane_waiting_counts = {lane_id: 0 for lane_id in self.vehicle_lanes}  # Queue length per lane
+
         # FOR DEBUGGING
         self.debug_spawn_rect = None
         self.debug_vehicle_rects = []
@@ -37,40 +57,91 @@ class Road(Animatable):
         return f"{self.road_id}_{lane_id}"
 
     def can_spawn_in_lane(self, lane_id) -> bool:
-        """Check if a vehicle can be spawned in the specified lane based on existing vehicles"""
-        lane_vehicle_list = self.vehicle_lanes[lane_id]
+        """Check if a vehicle can be spawned in the specified lane based on existing vehicles.
+
+        Only the lane's tail can overlap the spawn area: every other vehicle is further along the road.
+        """
+        vehicle = self.vehicle_lanes[lane_id].tail
+        if vehicle is None:
+            return True
         lane_key = self.get_lane_key(lane_id)
-        min_gap = SimulationGraphicConfig.VEHICLE_SPAWN_GAP_METERS * SimulationConfig.PIXELS_PER_METER
-        spawn_x = SimulationGraphicConfig.LANE_STARTING_POSITIONS[lane_key][0]
-        spawn_y = SimulationGraphicConfig.LANE_STARTING_POSITIONS[lane_key][1]
-
-        spawn_rectangle = pygame.Rect((spawn_x, spawn_y, SimulationGraphicConfig.VEHICLE_WIDTH, SimulationGraphicConfig.VEHICLE_HEIGHT))
-        for vehicle in lane_vehicle_list:
-            vehicle_rectangle = pygame.Rect((vehicle.x + min_gap, vehicle.y + min_gap, vehicle.width, vehicle.height))
-            if spawn_rectangle.colliderect(vehicle_rectangle):
+        min_gap = self.config.graphics.VEHICLE_SPAWN_GAP_METERS * self.config.PIXELS_PER_METER
+        spawn_x = self.config.graphics.LANE_STARTING_POSITIONS[lane_key][0]
+        spawn_y = self.config.graphics.LANE_STARTING_POSITIONS[lane_key][1]
+
+        # Same rectangle overlap test as pygame.Rect.colliderect, which truncates coordinates to ints
+        vehicle_x = int(vehicle.x + min_gap)
+        vehicle_y = int(vehicle.y + min_gap)
+        overlaps_x = vehicle_x < spawn_x + self.config.graphics.VEHICLE_WIDTH and spawn_x < vehicle_x + int(vehicle.width)
+        overlaps_y = vehicle_y < spawn_y + self.config.graphics.VEHICLE_HEIGHT and spawn_y < vehicle_y + int(vehicle.height)
+        if overlaps_x and overlaps_y:
+            if self.config.VERBOSE:
                 print(f"Cannot spawn in {lane_key}: spawn area occupied by vehicle at ({vehicle.x}, {vehicle.y})")
-                return False
+            return False
         return True
     
     def register_vehicle_in_lane(self, vehicle: Vehicle) -> None:
-        """Register a vehicle in the specified lane's vehicle list"""
+        """Register a vehicle at the tail of its lane's queue"""
         lane_id = vehicle.lane_id
         self.vehicle_lanes[lane_id].append(vehicle)
+        vehicle.road = self
+        self.update_queue_counters(vehicle, 1)
 
     def remove_vehicle_from_lane(self, vehicle: Vehicle) -> None:
-        """Remove a vehicle from the specified lane's vehicle list"""
+        """Remove a vehicle from its lane's queue"""
         lane_id = vehicle.lane_id
-        if vehicle in self.vehicle_lanes[lane_id]:
-            self.vehicle_lanes[lane_id].remove(vehicle)
+        if vehicle not in self.vehicle_lanes[lane_id]:
+            return
+        self.vehicle_lanes[lane_id].remove(vehicle)
+        self.update_queue_counters(vehicle, -1)
+        vehicle.road = None
+
+    # ----------------------------------
+    # === LIVE QUEUE COUNTERS
+    # ----------------------------------
+    def update_queue_counters(self, vehicle: Vehicle, delta: int) -> None:
+        """Add (delta=1) or remove (delta=-1) a vehicle's contribution to the queue counters"""
+        if vehicle.state == VehicleState.WAITING:
+            self.waiting_count += delta
+            self.lane_waiting_counts[vehicle.lane_id] += delta
+        if vehicle.behind_stop_line:
+            self.behind_stop_line_count += delta
+
+    def on_vehicle_state_changed(self, vehicle: Vehicle, previous_state: VehicleState) -> None:
+        """Called by Vehicle.set_state"""
+        if vehicle.state == VehicleState.WAITING:
+            delta = 1
+        elif previous_state == VehicleState.WAITING:
+            delta = -1
+        else:
+            return
+        self.waiting_count += delta
+        self.lane_waiting_counts[vehicle.lane_id] += delta
+
+    def on_vehicle_crossed_stop_line(self, vehicle: Vehicle) -> None:
+        """Called by Vehicle.update_stop_line_side"""
+        self.behind_stop_line_count += 1 if vehicle.behind_stop_line else -1
+
+    def get_waiting_count(self) -> int:
+        """Number of vehicles currently waiting on this road"""
+        return self.waiting_count
+
+    def get_lane_queue_length(self, lane_id: str) -> int:
+        """Number of vehicles currently waiting in the specified lane"""
+        return self.lane_waiting_counts[lane_id]
+
+    def draw_spawn_chance(self) -> float:
+        """Uniform draw the spawn probability is compared with, from this road's spawn stream"""
+        return self.spawn_random.random() if self.spawn_random is not None else random.random()
 
     def choose_spawn_lane(self) -> str:
         """Choose a lane to spawn a vehicle, ensuring it's not occupied"""
         possible_lanes = list(self.vehicle_lanes.keys())
-        return random.choice(possible_lanes)
+        return (self.lane_random if self.lane_random is not None else random).choice(possible_lanes)
     
-    def try_spawn_vehicle_in_lane(self, scenario, screen) -> Vehicle | None:
-        """Attempt to spawn a vehicle in the specified lane if possible"""
-        first_lane = self.choose_spawn_lane()
+    def try_spawn_vehicle_in_lane(self, scenario, screen, lane_id: str = None) -> Vehicle | None:
+        """Attempt to spawn a vehicle in the specified lane (default: a random one) if possible, else in the other lane"""
+        first_lane = lane_id if lane_id is not None else self.choose_spawn_lane()
         second_lane = "left_lane" if first_lane == "right_lane" else "right_lane"
         lane_order = [first_lane, second_lane]
         for lane_id in lane_order:
@@ -88,26 +159,30 @@ class Road(Animatable):
         """
         Create (but do not register) a Vehicle for this road.
         Returns a Vehicle instance; caller should add it to the scenario.
+        Released vehicles are reset and reused before new ones are allocated.
         """
         # lane_id = random.choice(["left_lane", "right_lane"])
 
-        if self.road_id == SimulationConfig.ROAD_IDS["Vertical Road"]:
+        if self.road_id == self.config.ROAD_IDS["Vertical Road"]:
             img = images['car_north']
-            return Vehicle(SimulationGraphicConfig.VEHICLE_HEIGHT, SimulationGraphicConfig.VEHICLE_WIDTH, SimulationConfig.VEHICLE_VELOCITY_MPS, img, self.road_id, lane_id)
-        elif self.road_id == SimulationConfig.ROAD_IDS["Horizontal Road"]:
+            if self.vehicle_pool:
+                vehicle = self.vehicle_pool.pop()
+                vehicle.reset(img, lane_id)
+                return vehicle
+            return Vehicle(self.config.graphics.VEHICLE_HEIGHT, self.config.graphics.VEHICLE_WIDTH, self.config.VEHICLE_VELOCITY_MPS, img, self.road_id, lane_id, self.config)
+        elif self.road_id == self.config.ROAD_IDS["Horizontal Road"]:
             img = images['car_west']
-            return Vehicle(SimulationGraphicConfig.VEHICLE_WIDTH, SimulationGraphicConfig.VEHICLE_HEIGHT, SimulationConfig.VEHICLE_VELOCITY_MPS, img, self.road_id, lane_id)
+            if self.vehicle_pool:
+                vehicle = self.vehicle_pool.pop()
+                vehicle.reset(img, lane_id)
+                return vehicle
+            return Vehicle(self.config.graphics.VEHICLE_WIDTH, self.config.graphics.VEHICLE_HEIGHT, self.config.VEHICLE_VELOCITY_MPS, img, self.road_id, lane_id, self.config)
         
+    def release_vehicle(self, vehicle: Vehicle) -> None:
+        """Return a vehicle that left the scenario to the pool used by create_vehicle"""
+        if vehicle.road_id == self.road_id:
+            self.vehicle_pool.append(vehicle)
+
     def get_number_of_vehicles_behind_intersection(self) -> int:
         """Get the number of vehicles currently behind the intersection on this road"""
-        count = 0
-        stop_line_position = SimulationGraphicConfig.STOP_LINE_POSITIONS[self.road_id]
-        for lane_id, vehicle_list in self.vehicle_lanes.items():
-            for vehicle in vehicle_list:
-                if self.road_id == SimulationConfig.ROAD_IDS["Vertical Road"]:
-                    if vehicle.y + vehicle.height > stop_line_position:
-                        count += 1
-                elif self.road_id == SimulationConfig.ROAD_IDS["Horizontal Road"]:
-                    if vehicle.x + vehicle.width > stop_line_position:
-                        count += 1
-        return count
\ No newline at end of file
+        return self.behind_stop_line_count
@@ -9,17 +9,26 @@ class SignalController(Simulatable):
     Uses simulation virtual time (delta_time passed to simulate).
     """
 
-    def __init__(self, vertical_signal: TrafficSignal, horizontal_signal: TrafficSignal, scenario, virtual_time_elapsed: float = 0.0, toggle_interval: float = 15.0):
+    def __init__(self, vertical_signal: TrafficSignal, horizontal_signal: TrafficSignal, scenario, virtual_time_elapsed: float = 0.0, toggle_interval: float = 15.0,
+                 config: SimulationConfig = None):
+        # Timing constants; the scenario's config unless given
+        self.config = config if config is not None else scenario.config
         self.vertical_signal = vertical_signal
         self.horizontal_signal = horizontal_signal
         # Store scenario so controller can inspect roads/queues
         self.scenario = scenario
         self.virtual_time_elapsed = virtual_time_elapsed
         self.toggle_interval = toggle_interval
-        self.both_signals_red_duration = SimulationConfig.BOTH_SIGNALS_RED_DURATION * SimulationConfig.SPEED_FACTOR # 3 virtual seconds
+        self.both_signals_red_duration = self.config.BOTH_SIGNALS_RED_DURATION * self.config.SPEED_FACTOR # 3 virtual seconds
         self.both_signals_red_remaining_time = 0.0
         self.post_toggle_vertical_state = None
         self.post_toggle_horizontal_state = None
+        # Optional callable(road_id) -> int replacing the road's live waiting counter
+        # (set by engines that don't keep Vehicle objects in the road lanes, e.g. VectorizedSimulator)
+        self.waiting_vehicle_counter = None
+        # Optional callable() -> lane state in the form of VectorizedSimulator.capture_scenario_lanes,
+        # for controllers that predict from the vehicles (set by the same engines)
+        self.lane_state_source = None
 
         # Ensure initial states are opposite.
         # If both are the same (e.g., both Red), set vertical Green and horizontal Red by default.
@@ -63,6 +72,7 @@ class SignalController(Simulatable):
                 # Time to switch to the post-red states
                 self.vertical_signal.setState(self.post_toggle_vertical_state)
                 self.horizontal_signal.setState(self.post_toggle_horizontal_state)
+                self.wake_green_roads()
                 # Clear post states
                 self.post_toggle_vertical_state = ""
                 self.post_toggle_horizontal_state = ""
@@ -76,45 +86,23 @@ class SignalController(Simulatable):
         # If `scenario` is not set on this controller, fall back to the original fixed-period behavior.
         if self.scenario is not None:
             # Count only vehicles currently stuck at the RED light (i.e., in 'waiting' state)
-            red_wait_count = 0
-            red_thresh = 0.0
-            # Find which road is currently red and count vehicles waiting on that road
-            if self.vertical_signal.is_green():
-                # horizontal road is red
-                red_road_id = self.horizontal_signal.getRoadID()
-                red_thresh = SimulationConfig.HORIZONTAL_ROAD_CAR_THRESHOLD
-            else:
-                # vertical road is red
-                red_road_id = self.vertical_signal.getRoadID()
-                red_thresh = SimulationConfig.VERTICAL_ROAD_CAR_THRESHOLD
-
-            for road_component in self.scenario.getRoads():
-                if road_component.getRoadID() != red_road_id:
-                    continue
-                # road_component.vehicle_lanes is a dict of lane lists
-                for lane_list in road_component.vehicle_lanes.values():
-                    for vehicle in lane_list:
-                        try:
-                            if vehicle.state == SimulationConfig.VEHICLE_STATES["waiting"]:
-                                red_wait_count += 1
-                        except Exception:
-                            # If vehicle lacks expected attributes, skip it
-                            continue
+            red_wait_count, red_thresh = self.get_red_wait_count_and_threshold()
 
             # Convert real-time durations into virtual seconds used by the controller (respect SPEED_FACTOR)
-            min_green = SimulationConfig.MIN_GREEN_DURATION * SimulationConfig.SPEED_FACTOR
-            max_green = SimulationConfig.MAX_GREEN_DURATION * SimulationConfig.SPEED_FACTOR
+            min_green = self.config.MIN_GREEN_DURATION * self.config.SPEED_FACTOR
+            max_green = self.config.MAX_GREEN_DURATION * self.config.SPEED_FACTOR
 
             # Force toggle if we've reached the absolute maximum green duration
             if self.virtual_time_elapsed >= max_green:
-                print(f"\nMAX GREEN REACHED, TOGGLING SIGNALS: red_wait_count={red_wait_count}, time_elapsed={self.virtual_time_elapsed}\n")
+                if self.config.VERBOSE:
+                    print(f"\nMAX GREEN REACHED, TOGGLING SIGNALS: red_wait_count={red_wait_count}, time_elapsed={self.virtual_time_elapsed}\n")
                 self.toggle_signals()
                 self.virtual_time_elapsed = 0.0
             # If we've reached the minimum green, decide based on red-queue length
             elif self.virtual_time_elapsed >= min_green:
-                # Switch when the red side has more waiting vehicles than its threshold
-                if red_wait_count > red_thresh:
-                    print(f"\nTOGGLING SIGNALS DUE TO RED QUEUE: red_wait_count={red_wait_count}, time_elapsed={self.virtual_time_elapsed}\n")
+                if self.should_switch(red_wait_count, red_thresh, delta_time):
+                    if self.config.VERBOSE:
+                        print(f"\nTOGGLING SIGNALS DUE TO RED QUEUE: red_wait_count={red_wait_count}, time_elapsed={self.virtual_time_elapsed}\n")
                     self.toggle_signals()
                     self.virtual_time_elapsed = 0.0
             # else: still within mandatory minimum green, do nothing
@@ -122,4 +110,66 @@ class SignalController(Simulatable):
             # Fallback: keep previous fixed-interval behavior when scenario isn't available
             if self.virtual_time_elapsed >= self.toggle_interval:
                 self.toggle_signals()
-                self.virtual_time_elapsed = 0.0
\ No newline at end of file
+                self.virtual_time_elapsed = 0.0
+
+    def wake_green_roads(self) -> None:
+        """Wake the vehicles sleeping at a signal that just turned green (see ActivityScheduler)"""
+        if self.scenario is None:
+            return
+        for signal in (self.vertical_signal, self.horizontal_signal):
+            if signal.is_green():
+                self.scenario.activity.wake_road(signal.getRoadID())
+
+    def should_switch(self, red_wait_count: int, red_thresh: float, delta_time: float) -> bool:
+        """Decision between minimum and maximum green: switch when the red side has more waiting
+        vehicles than its threshold"""
+        return red_wait_count > red_thresh
+
+    def get_red_wait_count_and_threshold(self) -> tuple:
+        """Count vehicles waiting on the currently red road and return it with that road's threshold"""
+        red_wait_count = 0
+        red_thresh = 0.0
+        # Find which road is currently red and count vehicles waiting on that road
+        if self.vertical_signal.is_green():
+            # horizontal road is red
+            red_road_id = self.horizontal_signal.getRoadID()
+            red_thresh = self.config.HORIZONTAL_ROAD_CAR_THRESHOLD
+        else:
+            # vertical road is red
+            red_road_id = self.vertical_signal.getRoadID()
+            red_thresh = self.config.VERTICAL_ROAD_CAR_THRESHOLD
+
+        if self.waiting_vehicle_counter is not None:
+            return self.waiting_vehicle_counter(red_road_id), red_thresh
+        road_component = self.scenario.get_road(red_road_id)
+        if road_component is not None:
+            red_wait_count = road_component.get_waiting_count()
+        return red_wait_count, red_thresh
+
+    def get_quiescent_steps(self, delta_time: float) -> int:
+        """Number of upcoming steps of delta_time before the controller could change any signal.
+
+        Assumes the red-queue count stays constant, which adaptive stepping guarantees by also
+        bounding the step with every vehicle's own quiescent steps.
+        """
+        if self.both_signals_red_remaining_time > 0.0:
+            time_to_change = self.both_signals_red_remaining_time
+        elif self.scenario is not None:
+            red_wait_count, red_thresh = self.get_red_wait_count_and_threshold()
+            if red_wait_count > red_thresh:
+                time_to_change = self.config.MIN_GREEN_DURATION * self.config.SPEED_FACTOR - self.virtual_time_elapsed
+            else:
+                time_to_change = self.config.MAX_GREEN_DURATION * self.config.SPEED_FACTOR - self.virtual_time_elapsed
+        else:
+            time_to_change = self.toggle_interval - self.virtual_time_elapsed
+        # Keep a one-step margin so the change itself always happens in a normal step
+        return max(0, min(int(time_to_change / delta_time) - 1, self.config.ADAPTIVE_MAX_STEPS))
+
+    def advance_quiescent(self, delta_time: float, steps: int) -> int:
+        """Advance the controller timers through `steps` steps in which no signal changes"""
+        for _ in range(steps):
+            if self.both_signals_red_remaining_time > 0.0:
+                self.both_signals_red_remaining_time -= delta_time
+            else:
+                self.virtual_time_elapsed += delta_time
+        return steps
@@ -0,0 +1,95 @@
+import bisect
+
+class ActivityScheduler:
+    """Keeps track of which simulatables need simulate() in each step.
+
+    Simulatables are simulated in the order they were added (the controller first, then vehicles in
+    spawn order), like the scenario's simulatables. A waiting vehicle whose simulate() cannot change
+    anything (see Vehicle.can_sleep) is put to sleep and skipped until it is woken, which happens when
+    its road's signal turns green or its leader wakes up (followers are woken along with their leader).
+    Sleeping vehicles don't accrue wait time step by step: on waking (or settle_all) they get the same
+    per-step additions they would have had, so results are exactly those of simulating every vehicle
+    every step, while the per-step cost only grows with the vehicles that are awake.
+    """
+
+    def __init__(self):
+        self.next_sequence = 0
+        self.sequences = {}    # Simulatable -> order it was added in
+        self.awake_keys = []   # Sequences of the awake simulatables, ascending
+        self.awake = []        # Awake simulatables, in the same order
+        self.sleepers = {}     # Sleeping vehicle -> step_index when it fell asleep
+        self.step_index = 0    # Fixed steps advanced so far (see advance)
+        self.step_time = 0.0   # Virtual seconds per fixed step
+
+    def add(self, simulatable) -> None:
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        self.sequences[simulatable] = sequence
+        self.awake_keys.append(sequence)
+        self.awake.append(simulatable)
+
+    def remove(self, simulatable) -> None:
+        sequence = self.sequences.pop(simulatable, None)
+        if sequence is None:
+            return
+        if self.sleepers.pop(simulatable, None) is None:
+            self.remove_awake(sequence)
+
+    def remove_awake(self, sequence: int) -> None:
+        index = bisect.bisect_left(self.awake_keys, sequence)
+        del self.awake_keys[index]
+        del self.awake[index]
+
+    def advance(self, steps: int, step_time: float) -> None:
+        """Called by ScenarioHandler for every `steps` fixed steps, before their wait times are added"""
+        self.step_index += steps
+        self.step_time = step_time
+
+    def iterate(self):
+        """Awake simulatables in order, including those woken during the iteration further down the order"""
+        last_sequence = -1
+        while True:
+            index = bisect.bisect_right(self.awake_keys, last_sequence)
+            if index == len(self.awake_keys):
+                return
+            last_sequence = self.awake_keys[index]
+            yield self.awake[index]
+
+    def get_awake(self) -> list:
+        return list(self.awake)
+
+    def is_asleep(self, vehicle) -> bool:
+        return vehicle in self.sleepers
+
+    def sleep(self, vehicle) -> None:
+        if vehicle in self.sleepers or vehicle not in self.sequences:
+            return
+        self.remove_awake(self.sequences[vehicle])
+        self.sleepers[vehicle] = self.step_index
+
+    def settle(self, vehicle) -> None:
+        """Add the wait time a sleeping vehicle accrued since it fell asleep (or was last settled)"""
+        for _ in range(self.step_index - self.sleepers[vehicle]):
+            vehicle.wait_time += self.step_time
+        self.sleepers[vehicle] = self.step_index
+
+    def wake(self, vehicle) -> None:
+        """Wake a sleeping vehicle and its sleeping followers"""
+        while vehicle is not None and vehicle in self.sleepers:
+            self.settle(vehicle)
+            del self.sleepers[vehicle]
+            sequence = self.sequences[vehicle]
+            index = bisect.bisect_left(self.awake_keys, sequence)
+            self.awake_keys.insert(index, sequence)
+            self.awake.insert(index, vehicle)
+            vehicle = vehicle.follower
+
+    def wake_road(self, road_id: str) -> None:
+        """Wake every sleeping vehicle of a road (its signal turned green)"""
+        for vehicle in [vehicle for vehicle in self.sleepers if vehicle.road_id == road_id]:
+            self.wake(vehicle)
+
+    def settle_all(self) -> None:
+        """Bring every sleeping vehicle's wait time up to date (before reading wait times)"""
+        for vehicle in self.sleepers:
+            self.settle(vehicle)
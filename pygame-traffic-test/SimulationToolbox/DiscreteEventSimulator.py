@@ -0,0 +1,453 @@
+from SignalController.SignalController import SignalController
+from Metrics.WaitTimeStatistics import WaitTimeStatistics
+
+import heapq
+
+
+class EventVehicle:
+    """Lightweight vehicle record used by the discrete-event engine.
+
+    Positions are along the direction of travel (y on the vertical road, x on the horizontal road).
+    `position` is the position at the end of step `position_step`. A vehicle driving freely on a green
+    road is only brought up to date when its position is needed, by repeating the stepped loop's
+    per-step subtraction, so it is the same float the stepped loop computes.
+    """
+
+    def __init__(self, spawn_index: int, road_id: str, lane_id: str, spawn_step: int, start_position: float):
+        self.spawn_index = spawn_index
+        self.road_id = road_id
+        self.lane_id = lane_id
+        self.position = start_position
+        self.position_step = spawn_step - 1  # A vehicle makes its first move in the step it spawns
+        self.free = False               # Driving on a green road with its exit scheduled
+        self.waiting = False
+        self.asleep = False             # Waiting at red where only the signal turning green moves it again
+        self.stop_step = 0              # Step in which the vehicle last stopped
+        self.wait_steps = 0             # Total steps spent waiting
+        self.version = 0                # Bumped to invalidate an already scheduled exit event
+
+
+class DiscreteEventSimulator:
+    """Discrete-event engine for the same intersection model as ScenarioHandler.runSimulation.
+
+    On a green road vehicles only drive at VEHICLE_VELOCITY_MPS until they leave the screen, so they
+    get a single exit event. On a red road the stop line, minimum-gap clamps and queue gaps are resolved
+    by the same per-step rules as Vehicle.handle_red_signal (including the ties at the clamp distance
+    behind a moving leader), but only in steps where some vehicle on a red road can still change; a
+    vehicle stopped where only the signal turning green can move it again is skipped, like the stepped
+    loop's sleeping vehicles. Everything else (arrivals, signal changes from the SignalController rules,
+    discharge on green) jumps between events kept in a priority queue on the same fixed-step grid as the
+    frame-stepped loop. Arrivals consume the roads' spawn streams in the same order, so for the same seed
+    it reproduces the per-vehicle wait times and the waiting-count time series of runSimulation exactly.
+    The time series are recorded only where a count changes (step function).
+    """
+
+    # Order of events within one step, matching ScenarioHandler.stepSimulation
+    SPAWN = 0
+    SIGNAL = 1
+    RED_VEHICLES = 2
+    EXIT = 3
+
+    def __init__(self, scenario, step_time: float, spawn_probabilities: dict):
+        """`scenario` must already be built; spawn_probabilities maps road id to spawn chance per step"""
+        self.config = scenario.config
+        self.step_time = step_time
+        self.step_pixels = self.config.VEHICLE_VELOCITY_MPS * step_time * self.config.PIXELS_PER_METER
+        self.vehicle_length = self.config.graphics.VEHICLE_WIDTH  # Both car images are this long in the direction of travel
+        self.min_gap_px = self.config.graphics.VEHICLE_MIN_GAP_METERS * self.config.PIXELS_PER_METER
+        self.spawn_gap = self.config.graphics.VEHICLE_SPAWN_GAP_METERS * self.config.PIXELS_PER_METER
+
+        self.roads = scenario.getRoads()
+        self.spawn_probabilities = spawn_probabilities
+        self.lanes = {road.getRoadID(): {lane_id: [] for lane_id in road.vehicle_lanes} for road in self.roads}
+        self.signal_green = {road.getRoadID(): scenario.get_signal_for_road(road.getRoadID()).is_green() for road in self.roads}
+
+        controller = None
+        for simulatable in scenario.getSimulatables():
+            if isinstance(simulatable, SignalController):
+                controller = simulatable
+        self.red_thresholds = {
+            self.config.ROAD_IDS["Vertical Road"]: self.config.VERTICAL_ROAD_CAR_THRESHOLD,
+            self.config.ROAD_IDS["Horizontal Road"]: self.config.HORIZONTAL_ROAD_CAR_THRESHOLD
+        }
+        # Signal timings as whole steps, accumulated the same way SignalController accumulates them
+        self.min_green_steps = self.count_steps_to_reach(self.config.MIN_GREEN_DURATION * self.config.SPEED_FACTOR)
+        self.max_green_steps = self.count_steps_to_reach(self.config.MAX_GREEN_DURATION * self.config.SPEED_FACTOR)
+        self.both_red_steps = self.count_steps_to_run_out(controller.both_signals_red_duration)
+
+        self.events = []
+        self.event_sequence = 0
+        self.events_processed = 0
+        self.last_step = 0
+        self.arrival_step = 1
+        self.arrival_road_index = 0
+        self.next_spawn_index = 0
+        self.red_vehicles_step = 0  # Latest step with a scheduled handle_red_vehicles event
+
+        # Controller state
+        self.green_road_id = None     # None while both signals are red
+        self.red_road_id = None
+        self.phase_start_step = 0
+        self.phase_version = 0
+        self.queue_check_armed = False  # Minimum green has passed; toggle as soon as the red queue exceeds its threshold
+
+        # Waiting counts (as seen at the start of a step) and their integrals
+        self.waiting_counts = {road.getRoadID(): 0 for road in self.roads}
+        self.latest_change_step = 0   # Changes are made one step before they take effect
+        self.latest_changes = {}
+        self.integral_step = 1
+        self.metrics = {
+            "times": [],
+            "waiting_counts": [],
+            "vertical_waiting_counts": [],
+            "horizontal_waiting_counts": [],
+            "integral_waiting": 0.0,
+            "integral_vertical_waiting": 0.0,
+            "integral_horizontal_waiting": 0.0,
+            "total_virtual_time": 0.0,
+
+            "next_vehicle_spawn_index": 0,
+            "final_wait_times": [],
+            "wait_statistics": WaitTimeStatistics(self.config)
+        }
+
+    def count_steps_to_reach(self, duration: float) -> int:
+        """Number of steps of step_time accumulated until `duration` is reached"""
+        elapsed = 0.0
+        steps = 0
+        while elapsed < duration:
+            elapsed += self.step_time
+            steps += 1
+        return max(steps, 1)
+
+    def count_steps_to_run_out(self, duration: float) -> int:
+        """Number of steps of step_time counted down from `duration` until it runs out"""
+        remaining = duration
+        steps = 0
+        while True:
+            remaining -= self.step_time
+            steps += 1
+            if remaining <= 0.0:
+                return steps
+
+    def schedule(self, step: int, phase: int, handler, *args) -> None:
+        """Queue an event; events are ordered by step, then phase, then scheduling order"""
+        self.event_sequence += 1
+        heapq.heappush(self.events, (step, phase, self.event_sequence, handler, args))
+
+    # ----------------------------------
+    # === RUN
+    # ----------------------------------
+    def run(self, stop_virtual_time: float) -> dict:
+        """Run until stop_virtual_time and return a metrics dictionary shaped like ScenarioHandler.metrics"""
+        # Same number of steps as the stepped loop, whose timer accumulates step_time until the stop time
+        self.last_step = self.count_steps_to_reach(stop_virtual_time)
+        self.record_waiting_sample(1)
+
+        for road_id, green in self.signal_green.items():
+            if green:
+                self.start_green_phase(road_id, 0)
+        self.schedule_next_arrival()
+
+        while self.events:
+            step, phase, _, handler, args = heapq.heappop(self.events)
+            if step > self.last_step:
+                break
+            self.events_processed += 1
+            handler(step, *args)
+
+        self.finalize()
+        return self.metrics
+
+    def finalize(self) -> None:
+        """Close the waiting-count integrals and record wait times of vehicles still on the roads"""
+        self.flush_waiting_integral(self.last_step + 1)
+        self.metrics["total_virtual_time"] = self.last_step * self.step_time
+        remaining = [vehicle for road_lanes in self.lanes.values() for lane in road_lanes.values() for vehicle in lane]
+        for vehicle in sorted(remaining, key=lambda v: v.spawn_index):
+            if vehicle.waiting:
+                vehicle.wait_steps += self.last_step - vehicle.stop_step
+            self.record_wait_time(vehicle)
+        self.metrics["next_vehicle_spawn_index"] = self.next_spawn_index
+
+    # ----------------------------------
+    # === ARRIVALS
+    # ----------------------------------
+    def schedule_next_arrival(self) -> None:
+        """Draw per-step spawn chances in the same order as stepSimulation until the next successful draw"""
+        while self.arrival_step <= self.last_step:
+            road = self.roads[self.arrival_road_index]
+            step = self.arrival_step
+            self.arrival_road_index += 1
+            if self.arrival_road_index == len(self.roads):
+                self.arrival_road_index = 0
+                self.arrival_step += 1
+            if road.draw_spawn_chance() < self.spawn_probabilities[road.getRoadID()]:
+                # Lane choice is drawn right away, as Road.try_spawn_vehicle_in_lane does
+                first_lane = road.choose_spawn_lane()
+                self.schedule(step, self.SPAWN, self.handle_arrival, road, first_lane)
+                return
+
+    def handle_arrival(self, step: int, road, first_lane: str) -> None:
+        road_id = road.getRoadID()
+        second_lane = "left_lane" if first_lane == "right_lane" else "right_lane"
+        for lane_id in (first_lane, second_lane):
+            if self.can_spawn_in_lane(road_id, lane_id, step):
+                self.spawn_vehicle(road_id, lane_id, step)
+                break
+        self.schedule_next_arrival()
+
+    def can_spawn_in_lane(self, road_id: str, lane_id: str, step: int) -> bool:
+        """Same test as Road.can_spawn_in_lane (pygame.Rect truncates positions to ints) on the lane's tail"""
+        lane = self.lanes[road_id][lane_id]
+        if not lane:
+            return True
+        tail = lane[-1]
+        if tail.free:
+            self.advance(tail, step - 1)
+        start_position = self.get_start_position(road_id, lane_id)
+        # Extent of the spawn rectangle along the direction of travel
+        if road_id == self.config.ROAD_IDS["Vertical Road"]:
+            spawn_length = self.config.graphics.VEHICLE_HEIGHT
+        else:
+            spawn_length = self.config.graphics.VEHICLE_WIDTH
+        tail_start = int(tail.position + self.spawn_gap)
+        return not (tail_start + self.vehicle_length > start_position and tail_start < start_position + spawn_length)
+
+    def get_start_position(self, road_id: str, lane_id: str) -> float:
+        x, y = self.config.graphics.LANE_STARTING_POSITIONS[f"{road_id}_{lane_id}"]
+        return y if road_id == self.config.ROAD_IDS["Vertical Road"] else x
+
+    def spawn_vehicle(self, road_id: str, lane_id: str, step: int) -> None:
+        vehicle = EventVehicle(self.next_spawn_index, road_id, lane_id, step, self.get_start_position(road_id, lane_id))
+        self.next_spawn_index += 1
+        self.lanes[road_id][lane_id].append(vehicle)
+        if self.signal_green[road_id]:
+            self.schedule_exit(vehicle)
+        else:
+            self.schedule_red_vehicles(step)
+
+    # ----------------------------------
+    # === VEHICLES ON RED ROADS (same rules as Vehicle.handle_red_signal)
+    # ----------------------------------
+    def schedule_red_vehicles(self, step: int) -> None:
+        """Make sure the vehicles on red roads are updated in the given step"""
+        if step > self.red_vehicles_step:
+            self.red_vehicles_step = step
+            self.schedule(step, self.RED_VEHICLES, self.handle_red_vehicles)
+
+    def handle_red_vehicles(self, step: int) -> None:
+        """Update every vehicle on a red road that isn't asleep, front to back, as stepSimulation does"""
+        any_awake = False
+        for road_id, road_lanes in self.lanes.items():
+            if self.signal_green[road_id]:
+                continue
+            for lane in road_lanes.values():
+                leader = None
+                for vehicle in list(lane):
+                    if not vehicle.asleep:
+                        self.update_on_red(vehicle, leader, step)
+                        if vehicle.position < -self.vehicle_length:
+                            # Left the screen; the vehicle behind it sees the leader this vehicle had
+                            lane.remove(vehicle)
+                            self.record_wait_time(vehicle)
+                            continue
+                        any_awake = any_awake or not vehicle.asleep
+                    leader = vehicle
+        if any_awake:
+            self.schedule_red_vehicles(step + 1)
+
+    def update_on_red(self, vehicle: EventVehicle, leader, step: int) -> None:
+        """One step of Vehicle.simulate at a red signal, with the leader already updated in this step"""
+        stop_line = self.config.graphics.STOP_LINE_POSITIONS[vehicle.road_id]
+        position = vehicle.position
+        next_position = position - self.step_pixels
+        waiting = vehicle.waiting
+        if leader is not None and next_position < leader.position + self.vehicle_length + self.min_gap_px:
+            # Clamped behind the leader whether it moves or not
+            position = leader.position + self.vehicle_length + self.min_gap_px
+            waiting = True
+        elif position > stop_line and next_position < stop_line:
+            position = stop_line
+            waiting = True
+        elif stop_line - 5 <= position <= stop_line:
+            waiting = True
+        elif position < stop_line - 5:
+            waiting = False
+        elif leader is not None and leader.waiting:
+            waiting = (position - leader.position) - self.vehicle_length <= self.min_gap_px
+        if not waiting:
+            position = next_position
+        vehicle.position = position
+        vehicle.position_step = step
+        if waiting and not vehicle.waiting:
+            self.start_waiting(vehicle, step)
+        elif vehicle.waiting and not waiting:
+            self.stop_waiting(vehicle, step)
+        if waiting:
+            vehicle.asleep = self.can_sleep(vehicle, leader)
+
+    def can_sleep(self, vehicle: EventVehicle, leader) -> bool:
+        """Same test as Vehicle.can_sleep for a waiting vehicle on a red road"""
+        if leader is not None:
+            return leader.asleep and vehicle.position == leader.position + self.vehicle_length + self.min_gap_px
+        stop_line = self.config.graphics.STOP_LINE_POSITIONS[vehicle.road_id]
+        return stop_line - 5 <= vehicle.position <= stop_line or vehicle.position - self.step_pixels > stop_line
+
+    def start_waiting(self, vehicle: EventVehicle, step: int) -> None:
+        vehicle.waiting = True
+        vehicle.stop_step = step
+        self.change_waiting_count(step + 1, vehicle.road_id, 1)
+        if vehicle.road_id == self.red_road_id and self.queue_check_armed:
+            self.schedule(step + 1, self.SIGNAL, self.handle_queue_check, self.phase_version)
+
+    def stop_waiting(self, vehicle: EventVehicle, step: int) -> None:
+        """The vehicle moves again from this step on"""
+        vehicle.wait_steps += step - vehicle.stop_step
+        vehicle.waiting = False
+        self.change_waiting_count(step + 1, vehicle.road_id, -1)
+
+    # ----------------------------------
+    # === VEHICLES ON GREEN ROADS
+    # ----------------------------------
+    def advance(self, vehicle: EventVehicle, step: int) -> None:
+        """Bring a freely driving vehicle's position up to the end of the given step"""
+        position = vehicle.position
+        for _ in range(step - vehicle.position_step):
+            position -= self.step_pixels
+        vehicle.position = position
+        vehicle.position_step = step
+
+    def schedule_exit(self, vehicle: EventVehicle) -> None:
+        """Schedule the step in which a freely driving vehicle leaves the screen"""
+        vehicle.free = True
+        vehicle.version += 1
+        position = vehicle.position
+        step = vehicle.position_step
+        while position >= -self.vehicle_length:
+            position -= self.step_pixels
+            step += 1
+        self.schedule(step, self.EXIT, self.handle_exit, vehicle, vehicle.version)
+
+    def handle_exit(self, step: int, vehicle: EventVehicle, version: int) -> None:
+        if version != vehicle.version:
+            return
+        self.lanes[vehicle.road_id][vehicle.lane_id].remove(vehicle)
+        self.record_wait_time(vehicle)
+
+    def record_wait_time(self, vehicle: EventVehicle) -> None:
+        wait_time = vehicle.wait_steps * self.step_time
+        self.metrics["final_wait_times"].append((vehicle.spawn_index, wait_time))
+        self.metrics["wait_statistics"].add(vehicle.road_id, vehicle.lane_id, wait_time)
+
+    # ----------------------------------
+    # === SIGNALS (same rules as SignalController.simulate)
+    # ----------------------------------
+    def start_green_phase(self, road_id: str, step: int) -> None:
+        self.green_road_id = road_id
+        self.red_road_id = [other for other in self.signal_green if other != road_id][0]
+        self.phase_start_step = step
+        self.phase_version += 1
+        self.queue_check_armed = False
+        self.schedule(step + self.min_green_steps, self.SIGNAL, self.handle_min_green, self.phase_version)
+        self.schedule(step + self.max_green_steps, self.SIGNAL, self.handle_max_green, self.phase_version)
+
+    def handle_min_green(self, step: int, phase_version: int) -> None:
+        if phase_version != self.phase_version:
+            return
+        self.queue_check_armed = True
+        self.handle_queue_check(step, phase_version)
+
+    def handle_queue_check(self, step: int, phase_version: int) -> None:
+        if phase_version != self.phase_version:
+            return
+        # The controller sees the count as of the start of the step, before this step's spawns
+        red_wait_count = self.waiting_counts[self.red_road_id]
+        if self.latest_change_step == step + 1:
+            red_wait_count -= self.latest_changes[self.red_road_id]
+        if red_wait_count > self.red_thresholds[self.red_road_id]:
+            self.toggle_signals(step)
+
+    def handle_max_green(self, step: int, phase_version: int) -> None:
+        if phase_version != self.phase_version:
+            return
+        self.toggle_signals(step)
+
+    def toggle_signals(self, step: int) -> None:
+        """Both signals red now, the currently red road turns green after the both-red duration"""
+        next_green_road_id = self.red_road_id
+        self.phase_version += 1
+        self.queue_check_armed = False
+        self.set_red(self.green_road_id, step)
+        self.green_road_id = None
+        self.schedule(step + self.both_red_steps, self.SIGNAL, self.handle_both_red_end, next_green_road_id)
+
+    def handle_both_red_end(self, step: int, road_id: str) -> None:
+        self.set_green(road_id, step)
+        self.start_green_phase(road_id, step)
+
+    def set_red(self, road_id: str, step: int) -> None:
+        """Red onset: the road's vehicles are updated step by step from now on"""
+        self.signal_green[road_id] = False
+        for lane in self.lanes[road_id].values():
+            for vehicle in lane:
+                if vehicle.free:
+                    self.advance(vehicle, step - 1)
+                    vehicle.free = False
+                    vehicle.version += 1
+        self.schedule_red_vehicles(step)
+
+    def set_green(self, road_id: str, step: int) -> None:
+        """Green onset: waiting vehicles discharge and every vehicle drives to its exit"""
+        self.signal_green[road_id] = True
+        for lane in self.lanes[road_id].values():
+            for vehicle in lane:
+                vehicle.asleep = False
+                if vehicle.waiting:
+                    self.stop_waiting(vehicle, step)
+                # Vehicles on a red road were last updated in the previous step or are standing still
+                vehicle.position_step = step - 1
+                self.schedule_exit(vehicle)
+
+    # ----------------------------------
+    # === WAITING-COUNT METRICS
+    # ----------------------------------
+    def change_waiting_count(self, effective_step: int, road_id: str, delta: int) -> None:
+        """Change a road's waiting count from effective_step on"""
+        if effective_step != self.latest_change_step:
+            self.latest_change_step = effective_step
+            self.latest_changes = {other_road_id: 0 for other_road_id in self.waiting_counts}
+        self.latest_changes[road_id] += delta
+        if effective_step > self.last_step:
+            # Takes effect after the run: close the integrals with the counts of the last step first
+            self.flush_waiting_integral(self.last_step + 1)
+            self.waiting_counts[road_id] += delta
+            return
+        self.flush_waiting_integral(effective_step)
+        self.waiting_counts[road_id] += delta
+        self.record_waiting_sample(effective_step)
+
+    def flush_waiting_integral(self, up_to_step: int) -> None:
+        """Integrate the current counts over the steps since the last change"""
+        duration = (up_to_step - self.integral_step) * self.step_time
+        vertical = self.waiting_counts[self.config.ROAD_IDS["Vertical Road"]]
+        horizontal = self.waiting_counts[self.config.ROAD_IDS["Horizontal Road"]]
+        self.metrics["integral_waiting"] += (vertical + horizontal) * duration
+        self.metrics["integral_vertical_waiting"] += vertical * duration
+        self.metrics["integral_horizontal_waiting"] += horizontal * duration
+        self.integral_step = up_to_step
+
+    def record_waiting_sample(self, step: int) -> None:
+        vertical = self.waiting_counts[self.config.ROAD_IDS["Vertical Road"]]
+        horizontal = self.waiting_counts[self.config.ROAD_IDS["Horizontal Road"]]
+        time = step * self.step_time
+        if self.metrics["times"] and self.metrics["times"][-1] == time:
+            # Several changes in the same step: keep only the last
+            self.metrics["times"].pop()
+            self.metrics["waiting_counts"].pop()
+            self.metrics["vertical_waiting_counts"].pop()
+            self.metrics["horizontal_waiting_counts"].pop()
+        self.metrics["times"].append(time)
+        self.metrics["waiting_counts"].append(vertical + horizontal)
+        self.metrics["vertical_waiting_counts"].append(vertical)
+        self.metrics["horizontal_waiting_counts"].append(horizontal)
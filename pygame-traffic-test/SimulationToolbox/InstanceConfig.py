@@ -0,0 +1,38 @@
+class InstanceConfig:
+    """Base of the configuration classes: the class constants are the defaults, and an instance
+    overrides some of them for one scenario without touching the class or any other instance.
+
+    Reads on an instance fall through to the class for every constant it doesn't override, so code
+    that receives a config instance sees the same values as before unless that instance says otherwise.
+    """
+
+    def __init__(self, overrides: dict = None):
+        for name, value in (overrides or {}).items():
+            self.set(name, value)
+
+    def set(self, name: str, value) -> None:
+        """Override one constant; "NAME.key" overrides one entry of a dictionary constant
+        (e.g. "TRAFFIC_INTENSITIES.medium") in a copy owned by this instance"""
+        attribute, _, key = name.partition(".")
+        if not attribute.isupper() or not hasattr(type(self), attribute):
+            raise KeyError(f"Unknown {type(self).__name__} parameter: {attribute}")
+        if key:
+            entries = dict(getattr(self, attribute))
+            entries[key] = value
+            value = entries
+        setattr(self, attribute, value)
+
+    def get_overrides(self) -> dict:
+        """Constants this instance overrides, by name"""
+        return {name: value for name, value in vars(self).items() if name.isupper()}
+
+    def get_values(self) -> dict:
+        """Every constant's effective value for this instance, by name"""
+        return {name: getattr(self, name) for name in dir(type(self)) if name.isupper()}
+
+    def copy(self, overrides: dict = None):
+        """New instance with this one's overrides plus `overrides`"""
+        config = type(self).__new__(type(self))
+        config.__dict__.update(self.__dict__)
+        InstanceConfig.__init__(config, overrides)
+        return config
@@ -0,0 +1,278 @@
+import numpy as np
+
+
+class QueueModelSimulator:
+    """Mesoscopic queue model of the intersection, for K configurations (or seeds) in lock step.
+
+    Each lane of a Road is a point queue instead of a list of vehicle positions. Spawned vehicles
+    travel at VEHICLE_VELOCITY_MPS towards the stop line, kept only as the step they will reach it in
+    (a first-in first-out ring per lane, since nobody overtakes). On red (and while both signals are red), vehicles join the queue when
+    they reach its tail, QUEUE_MODEL_JAM_SPACING_METERS per queued vehicle before the stop line; on
+    green, the queue discharges one vehicle per QUEUE_MODEL_SATURATION_HEADWAY virtual seconds per lane
+    (0: the whole queue at once, as in the microscopic model where every queued vehicle starts on green)
+    and arriving vehicles pass if nothing is queued. Spawns are blocked while the queue reaches back to
+    the lane start or the last vehicle hasn't cleared the spawn area, like Road.can_spawn_in_lane.
+
+    A vehicle's wait is the number of steps between joining and leaving the queue (kept per lane in a
+    ring of join steps), so wait times and waiting counts are accounted exactly as in the
+    microscopic engines. The signal controller is SignalController.simulate's rule applied to every
+    instance (as in ReplicationBatchSimulator), fed with the queue lengths.
+
+    Instances are given as configs (default: the scenario's): each brings its own signal timings,
+    thresholds and QUEUE_MODEL_* parameters, while the layout and step come from the scenario. Spawn
+    probabilities may be one value per road or an array of one value per instance. Randomness comes
+    from a NumPy Generator (`rng`), drawn per road as K spawn chances and K lane choices.
+
+    The model only pays off as a batch (see Experiments.QueueModelCalibration): a single instance
+    spends its steps on NumPy call overhead and is slower than the stepped loop.
+    """
+
+    NO_GREEN = -1  # green_road value while both signals are red
+
+    def __init__(self, scenario, step_time: float, spawn_probabilities: dict, configs: list = None, rng=None):
+        """`scenario` must already be built; it only provides the road/lane layout and geometry"""
+        self.config = scenario.config
+        configs = configs if configs is not None else [scenario.config]
+        self.instances = len(configs)
+        self.step_time = step_time
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.step_pixels = self.config.VEHICLE_VELOCITY_MPS * step_time * self.config.PIXELS_PER_METER
+        spawn_clearance = self.config.graphics.VEHICLE_SPAWN_GAP_METERS * self.config.PIXELS_PER_METER + self.config.graphics.VEHICLE_WIDTH
+
+        # Lane layout: lanes of road r are the consecutive lane indices road_first_lane[r], ...
+        self.road_ids = []
+        self.road_first_lane = []
+        self.road_lane_count = []
+        self.spawn_probabilities = []
+        lane_road, distances = [], []
+        for road_index, road in enumerate(scenario.getRoads()):
+            road_id = road.getRoadID()
+            self.road_ids.append(road_id)
+            self.road_first_lane.append(len(lane_road))
+            self.road_lane_count.append(len(road.vehicle_lanes))
+            self.spawn_probabilities.append(np.broadcast_to(np.asarray(spawn_probabilities[road_id], dtype=np.float64), (self.instances,)))
+            for lane_id in road.vehicle_lanes:
+                x, y = self.config.graphics.LANE_STARTING_POSITIONS[f"{road_id}_{lane_id}"]
+                start_position = y if road_id == self.config.ROAD_IDS["Vertical Road"] else x
+                lane_road.append(road_index)
+                distances.append(start_position - self.config.graphics.STOP_LINE_POSITIONS[road_id])
+        self.lanes = len(lane_road)
+        self.lane_road = np.array(lane_road)
+        self.vertical_road_index = self.road_ids.index(self.config.ROAD_IDS["Vertical Road"])
+        self.horizontal_road_index = self.road_ids.index(self.config.ROAD_IDS["Horizontal Road"])
+
+        # Rows are (instance, lane) pairs, instance-major: row = instance * lanes + lane
+        rows = self.instances * self.lanes
+        self.row_instance = np.repeat(np.arange(self.instances), self.lanes)
+        self.row_lane = np.tile(np.arange(self.lanes), self.instances)
+        distance = np.array(distances, dtype=np.float64)[self.row_lane]
+        self.travel_steps = np.ceil(distance / self.step_pixels).astype(np.int64)  # Steps from the lane start to the stop line
+        self.spawn_clearance_steps = spawn_clearance / self.step_pixels  # Steps a new vehicle blocks the spawn area for
+        self.jam_spacing = np.array([config.QUEUE_MODEL_JAM_SPACING_METERS * config.PIXELS_PER_METER for config in configs])[self.row_instance]
+        # Spawning is blocked once the queue tail overlaps the spawn area: from this queue length on
+        self.max_queue = np.floor((distance - spawn_clearance) / self.jam_spacing).astype(np.int64) + 2
+        headways = np.array([config.QUEUE_MODEL_SATURATION_HEADWAY for config in configs])
+        self.discharge_per_step = np.where(headways > 0.0, step_time / np.where(headways > 0.0, headways, 1.0), np.inf)[self.row_instance]
+
+        # Lane state: ring of the arrival steps (at the stop line) of the driving vehicles, ring of the
+        # join steps of the queued vehicles; each ring is read at its removed count and written at its added count
+        self.driving_capacity = int(self.travel_steps.max()) + 2
+        self.arrival_steps = np.zeros((rows, self.driving_capacity), dtype=np.int64)
+        self.entered = np.zeros(rows, dtype=np.int64)
+        self.arrived = np.zeros(rows, dtype=np.int64)
+        self.last_spawn_step = np.full(rows, -(1 << 40), dtype=np.int64)
+        self.ring_capacity = int(self.max_queue.max()) + self.driving_capacity + 2
+        self.join_steps = np.zeros((rows, self.ring_capacity), dtype=np.int64)
+        self.joined = np.zeros(rows, dtype=np.int64)
+        self.released = np.zeros(rows, dtype=np.int64)
+        self.queue = np.zeros(rows, dtype=np.int64)
+        self.discharge_credit = np.zeros(rows)
+
+        # Controller state, one entry per instance (vertical green first, see ensure_opposite_initial_signals)
+        self.green_road = np.full(self.instances, self.vertical_road_index)
+        self.post_toggle_green_road = np.full(self.instances, self.NO_GREEN)
+        self.virtual_time_elapsed = np.zeros(self.instances)
+        self.both_signals_red_remaining_time = np.zeros(self.instances)
+        self.both_signals_red_duration = np.array([config.BOTH_SIGNALS_RED_DURATION * config.SPEED_FACTOR for config in configs])
+        self.min_green = np.array([config.MIN_GREEN_DURATION * config.SPEED_FACTOR for config in configs])
+        self.max_green = np.array([config.MAX_GREEN_DURATION * config.SPEED_FACTOR for config in configs])
+        self.vertical_threshold = np.array([config.VERTICAL_ROAD_CAR_THRESHOLD for config in configs])
+        self.horizontal_threshold = np.array([config.HORIZONTAL_ROAD_CAR_THRESHOLD for config in configs])
+
+        # Metrics
+        self.step_index = 0
+        self.timer = 0.0
+        self.integral_vertical_waiting = np.zeros(self.instances)
+        self.integral_horizontal_waiting = np.zeros(self.instances)
+        self.integral_waiting = np.zeros(self.instances)
+        self.total_virtual_time = 0.0
+        self.passed_without_wait = np.zeros(rows, dtype=np.int64)  # Vehicles that reached a green with nothing queued
+        self.release_records = []  # (row, wait_time) arrays, one tuple per step with queue discharges
+
+    # ----------------------------------
+    # === RUN LOOP
+    # ----------------------------------
+    def run(self, stop_virtual_time: float) -> None:
+        while self.timer < stop_virtual_time:
+            self.step()
+        self.finalize()
+
+    def step(self) -> None:
+        delta_time = self.step_time
+        self.step_index += 1
+        self.timer += delta_time
+        waiting_counts = self.record_waiting_sample(delta_time)
+        self.spawn_vehicles()
+        self.update_signals(delta_time, waiting_counts)
+        self.update_lanes()
+
+    def finalize(self) -> None:
+        """Release every queued vehicle with the wait so far and count the ones still driving as not waiting"""
+        self.release(self.queue.copy())
+        self.passed_without_wait += self.entered - self.arrived
+        self.arrived[:] = self.entered
+
+    # ----------------------------------
+    # === METRICS
+    # ----------------------------------
+    def get_road_counts(self, row_values: np.ndarray) -> np.ndarray:
+        """Sum of per-row values by road, (K, roads)"""
+        lane_values = row_values.reshape(self.instances, self.lanes)
+        return np.stack([lane_values[:, first:first + count].sum(axis=1) for first, count in zip(self.road_first_lane, self.road_lane_count)], axis=1)
+
+    def record_waiting_sample(self, delta_time: float) -> np.ndarray:
+        """Per-step waiting counts by road (K, roads) and their integrals"""
+        waiting_counts = self.get_road_counts(self.queue)
+        vertical_waiting_count = waiting_counts[:, self.vertical_road_index]
+        horizontal_waiting_count = waiting_counts[:, self.horizontal_road_index]
+        self.integral_waiting += (vertical_waiting_count + horizontal_waiting_count) * delta_time
+        self.integral_vertical_waiting += vertical_waiting_count * delta_time
+        self.integral_horizontal_waiting += horizontal_waiting_count * delta_time
+        self.total_virtual_time += delta_time
+        return waiting_counts
+
+    def get_wait_totals(self) -> tuple:
+        """Per-instance number of finished vehicles and sum of their wait times"""
+        vehicles = np.bincount(self.row_instance, weights=self.passed_without_wait, minlength=self.instances)
+        wait_sums = np.zeros(self.instances)
+        for row, wait_time in self.release_records:
+            instance = self.row_instance[row]
+            vehicles += np.bincount(instance, minlength=self.instances)
+            wait_sums += np.bincount(instance, weights=wait_time, minlength=self.instances)
+        return vehicles, wait_sums
+
+    def get_summaries(self) -> dict:
+        """Per-instance averages as arrays of K values, with the names of the sweep summary metrics"""
+        vehicles, wait_sums = self.get_wait_totals()
+        duration = self.total_virtual_time if self.total_virtual_time > 0.0 else 1.0
+        return {
+            "average_waiting_vehicles": self.integral_waiting / duration,
+            "vertical_average_waiting_vehicles": self.integral_vertical_waiting / duration,
+            "horizontal_average_waiting_vehicles": self.integral_horizontal_waiting / duration,
+            "average_vehicle_wait_time": wait_sums / np.maximum(vehicles, 1),
+            "vehicles": vehicles,
+        }
+
+    # ----------------------------------
+    # === SPAWNING
+    # ----------------------------------
+    def spawn_vehicles(self) -> None:
+        """Road.try_spawn_vehicle_in_lane for every instance: first choice lane, else the other lane"""
+        recently_spawned = (self.step_index - self.last_spawn_step) < self.spawn_clearance_steps
+        blocked = (recently_spawned | (self.queue >= self.max_queue)).reshape(self.instances, self.lanes)
+
+        for road_index in range(len(self.road_ids)):
+            spawning = np.nonzero(self.rng.random(self.instances) < self.spawn_probabilities[road_index])[0]
+            first_choice = self.rng.integers(0, self.road_lane_count[road_index], size=self.instances)[spawning]
+            if len(spawning) == 0:
+                continue
+            lane_count = self.road_lane_count[road_index]
+            lane = np.full(len(spawning), -1)
+            for offset in reversed(range(lane_count)):
+                candidate = self.road_first_lane[road_index] + (first_choice + offset) % lane_count
+                lane = np.where(~blocked[spawning, candidate], candidate, lane)
+            spawned = lane >= 0
+            row = spawning[spawned] * self.lanes + lane[spawned]
+            # A vehicle makes its first move in the step it spawns, and reaches the stop line travel_steps later
+            self.arrival_steps[row, self.entered[row] % self.driving_capacity] = self.step_index + self.travel_steps[row]
+            self.entered[row] += 1
+            self.last_spawn_step[row] = self.step_index
+
+    # ----------------------------------
+    # === SIGNAL CONTROLLER
+    # ----------------------------------
+    def update_signals(self, delta_time: float, waiting_counts: np.ndarray) -> None:
+        """SignalController.simulate for every instance"""
+        in_both_red = self.both_signals_red_remaining_time > 0.0
+        self.both_signals_red_remaining_time[in_both_red] -= delta_time
+        switching = in_both_red & (self.both_signals_red_remaining_time <= 0.0)
+        self.green_road[switching] = self.post_toggle_green_road[switching]
+        self.post_toggle_green_road[switching] = self.NO_GREEN
+
+        running = ~in_both_red
+        self.virtual_time_elapsed[running] += delta_time
+        vertical_green = self.green_road == self.vertical_road_index
+        red_wait_count = np.where(vertical_green, waiting_counts[:, self.horizontal_road_index], waiting_counts[:, self.vertical_road_index])
+        red_thresh = np.where(vertical_green, self.horizontal_threshold, self.vertical_threshold)
+        toggling = running & ((self.virtual_time_elapsed >= self.max_green) | ((self.virtual_time_elapsed >= self.min_green) & (red_wait_count > red_thresh)))
+        self.post_toggle_green_road[toggling] = np.where(vertical_green[toggling], self.horizontal_road_index, self.vertical_road_index)
+        self.green_road[toggling] = self.NO_GREEN
+        self.both_signals_red_remaining_time[toggling] = self.both_signals_red_duration[toggling]
+        self.virtual_time_elapsed[toggling] = 0.0
+
+    # ----------------------------------
+    # === LANES
+    # ----------------------------------
+    def update_lanes(self) -> None:
+        """Discharge green queues, then let arriving vehicles pass or join the queue tail"""
+        is_green = self.green_road[self.row_instance] == self.lane_road[self.row_lane]
+
+        # Green: discharge at the saturation flow
+        self.discharge_credit = np.where(is_green, self.discharge_credit + self.discharge_per_step, 0.0)
+        discharged = np.minimum(self.queue, np.floor(np.minimum(self.discharge_credit, self.ring_capacity)).astype(np.int64))
+        self.discharge_credit -= discharged
+        self.release(discharged)
+        self.discharge_credit[self.queue == 0] = 0.0
+
+        # A vehicle reaching the stop line passes a green with nothing queued (at most one per lane and step)
+        has_driving = self.entered > self.arrived
+        front_arrival = self.arrival_steps[np.arange(len(self.arrived)), self.arrived % self.driving_capacity]
+        passing = has_driving & is_green & (self.queue == 0) & (front_arrival <= self.step_index)
+        self.passed_without_wait += passing
+        self.arrived += passing
+
+        # Anyone else joins the queue on reaching its tail, which moves back with every vehicle that joins
+        row = np.nonzero(self.entered > self.arrived)[0]
+        while len(row) > 0:
+            front_arrival = self.arrival_steps[row, self.arrived[row] % self.driving_capacity]
+            reach = np.where(is_green[row], 0.0, self.queue[row] * self.jam_spacing[row] / self.step_pixels)
+            row = row[front_arrival - self.step_index <= reach]
+            self.arrived[row] += 1
+            self.join(row)
+            row = row[self.entered[row] > self.arrived[row]]
+
+    def join(self, row: np.ndarray) -> None:
+        """Append one vehicle joining in this step to the queue of each of the rows"""
+        self.join_steps[row, self.joined[row] % self.ring_capacity] = self.step_index
+        self.joined[row] += 1
+        self.queue[row] += 1
+
+    def release(self, counts: np.ndarray) -> None:
+        """Remove the first counts[row] vehicles of each row's queue and record their wait times"""
+        row, ordinal = self.expand(counts, self.released)
+        if len(row) == 0:
+            return
+        wait_time = (self.step_index - self.join_steps[row, ordinal % self.ring_capacity]) * self.step_time
+        self.release_records.append((row, wait_time))
+        self.released += counts
+        self.queue -= counts
+
+    @staticmethod
+    def expand(counts: np.ndarray, first_ordinals: np.ndarray) -> tuple:
+        """Row and queue ordinal of every vehicle in the ranges [first_ordinals[row], first_ordinals[row] + counts[row])"""
+        total = int(counts.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        row = np.repeat(np.arange(len(counts)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        return row, first_ordinals[row] + offsets
@@ -0,0 +1,24 @@
+import hashlib
+import random
+import numpy as np
+
+class RandomStreams:
+    """Independent random streams derived from one run seed, by name.
+
+    Each stream's seed is a hash of the run seed and the stream's name (e.g. "vertical_road/spawn"),
+    so a stream gives the same numbers for the same run seed whatever else draws random numbers in the
+    run or in the process: other roads, a different controller, another engine or pool worker.
+    """
+
+    def __init__(self, seed: int):
+        self.seed = seed
+
+    def get_seed(self, name: str) -> int:
+        digest = hashlib.sha256(f"{self.seed}/{name}".encode()).digest()
+        return int.from_bytes(digest[:8], "little")
+
+    def get_random(self, name: str) -> random.Random:
+        return random.Random(self.get_seed(name))
+
+    def get_generator(self, name: str) -> np.random.Generator:
+        return np.random.default_rng(self.get_seed(name))
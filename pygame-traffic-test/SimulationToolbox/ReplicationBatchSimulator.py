@@ -0,0 +1,332 @@
+
+from Metrics.WaitTimeStatistics import WaitTimeStatistics
+
+import numpy as np
+
+
+class ReplicationBatchSimulator:
+    """Runs K independent replications of the intersection model in lock step.
+
+    Every piece of state carries a leading replication axis: vehicles live in (K, lanes, capacity)
+    arrays ordered front first within each lane (like LaneArrays in VectorizedSimulator, with empty
+    slots at the back), the signal controller state is one entry per replication and each step draws K
+    spawn chances per road. One step of the batch advances all replications with the same array
+    operations, whose cost grows with the number of vehicles on top of a fixed cost per step: at the
+    default traffic, 1,000 replications take about eight times as long as one.
+
+    The vehicle and controller rules are those of Vehicle.simulate and SignalController.simulate, in the
+    order of ScenarioHandler.stepSimulation. Randomness comes from a NumPy Generator shared by the batch
+    (`rng`), drawn per road as K spawn chances followed by one lane choice per spawning replication.
+    """
+
+    NO_GREEN = -1                 # green_road value while both signals are red
+    EMPTY_POSITION = 1.0e9        # Position of empty slots: behind every spawn area, never off screen
+
+    def __init__(self, scenario, step_time: float, spawn_probabilities: dict, replications: int, rng=None, capacity: int = 16):
+        """`scenario` must already be built; it only provides the road/lane layout and traffic intensities.
+        spawn_probabilities maps road id to spawn chance per step.
+        """
+        self.config = scenario.config
+        self.replications = replications
+        self.step_time = step_time
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.step_pixels = self.config.VEHICLE_VELOCITY_MPS * step_time * self.config.PIXELS_PER_METER
+        self.min_gap = self.config.graphics.VEHICLE_MIN_GAP_METERS * self.config.PIXELS_PER_METER
+        self.spawn_gap = self.config.graphics.VEHICLE_SPAWN_GAP_METERS * self.config.PIXELS_PER_METER
+        self.vehicle_length = self.config.graphics.VEHICLE_WIDTH  # Vehicles are VEHICLE_WIDTH long along both roads
+
+        # Lane layout: lanes of road r are the consecutive lane indices road_first_lane[r], ...
+        self.road_ids = []
+        self.road_first_lane = []
+        self.road_lane_count = []
+        self.lane_keys = []  # (road id, lane id) per lane index
+        self.spawn_probabilities = []
+        lane_road, stop_lines, start_positions, spawn_lengths = [], [], [], []
+        for road_index, road in enumerate(scenario.getRoads()):
+            road_id = road.getRoadID()
+            self.road_ids.append(road_id)
+            self.road_first_lane.append(len(lane_road))
+            self.road_lane_count.append(len(road.vehicle_lanes))
+            self.spawn_probabilities.append(spawn_probabilities[road_id])
+            for lane_id in road.vehicle_lanes:
+                x, y = self.config.graphics.LANE_STARTING_POSITIONS[f"{road_id}_{lane_id}"]
+                lane_road.append(road_index)
+                self.lane_keys.append((road_id, lane_id))
+                stop_lines.append(self.config.graphics.STOP_LINE_POSITIONS[road_id])
+                if road_id == self.config.ROAD_IDS["Vertical Road"]:
+                    start_positions.append(y)
+                    spawn_lengths.append(self.config.graphics.VEHICLE_HEIGHT)
+                else:
+                    start_positions.append(x)
+                    spawn_lengths.append(self.config.graphics.VEHICLE_WIDTH)
+        self.lane_road = np.array(lane_road)
+        self.stop_lines = np.array(stop_lines, dtype=np.float64)[None, :, None]
+        self.start_positions = np.array(start_positions, dtype=np.float64)
+        self.spawn_lengths = np.array(spawn_lengths, dtype=np.float64)
+        lanes = len(lane_road)
+
+        # Vehicle state, (K, lanes, capacity); slots >= count are empty
+        shape = (replications, lanes, capacity)
+        self.position = np.full(shape, self.EMPTY_POSITION)
+        self.waiting = np.zeros(shape, dtype=bool)
+        self.wait_time = np.zeros(shape)
+        self.spawn_index = np.zeros(shape, dtype=np.int64)
+        self.count = np.zeros((replications, lanes), dtype=np.int64)
+        self.next_spawn_index = np.zeros(replications, dtype=np.int64)
+
+        # Controller state, one entry per replication (vertical green first, see ensure_opposite_initial_signals)
+        self.vertical_road_index = self.road_ids.index(self.config.ROAD_IDS["Vertical Road"])
+        self.horizontal_road_index = self.road_ids.index(self.config.ROAD_IDS["Horizontal Road"])
+        self.green_road = np.full(replications, self.vertical_road_index)
+        self.post_toggle_green_road = np.full(replications, self.NO_GREEN)
+        self.virtual_time_elapsed = np.zeros(replications)
+        self.both_signals_red_remaining_time = np.zeros(replications)
+        self.both_signals_red_duration = self.config.BOTH_SIGNALS_RED_DURATION * self.config.SPEED_FACTOR
+        self.min_green = self.config.MIN_GREEN_DURATION * self.config.SPEED_FACTOR
+        self.max_green = self.config.MAX_GREEN_DURATION * self.config.SPEED_FACTOR
+
+        # Metrics
+        self.step_index = 0
+        self.timer = 0.0
+        self.times = []
+        self.vertical_waiting_counts = []    # One (K,) array per step
+        self.horizontal_waiting_counts = []
+        self.integral_vertical_waiting = np.zeros(replications)
+        self.integral_horizontal_waiting = np.zeros(replications)
+        self.integral_waiting = np.zeros(replications)
+        self.total_virtual_time = 0.0
+        self.exit_records = []  # (replication, lane, step, spawn_index, wait_time) arrays, one tuple per step with exits
+
+    # ----------------------------------
+    # === RUN LOOP
+    # ----------------------------------
+    def run(self, stop_virtual_time: float) -> list:
+        """Step all replications until stop_virtual_time and return one metrics dictionary per replication"""
+        while self.timer < stop_virtual_time:
+            self.step()
+        return self.get_metrics()
+
+    def step(self) -> None:
+        delta_time = self.step_time
+        self.step_index += 1
+        self.timer += delta_time
+        waiting_counts = self.record_waiting_sample(delta_time)
+        self.spawn_vehicles()
+        self.update_signals(delta_time, waiting_counts)
+        self.update_vehicles()
+        self.remove_exited_vehicles()
+
+    def get_width(self) -> int:
+        """Slots in use by the longest lane; every slot from here on is empty in every lane"""
+        return int(self.count.max())
+
+    def get_valid_slots(self) -> np.ndarray:
+        return np.arange(self.position.shape[2]) < self.count[:, :, None]
+
+    # ----------------------------------
+    # === METRICS
+    # ----------------------------------
+    def record_waiting_sample(self, delta_time: float) -> np.ndarray:
+        """Per-step waiting counts by road (K, roads), integrals and per-vehicle wait accumulation"""
+        width = self.get_width()
+        waiting = self.waiting[:, :, :width]
+        lane_waiting_counts = np.count_nonzero(waiting, axis=2)
+        waiting_counts = np.zeros((self.replications, len(self.road_ids)), dtype=np.int64)
+        for road_index in range(len(self.road_ids)):
+            first_lane = self.road_first_lane[road_index]
+            waiting_counts[:, road_index] = lane_waiting_counts[:, first_lane:first_lane + self.road_lane_count[road_index]].sum(axis=1)
+        vertical_waiting_count = waiting_counts[:, self.vertical_road_index]
+        horizontal_waiting_count = waiting_counts[:, self.horizontal_road_index]
+
+        self.times.append(self.timer)
+        self.vertical_waiting_counts.append(vertical_waiting_count)
+        self.horizontal_waiting_counts.append(horizontal_waiting_count)
+        self.integral_waiting += (vertical_waiting_count + horizontal_waiting_count) * delta_time
+        self.integral_vertical_waiting += vertical_waiting_count * delta_time
+        self.integral_horizontal_waiting += horizontal_waiting_count * delta_time
+        self.total_virtual_time += delta_time
+
+        wait_time = self.wait_time[:, :, :width]
+        np.add(wait_time, delta_time, out=wait_time, where=waiting)
+        return waiting_counts
+
+    def get_metrics(self) -> list:
+        """One dictionary per replication with the keys of ScenarioHandler.metrics.
+
+        Time series are NumPy arrays (views into one (steps, K) block) rather than lists. Vehicles still
+        on the road are finalized, as ScenarioHandler.finalizeVehicleMetrics does.
+        """
+        valid = self.get_valid_slots()
+        replication, lane, _ = np.nonzero(valid)
+        self.exit_records.append((replication, lane, np.full(len(replication), self.step_index + 1), self.spawn_index[valid], self.wait_time[valid]))
+        replication, lane, step, spawn_index, wait_time = (np.concatenate(column) for column in zip(*self.exit_records))
+        order = np.lexsort((spawn_index, step, replication))
+        replication, lane, spawn_index, wait_time = replication[order], lane[order], spawn_index[order], wait_time[order]
+        boundaries = np.searchsorted(replication, np.arange(self.replications + 1))
+
+        times = np.array(self.times)
+        vertical_waiting_counts = np.array(self.vertical_waiting_counts).reshape(len(times), self.replications)
+        horizontal_waiting_counts = np.array(self.horizontal_waiting_counts).reshape(len(times), self.replications)
+        waiting_counts = vertical_waiting_counts + horizontal_waiting_counts
+        metrics = []
+        for k in range(self.replications):
+            start, stop = boundaries[k], boundaries[k + 1]
+            wait_statistics = WaitTimeStatistics(self.config)
+            for lane_index, wait in zip(lane[start:stop].tolist(), wait_time[start:stop].tolist()):
+                wait_statistics.add(*self.lane_keys[lane_index], wait)
+            metrics.append({
+                "times": times,
+                "waiting_counts": waiting_counts[:, k],
+                "vertical_waiting_counts": vertical_waiting_counts[:, k],
+                "horizontal_waiting_counts": horizontal_waiting_counts[:, k],
+                "integral_waiting": float(self.integral_waiting[k]),
+                "integral_vertical_waiting": float(self.integral_vertical_waiting[k]),
+                "integral_horizontal_waiting": float(self.integral_horizontal_waiting[k]),
+                "total_virtual_time": self.total_virtual_time,
+
+                "next_vehicle_spawn_index": int(self.next_spawn_index[k]),
+                "final_wait_times": list(zip(spawn_index[start:stop].tolist(), wait_time[start:stop].tolist())),
+                "wait_statistics": wait_statistics
+            })
+        return metrics
+
+    # ----------------------------------
+    # === SPAWNING
+    # ----------------------------------
+    def spawn_vehicles(self) -> None:
+        """Road.try_spawn_vehicle_in_lane for every replication: first choice lane, else the other lane"""
+        if self.get_width() + 1 >= self.position.shape[2]:
+            self.grow_capacity()
+        # Only a lane's tail can overlap its spawn area (see Road.can_spawn_in_lane)
+        tail_position = np.take_along_axis(self.position, np.maximum(self.count - 1, 0)[:, :, None], axis=2)[:, :, 0]
+        tail_starts = np.trunc(tail_position + self.spawn_gap)
+        overlaps = (tail_starts + self.vehicle_length > self.start_positions) & (tail_starts < self.start_positions + self.spawn_lengths)
+        blocked = (self.count > 0) & overlaps
+
+        for road_index in range(len(self.road_ids)):
+            spawning = np.nonzero(self.rng.random(self.replications) < self.spawn_probabilities[road_index])[0]
+            if len(spawning) == 0:
+                continue
+            lane_count = self.road_lane_count[road_index]
+            first_choice = self.rng.integers(0, lane_count, size=len(spawning))
+            lane = np.full(len(spawning), -1)
+            for offset in reversed(range(lane_count)):
+                candidate = self.road_first_lane[road_index] + (first_choice + offset) % lane_count
+                lane = np.where(~blocked[spawning, candidate], candidate, lane)
+            spawned = lane >= 0
+            replication, lane = spawning[spawned], lane[spawned]
+            slot = self.count[replication, lane]
+            self.position[replication, lane, slot] = self.start_positions[lane]
+            self.waiting[replication, lane, slot] = False
+            self.wait_time[replication, lane, slot] = 0.0
+            self.spawn_index[replication, lane, slot] = self.next_spawn_index[replication]
+            self.next_spawn_index[replication] += 1
+            self.count[replication, lane] += 1
+
+    def grow_capacity(self) -> None:
+        extra = self.position.shape[2]
+        pad = ((0, 0), (0, 0), (0, extra))
+        self.position = np.pad(self.position, pad, constant_values=self.EMPTY_POSITION)
+        self.waiting = np.pad(self.waiting, pad)
+        self.wait_time = np.pad(self.wait_time, pad)
+        self.spawn_index = np.pad(self.spawn_index, pad)
+
+    # ----------------------------------
+    # === SIGNAL CONTROLLER
+    # ----------------------------------
+    def update_signals(self, delta_time: float, waiting_counts: np.ndarray) -> None:
+        """SignalController.simulate for every replication"""
+        in_both_red = self.both_signals_red_remaining_time > 0.0
+        self.both_signals_red_remaining_time[in_both_red] -= delta_time
+        switching = in_both_red & (self.both_signals_red_remaining_time <= 0.0)
+        self.green_road[switching] = self.post_toggle_green_road[switching]
+        self.post_toggle_green_road[switching] = self.NO_GREEN
+
+        running = ~in_both_red
+        self.virtual_time_elapsed[running] += delta_time
+        vertical_green = self.green_road == self.vertical_road_index
+        red_wait_count = np.where(vertical_green, waiting_counts[:, self.horizontal_road_index], waiting_counts[:, self.vertical_road_index])
+        red_thresh = np.where(vertical_green, self.config.HORIZONTAL_ROAD_CAR_THRESHOLD, self.config.VERTICAL_ROAD_CAR_THRESHOLD)
+        toggling = running & ((self.virtual_time_elapsed >= self.max_green) | ((self.virtual_time_elapsed >= self.min_green) & (red_wait_count > red_thresh)))
+        self.post_toggle_green_road[toggling] = np.where(vertical_green[toggling], self.horizontal_road_index, self.vertical_road_index)
+        self.green_road[toggling] = self.NO_GREEN
+        self.both_signals_red_remaining_time[toggling] = self.both_signals_red_duration
+        self.virtual_time_elapsed[toggling] = 0.0
+
+    # ----------------------------------
+    # === VEHICLE UPDATES
+    # ----------------------------------
+    def update_vehicles(self) -> None:
+        """Vehicle.simulate for every vehicle of every replication (see VectorizedSimulator.update_lane_red).
+
+        The occupied slots are gathered into flat arrays in lane order, so a vehicle's leader is the element
+        before it and a step costs about one operation per vehicle rather than per lane slot. The leader
+        dependency is resolved by one front-to-back sweep over the slots: the followers in slot s of the red
+        lanes of every replication are computed together from the final results of slot s - 1.
+        """
+        width = self.get_width()
+        if width == 0:
+            return
+        replications, lanes, capacity = self.position.shape
+        index = np.flatnonzero(self.get_valid_slots())
+        row = index // capacity
+        slot = index - row * capacity
+        is_red = (self.green_road[:, None] != self.lane_road[None, :]).reshape(-1)[row]
+        position = self.position.reshape(-1)[index]
+        next_position = position - self.step_pixels
+        stop_line_position = self.stop_lines.reshape(-1)[row % lanes]
+
+        # Rules that don't depend on the leader
+        stops_at_line = (position > stop_line_position) & (next_position < stop_line_position)
+        in_stop_zone = (stop_line_position - 5 <= position) & (position <= stop_line_position)
+        past_line = position < stop_line_position - 5
+        own_waiting = stops_at_line | in_stop_zone | (~past_line & self.waiting.reshape(-1)[index])
+        checks_leader = ~(stops_at_line | in_stop_zone | past_line)
+        new_waiting = own_waiting & is_red
+        new_position = np.where(is_red, np.where(stops_at_line, stop_line_position, np.where(own_waiting, position, next_position)), next_position)
+
+        # Followers on red roads grouped by slot
+        followers = np.flatnonzero(is_red & (slot > 0))
+        followers = followers[np.argsort(slot[followers], kind="stable")]
+        slot_starts = np.searchsorted(slot[followers], np.arange(1, width + 1)).tolist()
+        for start, end in zip(slot_starts, slot_starts[1:]):
+            follower = followers[start:end]
+            leader_position = new_position[follower - 1]
+            # A leader that left the screen in this step is already removed when its follower updates
+            has_leader = leader_position >= 0 - self.vehicle_length
+            leader_waiting = new_waiting[follower - 1] & has_leader
+            # Predictive clamp behind the leader regardless of its state
+            allowed_position = (leader_position + self.vehicle_length) + self.min_gap
+            follower_next_position = next_position[follower]
+            clamped = has_leader & (follower_next_position < allowed_position)
+            # check_ahead_vehicle_gap: follow a waiting leader's state depending on the gap to it
+            follower_position = position[follower]
+            gap = (follower_position - leader_position) - self.vehicle_length
+            waiting = clamped | np.where(checks_leader[follower] & leader_waiting, gap <= self.min_gap, new_waiting[follower])
+            new_position[follower] = np.where(clamped, allowed_position, np.where(stops_at_line[follower], stop_line_position[follower],
+                                                                                  np.where(waiting, follower_position, follower_next_position)))
+            new_waiting[follower] = waiting
+
+        self.waiting.reshape(-1)[index] = new_waiting
+        self.position.reshape(-1)[index] = new_position
+
+    def remove_exited_vehicles(self) -> None:
+        """Drop vehicles that left the screen (always at the front of their lane) and record their wait times"""
+        # The front vehicle of a lane leaves first
+        replication, lane = np.nonzero(self.position[:, :, 0] < 0 - self.vehicle_length)
+        if len(replication) == 0:
+            return
+        exited = self.position[replication, lane] < 0 - self.vehicle_length  # Empty slots are far off the other end
+        shift = np.count_nonzero(exited, axis=1)
+        self.exit_records.append((np.repeat(replication, shift), np.repeat(lane, shift), np.full(shift.sum(), self.step_index),
+                                  self.spawn_index[replication, lane][exited], self.wait_time[replication, lane][exited]))
+
+        # Shift these lanes left by their number of exited vehicles
+        capacity = self.position.shape[2]
+        source = np.minimum(np.arange(capacity) + shift[:, None], capacity - 1)
+        self.count[replication, lane] -= shift
+        kept = np.arange(capacity) < self.count[replication, lane][:, None]
+        self.position[replication, lane] = np.where(kept, np.take_along_axis(self.position[replication, lane], source, axis=1), self.EMPTY_POSITION)
+        self.waiting[replication, lane] = np.take_along_axis(self.waiting[replication, lane], source, axis=1) & kept
+        self.wait_time[replication, lane] = np.take_along_axis(self.wait_time[replication, lane], source, axis=1)
+        self.spawn_index[replication, lane] = np.take_along_axis(self.spawn_index[replication, lane], source, axis=1)
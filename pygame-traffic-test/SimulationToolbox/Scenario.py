@@ -2,22 +2,35 @@ from Animation.Animatable import Animatable
 from SimulationToolbox.Simulatable import Simulatable
 from Intersection.Intersection import Intersection
 
-from Graphics.SimulationGraphicConfig import SimulationGraphicConfig
 from Road.Road import Road
+from Road.ArrivalSchedule import ArrivalSchedule
+from Road.DemandProfile import DemandProfile
 from TrafficSignal.TrafficSignal import TrafficSignal
 from SimulationToolbox.SimulationConfig import SimulationConfig
+from SimulationToolbox.RandomStreams import RandomStreams
+from SimulationToolbox.ActivityScheduler import ActivityScheduler
 
 from SignalController.SignalController import SignalController
+from SignalController.LookaheadSignalController import LookaheadSignalController
 
 import random
+import numpy as np
 from Vehicle.Vehicle import Vehicle
 
 class Scenario:
-    def __init__(self, images: dict):
-        self.simulatables = []   # List of simulatable objects
-        self.animatables = []    # List of animatable objects
-        self.components = []     # List of objects
+    def __init__(self, images: dict, config: SimulationConfig = None):
+        # Configuration of this scenario, shared with its roads, vehicles and signal controller
+        self.config = config if config is not None else SimulationConfig()
+        # Insertion-ordered sets (dicts with None values) so add/remove are O(1) and order is kept
+        self.simulatables = {}   # Simulatable objects
+        self.animatables = {}    # Animatable objects
+        self.components = {}     # All objects
+        self.roads = {}          # Road objects by road id
+        self.signals = {}        # TrafficSignal objects by road id
+        self.vehicles = {}       # Vehicle objects, in spawn order
         self.intersection = None # Intersection object
+        self.activity = ActivityScheduler()  # Which simulatables are awake (see ScenarioHandler.stepSimulation)
+        self.virtual_time = 0.0  # Virtual time of the current step, kept up to date by ScenarioHandler
         self.images = images    # Images dictionary for loading graphics
 
         # FOR TESTING: Track how many vehicles spawned per lane (keys: "vertical_road_left_lane", etc.)
@@ -39,66 +52,106 @@ class Scenario:
 
     def buildScenario(self):
         """Abstract method to be implemented by subclass (probably Main)""" # nvm, using it in scenarioHandler right now
-        ROAD_VERTICAL = Road(0, 0, SimulationGraphicConfig.ROAD_VERTICAL_LENGTH, SimulationConfig.TRAFFIC_INTENSITIES["medium"], SimulationConfig.ROAD_IDS["Vertical Road"], self.images['road_vertical'])
+        ROAD_VERTICAL = Road(0, 0, self.config.graphics.ROAD_VERTICAL_LENGTH, self.config.TRAFFIC_INTENSITIES["medium"], self.config.ROAD_IDS["Vertical Road"], self.images['road_vertical'], self.config)
         self.addComponent(ROAD_VERTICAL)
-        ROAD_HORIZONTAL = Road(0, 0, SimulationGraphicConfig.ROAD_HORIZONTAL_LENGTH, SimulationConfig.TRAFFIC_INTENSITIES["medium"], SimulationConfig.ROAD_IDS["Horizontal Road"], self.images['road_horizontal'])
+        ROAD_HORIZONTAL = Road(0, 0, self.config.graphics.ROAD_HORIZONTAL_LENGTH, self.config.TRAFFIC_INTENSITIES["medium"], self.config.ROAD_IDS["Horizontal Road"], self.images['road_horizontal'], self.config)
         self.addComponent(ROAD_HORIZONTAL)
+        self.createArrivalSchedules()
+        if self.config.RUN_SEED is not None:
+            self.seedRandomStreams(self.config.RUN_SEED)
         INTERSECTION = Intersection(0, 0, self.images['intersection'])
         self.addComponent(INTERSECTION)
-        SIGNAL_ROAD_VERTICAL = TrafficSignal(SimulationGraphicConfig.SIGNAL_ROAD_VERTICAL_X_POS, SimulationGraphicConfig.SIGNAL_ROAD_VERTICAL_Y_POS, self.images, SimulationConfig.TRAFFIC_SIGNAL_STATES["Red"], SimulationConfig.ROAD_IDS["Vertical Road"])
+        SIGNAL_ROAD_VERTICAL = TrafficSignal(self.config.graphics.SIGNAL_ROAD_VERTICAL_X_POS, self.config.graphics.SIGNAL_ROAD_VERTICAL_Y_POS, self.images, self.config.TRAFFIC_SIGNAL_STATES["Red"], self.config.ROAD_IDS["Vertical Road"])
         self.addComponent(SIGNAL_ROAD_VERTICAL)
-        SIGNAL_ROAD_HORIZONTAL = TrafficSignal(SimulationGraphicConfig.SIGNAL_ROAD_HORIZONTAL_X_POS, SimulationGraphicConfig.SIGNAL_ROAD_HORIZONTAL_Y_POS, self.images, SimulationConfig.TRAFFIC_SIGNAL_STATES["Red"], SimulationConfig.ROAD_IDS["Horizontal Road"])
+        SIGNAL_ROAD_HORIZONTAL = TrafficSignal(self.config.graphics.SIGNAL_ROAD_HORIZONTAL_X_POS, self.config.graphics.SIGNAL_ROAD_HORIZONTAL_Y_POS, self.images, self.config.TRAFFIC_SIGNAL_STATES["Red"], self.config.ROAD_IDS["Horizontal Road"])
         self.addComponent(SIGNAL_ROAD_HORIZONTAL)
-        SIGNAL_CONTROLLER = SignalController(SIGNAL_ROAD_VERTICAL, SIGNAL_ROAD_HORIZONTAL, self, 0.0)
+        controller_class = LookaheadSignalController if self.config.SIGNAL_CONTROL_MODE == "lookahead" else SignalController
+        SIGNAL_CONTROLLER = controller_class(SIGNAL_ROAD_VERTICAL, SIGNAL_ROAD_HORIZONTAL, self, 0.0, config=self.config)
         self.addComponent(SIGNAL_CONTROLLER)
 
+    def createArrivalSchedules(self) -> None:
+        """With ARRIVAL_MODEL "schedule", give every road its precomputed arrivals (seeded from the random
+        module; seedRandomStreams reseeds them from the run seed)"""
+        if self.config.ARRIVAL_MODEL == "bernoulli":
+            return
+        if self.config.ARRIVAL_MODEL != "schedule":
+            raise ValueError(f"Unknown arrival model: {self.config.ARRIVAL_MODEL} (use bernoulli or schedule)")
+        for road in self.getRoads():
+            rngs = [np.random.default_rng(random.getrandbits(64)) for _ in road.vehicle_lanes]
+            road.arrival_schedule = ArrivalSchedule(DemandProfile.create(road, self.config), list(road.vehicle_lanes), rngs, self.config.ARRIVAL_SCHEDULE_CHUNK)
+
+    def seedRandomStreams(self, seed: int) -> None:
+        """Give every road its own spawn and lane choice streams, and every lane its own arrival schedule
+        generator, all derived from `seed` (see RandomStreams). Arrivals not yet due are redrawn."""
+        streams = RandomStreams(seed)
+        for road in self.getRoads():
+            road_id = road.getRoadID()
+            road.spawn_random = streams.get_random(f"{road_id}/spawn")
+            road.lane_random = streams.get_random(f"{road_id}/lane")
+            if road.arrival_schedule is not None:
+                rngs = [streams.get_generator(f"{road.get_lane_key(lane_id)}/arrivals") for lane_id in road.vehicle_lanes]
+                road.arrival_schedule.reseed(rngs, self.virtual_time)
+
     def addComponent(self, o: object) -> None:
         """Add a component to the scenario in the appropriate list"""
         if o is None:
             return
-        self.components.append(o)
+        self.components[o] = None
         if isinstance(o, Simulatable):
-            self.simulatables.append(o)
+            self.simulatables[o] = None
+            self.activity.add(o)
         if isinstance(o, Animatable):
-            self.animatables.append(o)
+            self.animatables[o] = None
         if isinstance(o, Intersection):
             self.intersection = o
+        if isinstance(o, Road):
+            self.roads[o.getRoadID()] = o
+        if isinstance(o, TrafficSignal):
+            self.signals[o.getRoadID()] = o
+        if isinstance(o, Vehicle):
+            self.vehicles[o] = None
     
     def removeComponent(self, o: object) -> None:
         """Remove a component from the scenario in the appropriate list"""
         if o is None:
             return
-        if o in self.components:
-            self.components.remove(o)
-        if o in self.simulatables:
-            self.simulatables.remove(o)
-        if o in self.animatables:
-            self.animatables.remove(o)
+        self.components.pop(o, None)
+        self.simulatables.pop(o, None)
+        self.activity.remove(o)
+        self.animatables.pop(o, None)
         if isinstance(o, Intersection) and self.intersection is o:
             self.intersection = None
+        if isinstance(o, Road) and self.roads.get(o.getRoadID()) is o:
+            del self.roads[o.getRoadID()]
+        if isinstance(o, TrafficSignal) and self.signals.get(o.getRoadID()) is o:
+            del self.signals[o.getRoadID()]
         if isinstance(o, Vehicle):
+            self.vehicles.pop(o, None)
             self.remove_vehicle_from_scenario(o)
 
+    def removeAllComponents(self) -> None:
+        """Remove every component from the scenario"""
+        for component in list(self.components):
+            self.removeComponent(component)
+
     def remove_vehicle_from_scenario(self, vehicle) -> None:
-        """Remove a vehicle from its lane list"""
-        # lane_key = f"{vehicle.road_id}_{vehicle.lane_id}"
-        # if vehicle in self.vehicle_lanes[lane_key]:
-        #     self.vehicle_lanes[lane_key].remove(vehicle)
-        for component in self.components:
-            if isinstance(component, Road):
-                component.remove_vehicle_from_lane(vehicle)
+        """Remove a vehicle from its lane queue and hand it back to its road for reuse"""
+        road = self.roads.get(vehicle.road_id)
+        if road is not None:
+            road.remove_vehicle_from_lane(vehicle)
+            road.release_vehicle(vehicle)
     
     def getComponents(self) -> list:
         """Get all components in the scenario"""
-        return self.components
+        return list(self.components)
     
     def getSimulatables(self) -> list:
         """Get all simulatable components in the scenario"""
-        return self.simulatables
+        return list(self.simulatables)
     
     def getAnimatables(self) -> list:
         """Get all animatable components in the scenario"""
-        return self.animatables
+        return list(self.animatables)
 
     def getIntersection(self) -> Intersection:
         """Get the intersection component in the scenario"""
@@ -106,23 +159,16 @@ class Scenario:
 
     def get_signal_for_road(self, road_id) -> TrafficSignal:
         """Get the traffic signal for the specified road ID"""
-        for component in self.components:
-            if isinstance(component, TrafficSignal) and component.getRoadID() == road_id:
-                return component
-        return None
+        return self.signals.get(road_id)
+
+    def get_road(self, road_id) -> Road:
+        """Get the road with the specified road ID"""
+        return self.roads.get(road_id)
 
     def getRoads(self) -> list:
         """Get all road components in the scenario"""
-        roads = []
-        for component in self.components:
-            if isinstance(component, Road):
-                roads.append(component)
-        return roads
+        return list(self.roads.values())
     
     def getVehicles(self) -> list:
-        """Get all vehicle components in the scenario"""
-        vehicles = []
-        for component in self.components:
-            if isinstance(component, Vehicle):
-                vehicles.append(component)
-        return vehicles
\ No newline at end of file
+        """Get all vehicle components in the scenario, in spawn order"""
+        return list(self.vehicles)
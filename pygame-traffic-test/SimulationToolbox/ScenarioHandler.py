@@ -1,72 +1,109 @@
 from SimulationToolbox.Scenario import Scenario
+from SimulationToolbox.DiscreteEventSimulator import DiscreteEventSimulator
+from SimulationToolbox.ReplicationBatchSimulator import ReplicationBatchSimulator
 from Animation.Animatable import Animatable
 
 from Intersection.Intersection import Intersection
 from Road.Road import Road
 from Vehicle.Vehicle import Vehicle
-from SimulationToolbox.SimulationConfig import SimulationConfig
+from Vehicle.VehicleState import VehicleState
+from Metrics.TripRecords import TripRecords
+from Metrics.TimeSeriesStore import TimeSeriesStore
+from Metrics.WaitTimeStatistics import WaitTimeStatistics
+from Metrics.SteadyStateDetector import SteadyStateDetector
+from SimulationToolbox.ScenarioSnapshot import save_snapshot
 
 import pygame
 import matplotlib
 matplotlib.use('Qt5Agg')
 import matplotlib.pyplot as plt
 import matplotlib.image as mpimg
+import numpy as np
 
+import math
 import os
 import random
+import time
+from collections import deque
 
 class ScenarioHandler:
 
-    def __init__(self, scenario: Scenario, display):
+    def __init__(self, scenario: Scenario, display=None):
         self.scenario = scenario
-        self.display = display
-        self.fps = SimulationConfig.FPS
+        self.config = scenario.config  # The scenario's SimulationConfig instance
+        self.display = display  # None for headless runs (see runHeadlessSimulation)
+        self.fps = self.config.FPS
         self.clock = pygame.time.Clock()
         self.running = True
-        self.real_time = SimulationConfig.REAL_TIME
-        self.timer = SimulationConfig.TIMER
-        self.frame_count = SimulationConfig.FRAME_COUNT
-        self.stop_virtual_time = SimulationConfig.STOP_VIRTUAL_TIME
-        self.speed_factor = SimulationConfig.SPEED_FACTOR
+        self.real_time = self.config.REAL_TIME
+        self.timer = self.config.TIMER
+        self.frame_count = self.config.FRAME_COUNT
+        self.stop_virtual_time = self.config.STOP_VIRTUAL_TIME
+        self.speed_factor = self.config.SPEED_FACTOR
+
+        # Fixed-timestep stepping: wall-clock time only feeds the accumulator, the scenario always
+        # advances in steps of step_time so results don't depend on frame-time jitter
+        self.substeps = self.config.SUBSTEPS
+        self.frame_time_step = self.speed_factor / self.fps   # Virtual seconds per nominal frame
+        self.step_time = self.frame_time_step / self.substeps  # Virtual seconds per fixed step
+        self.time_accumulator = 0.0
+        self.adaptive_time_step = self.config.ADAPTIVE_TIME_STEP
+        self.step_count = 0                # Number of steps actually executed (adaptive steps count once)
+        self.spawn_draw_buffer = deque()   # Spawn draws taken ahead of time by adaptive stepping
+
+        # Early stopping: warm-up detection and batch-means precision check (see isTerminated)
+        self.steady_state = None
+        if self.config.EARLY_STOPPING:
+            self.steady_state = SteadyStateDetector.from_config(self.config, self.step_time)
+            self.stop_virtual_time = self.config.STEADY_STATE_MAX_VIRTUAL_TIME
 
         # Metrics for vehicle waiting times
         self.metrics = {
-            "times": [],                      # List[float] virtual seconds
-            "waiting_counts": [],             # List[int] total waiting vehicles at each time sample
-            "vertical_waiting_counts": [],    # List[int] waiting vehicles on vertical road
-            "horizontal_waiting_counts": [],  # List[int] waiting vehicles on horizontal road
+            # Total, vertical road and horizontal road waiting vehicles at each time sample (virtual seconds)
+            "time_series": TimeSeriesStore.create(TimeSeriesStore.WAITING_COUNT_CHANNELS, config=self.config),
             "integral_waiting": 0.0,          # Cumulative waiting time integral -> sum(waiting_count * dt_virtual)
+            "integral_vertical_waiting": 0.0,   # Same integral for the vertical road only
+            "integral_horizontal_waiting": 0.0, # Same integral for the horizontal road only
             "total_virtual_time": 0.0,        # Total virtual time elapsed -> sum(dt_virtual)
 
             "next_vehicle_spawn_index": 0,    # Next spawn index for vehicles
-            "vehicle_wait_map": {},           # Map vehicle id to total waiting time (virtual seconds)
-            "vehicle_spawn_index": {},        # Map vehicle id to spawn index
-            "final_wait_times": []            # list[tuple[int spawn_index, float wait_time_virtual]]
+            "trips": TripRecords(self.config),           # One row per vehicle trip, in exit order (see finalizeVehicleTrip)
+            "wait_statistics": WaitTimeStatistics(self.config)  # Streaming wait time mean/variance, histogram and quantiles by road and lane
         }
 
+        self.replication_metrics = []  # One metrics dictionary per replication (see runReplicatedSimulation)
+
+        # Headless checkpoints: a snapshot is written to checkpoint_path every checkpoint_interval virtual seconds
+        self.checkpoint_path = None
+        self.checkpoint_interval = self.config.CHECKPOINT_INTERVAL
+        self.next_checkpoint_time = self.checkpoint_interval
+
         self.fig1 = None
         self.fig2 = None
 
+    def __getstate__(self) -> dict:
+        """Pickled state (see ScenarioSnapshot): everything but the window, clock and plots"""
+        state = self.__dict__.copy()
+        for name in ("display", "clock", "fig1", "fig2"):
+            state[name] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.clock = pygame.time.Clock()
+
     def proceedSimulation(self) -> None:
         pass
 
-    def drawAnimatables(self, screen) -> None:
-        """Draw all animatable components in the scenario""" # Called in Display.redrawSimulationWindow
-        animatables = self.scenario.getAnimatables()
-        for animatable in animatables:
-            animatable.draw(screen)
-
-    def drawSimulatables(self, screen) -> None:
-        """Draw all simulatable components in the scenario""" # Called in Display.redrawSimulationWindow
-        simulatables = self.scenario.getSimulatables()
-        for simulatable in simulatables:
-            if hasattr(simulatable, 'draw'):
-                simulatable.draw(screen)
-    
     def isTerminated(self) -> bool:
-        """Check if the simulation scenario is terminated"""
+        """Check if the simulation scenario is terminated: stop time reached, window closed or, with
+        EARLY_STOPPING, the averages after warm-up are precise enough (see SteadyStateDetector)"""
         if self.timer >= self.stop_virtual_time:
             return True
+        if self.steady_state is not None and self.steady_state.close_full_batch():
+            return True
+        if self.display is None:
+            return False  # Headless: there is no window to close
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return True
@@ -80,6 +117,7 @@ class ScenarioHandler:
             # Check termination conditions
             if self.isTerminated():
                 self.finalizeVehicleMetrics()
+                self.finalizeSteadyStateMetrics()
                 # Draw final frame and save it
                 self.display.redrawSimulationWindow(self, self.timer, self.real_time, self.frame_count)
                 pygame.display.flip()
@@ -91,120 +129,394 @@ class ScenarioHandler:
             self.frame_count += 1
             real_time_per_frame = self.clock.tick(self.fps) / 1000.0
             self.real_time += real_time_per_frame
-            virtual_time_per_frame = real_time_per_frame * self.speed_factor
-            self.timer += virtual_time_per_frame
-
-            # Metrics update: count waiting vehicles
-            waiting_vehicles_count = 0
-            vertical_waiting_count = 0
-            horizontal_waiting_count = 0
-            for vehicle in self.scenario.getVehicles():
-                if vehicle.state == SimulationConfig.VEHICLE_STATES["waiting"]:
-                    waiting_vehicles_count += 1
-                    # Count by road
-                    if vehicle.road_id == SimulationConfig.ROAD_IDS["Vertical Road"]:
-                        vertical_waiting_count += 1
-                    elif vehicle.road_id == SimulationConfig.ROAD_IDS["Horizontal Road"]:
-                        horizontal_waiting_count += 1
-            self.metrics["times"].append(self.timer)
-            self.metrics["waiting_counts"].append(waiting_vehicles_count)
-            self.metrics["vertical_waiting_counts"].append(vertical_waiting_count)
-            self.metrics["horizontal_waiting_counts"].append(horizontal_waiting_count)
-
-            # Time-weighted integral for average waiting vehicles across entire run
-            self.metrics["integral_waiting"] += waiting_vehicles_count * virtual_time_per_frame
-            self.metrics["total_virtual_time"] += virtual_time_per_frame
-
-            # Metrics update: update waiting times for all vehicles
-            for vehicle in self.scenario.getVehicles():
-                vehicle_id = id(vehicle)
-                # Ensure mapping exists (in case vehicle pre-existed before toggle)
-                if vehicle_id not in self.metrics["vehicle_wait_map"]:
-                    self.metrics["vehicle_wait_map"][vehicle_id] = 0.0
-                    self.metrics["vehicle_spawn_index"][vehicle_id] = self.metrics["next_vehicle_spawn_index"]
-                    self.metrics["next_vehicle_spawn_index"] += 1
-                # Update waiting time for vehicles in 'waiting' state
-                if vehicle.state == SimulationConfig.VEHICLE_STATES["waiting"]:
-                    self.metrics["vehicle_wait_map"][vehicle_id] += virtual_time_per_frame
-
-            # Spawn vehicles based on traffic intensity for each road
-            for road in self.scenario.getComponents():
-                if isinstance(road, Road) and random.random() < road.getTrafficIntensity():
-                        vehicle = road.try_spawn_vehicle_in_lane(self.scenario, self.display.screen)
-                        if vehicle is not None:
-                            # Metrics update: add metrics tracking for the spawned vehicle
-                            vehicle_id = id(vehicle)
-                            self.metrics["vehicle_wait_map"][vehicle_id] = 0.0 # Initialize waiting time
-                            self.metrics["vehicle_spawn_index"][vehicle_id] = self.metrics["next_vehicle_spawn_index"]
-                            self.metrics["next_vehicle_spawn_index"] += 1
-
-                            # FOR DEBUGGING/TESTING: Update and print spawn counts
-                            lane_key = f"{vehicle.road_id}_{vehicle.lane_id}"
-                            print(f"Spawned vehicle in {lane_key}: total={self.scenario.spawn_counts[lane_key]}")
-
-            # Update simulatable components (just vehicles for now)
-            for simulatable in self.scenario.getSimulatables()[:]:
-                simulatable.simulate(virtual_time_per_frame)
-                if isinstance(simulatable, Vehicle) and simulatable.is_off_screen():
-                    # Record final waiting time metric before removing vehicle
-                    vehicle_id = id(simulatable)
-                    # Finalize wait time entry
-                    if vehicle_id in self.metrics["vehicle_wait_map"] and vehicle_id in self.metrics["vehicle_spawn_index"]:
-                        self.metrics["final_wait_times"].append((
-                            self.metrics["vehicle_spawn_index"][vehicle_id],
-                            self.metrics["vehicle_wait_map"][vehicle_id]
-                        ))
-                        # Delete mappings to free memory
-                        del self.metrics["vehicle_wait_map"][vehicle_id]
-                        del self.metrics["vehicle_spawn_index"][vehicle_id]
-                    self.scenario.removeComponent(simulatable)
+            self.time_accumulator += real_time_per_frame * self.speed_factor
+
+            # Advance the scenario in fixed steps to catch up with the accumulated virtual time
+            caught_up_frames = 0
+            while self.time_accumulator >= self.frame_time_step and caught_up_frames < self.config.MAX_STEPS_PER_FRAME:
+                self.time_accumulator -= self.frame_time_step
+                for _ in range(self.substeps):
+                    self.stepSimulation(self.step_time)
+                caught_up_frames += 1
+            if caught_up_frames == self.config.MAX_STEPS_PER_FRAME:
+                self.time_accumulator = 0.0  # Very slow frame: drop the backlog instead of spiralling
 
             # Redraw the simulation window
             self.display.redrawSimulationWindow(self, self.timer, self.real_time, self.frame_count)
 
+    def runHeadlessSimulation(self) -> dict:
+        """Run the simulation scenario as fast as possible: no window, no clock throttling, no rendering.
+
+        The scenario advances in the same fixed steps as a windowed run, so both cover the same virtual
+        timeline; with ADAPTIVE_TIME_STEP it jumps over quiescent stretches (see advanceAdaptiveStep).
+        frame_count counts fixed steps covered, step_count the steps actually executed.
+        Returns the metrics dictionary.
+        """
+        self.scenario.buildScenario()
+        return self.resumeHeadlessSimulation()
+
+    def resumeHeadlessSimulation(self) -> dict:
+        """Continue a headless run from the current state (e.g. restored from a ScenarioSnapshot) until
+        it terminates, writing checkpoints if checkpoint_path is set. Returns the metrics dictionary."""
+        wall_clock_start = time.perf_counter()
+
+        while not self.isTerminated():
+            if self.adaptive_time_step:
+                self.frame_count += self.advanceAdaptiveStep()
+            else:
+                self.stepSimulation(self.step_time)
+                self.frame_count += 1
+            if self.checkpoint_path is not None and self.timer >= self.next_checkpoint_time:
+                while self.next_checkpoint_time <= self.timer:
+                    self.next_checkpoint_time += self.checkpoint_interval
+                save_snapshot(self, self.checkpoint_path)
+
+        self.real_time += time.perf_counter() - wall_clock_start
+        self.finalizeVehicleMetrics()
+        self.finalizeSteadyStateMetrics()
+        self.cleanup()
+        self.running = False
+        return self.metrics
+
+    def runEventSimulation(self) -> dict:
+        """Run the simulation scenario with the discrete-event engine instead of stepping frame by frame.
+
+        Jumps between arrivals, signal changes and exits, and only steps the vehicles on red roads that
+        can still move (see DiscreteEventSimulator); the metrics dictionary has the same shape as for the stepped runs, with the time series recorded
+        only where a waiting count changes. step_count is the number of events processed.
+        """
+        if self.config.SIGNAL_CONTROL_MODE != "threshold":
+            raise ValueError(f"The discrete-event engine only implements threshold signal control, not {self.config.SIGNAL_CONTROL_MODE}")
+        if self.config.ARRIVAL_MODEL != "bernoulli":
+            raise ValueError(f"The discrete-event engine only implements per-step spawn draws, not the {self.config.ARRIVAL_MODEL} arrival model")
+        if self.config.EARLY_STOPPING:
+            raise ValueError("Early stopping (steady-state detection) is only implemented by the stepped loop, not the discrete-event engine")
+        self.scenario.buildScenario()
+        wall_clock_start = time.perf_counter()
+
+        spawn_probabilities = {road.getRoadID(): self.getSpawnProbability(road) for road in self.scenario.getRoads()}
+        simulator = DiscreteEventSimulator(self.scenario, self.step_time, spawn_probabilities)
+        self.metrics = simulator.run(self.stop_virtual_time)
+
+        self.frame_count = simulator.last_step
+        self.step_count = simulator.events_processed
+        self.timer = self.metrics["total_virtual_time"]
+        self.real_time = time.perf_counter() - wall_clock_start
+        self.cleanup()
+        self.running = False
+        return self.metrics
+
+    def runReplicatedSimulation(self, replications: int, seed: int | None = None) -> list:
+        """Run `replications` independent replications of the scenario in lock step (see ReplicationBatchSimulator).
+
+        All replications advance together in one vectorized step, drawing spawns from a NumPy generator
+        seeded with `seed`. Returns one metrics dictionary per replication (also kept in
+        replication_metrics); self.metrics is set to the first one.
+        """
+        if self.config.SIGNAL_CONTROL_MODE != "threshold":
+            raise ValueError(f"The replication batch engine only implements threshold signal control, not {self.config.SIGNAL_CONTROL_MODE}")
+        if self.config.ARRIVAL_MODEL != "bernoulli":
+            raise ValueError(f"The replication batch engine only implements per-step spawn draws, not the {self.config.ARRIVAL_MODEL} arrival model")
+        if self.config.EARLY_STOPPING:
+            raise ValueError("Early stopping (steady-state detection) is only implemented by the stepped loop, not the replication batch engine")
+        self.scenario.buildScenario()
+        wall_clock_start = time.perf_counter()
+
+        spawn_probabilities = {road.getRoadID(): self.getSpawnProbability(road) for road in self.scenario.getRoads()}
+        simulator = ReplicationBatchSimulator(self.scenario, self.step_time, spawn_probabilities, replications, np.random.default_rng(seed))
+        self.replication_metrics = simulator.run(self.stop_virtual_time)
+        self.metrics = self.replication_metrics[0]
+
+        self.frame_count = simulator.step_index
+        self.step_count = simulator.step_index
+        self.timer = simulator.timer
+        self.real_time = time.perf_counter() - wall_clock_start
+        self.cleanup()
+        self.running = False
+        return self.replication_metrics
+
+    def stepSimulation(self, virtual_time_per_frame: float) -> None:
+        """Advance the scenario by one step of virtual time: metrics, spawning and simulatables"""
+        self.step_count += 1
+        self.timer += virtual_time_per_frame
+        self.scenario.virtual_time = self.timer
+
+        # Metrics update: count waiting vehicles (live counters kept by each road)
+        vertical_waiting_count, horizontal_waiting_count = self.getWaitingCountsByRoad()
+        waiting_vehicles_count = vertical_waiting_count + horizontal_waiting_count
+        self.metrics["time_series"].append(self.timer, (waiting_vehicles_count, vertical_waiting_count, horizontal_waiting_count))
+
+        # Time-weighted integral for average waiting vehicles across entire run
+        self.metrics["integral_waiting"] += waiting_vehicles_count * virtual_time_per_frame
+        self.metrics["integral_vertical_waiting"] += vertical_waiting_count * virtual_time_per_frame
+        self.metrics["integral_horizontal_waiting"] += horizontal_waiting_count * virtual_time_per_frame
+        self.metrics["total_virtual_time"] += virtual_time_per_frame
+        if self.steady_state is not None:
+            self.steady_state.add_step(waiting_vehicles_count, vertical_waiting_count, horizontal_waiting_count)
+
+        # Metrics update: update waiting times for vehicles in 'waiting' state (sleeping ones catch up when woken)
+        activity = self.scenario.activity
+        activity.advance(1, virtual_time_per_frame)
+        for simulatable in activity.get_awake():
+            if isinstance(simulatable, Vehicle) and simulatable.state == VehicleState.WAITING:
+                simulatable.wait_time += virtual_time_per_frame
+
+        # Spawn vehicles based on traffic intensity for each road
+        screen = self.display.screen if self.display is not None else None
+        for road in self.scenario.getRoads():
+            if road.arrival_schedule is not None:
+                # Precomputed arrivals: every arrival due by now, in its own lane
+                for lane_id in road.arrival_schedule.pop_due(self.timer):
+                    self.spawnVehicle(road, screen, lane_id)
+            elif self.drawSpawnChance(road) < self.getSpawnProbability(road):
+                self.spawnVehicle(road, screen)
+
+        # Update simulatable components (just vehicles for now); sleeping vehicles are skipped
+        for simulatable in activity.iterate():
+            simulatable.simulate(virtual_time_per_frame)
+            if isinstance(simulatable, Vehicle) and simulatable.is_off_screen():
+                # Record the finished trip before removing vehicle
+                self.finalizeVehicleTrip(simulatable, self.timer)
+                self.scenario.removeComponent(simulatable)
+
+    def spawnVehicle(self, road: Road, screen, lane_id: str = None) -> None:
+        """Spawn a vehicle on the road (see Road.try_spawn_vehicle_in_lane) and start its trip record"""
+        vehicle = road.try_spawn_vehicle_in_lane(self.scenario, screen, lane_id)
+        if vehicle is not None:
+            # Metrics update: start the trip record of the spawned vehicle
+            vehicle.spawn_index = self.metrics["next_vehicle_spawn_index"]
+            vehicle.spawn_time = self.timer
+            self.metrics["next_vehicle_spawn_index"] += 1
+
+            # FOR DEBUGGING/TESTING: Update and print spawn counts
+            if self.config.VERBOSE:
+                lane_key = f"{vehicle.road_id}_{vehicle.lane_id}"
+                print(f"Spawned vehicle in {lane_key}: total={self.scenario.spawn_counts[lane_key]}")
+
+    def getWaitingCountsByRoad(self) -> tuple:
+        """Waiting vehicles on the vertical and horizontal road, read from the roads' live counters"""
+        vertical_road = self.scenario.get_road(self.config.ROAD_IDS["Vertical Road"])
+        horizontal_road = self.scenario.get_road(self.config.ROAD_IDS["Horizontal Road"])
+        # Roads are gone once the scenario has been cleaned up
+        vertical_waiting_count = vertical_road.get_waiting_count() if vertical_road is not None else 0
+        horizontal_waiting_count = horizontal_road.get_waiting_count() if horizontal_road is not None else 0
+        return vertical_waiting_count, horizontal_waiting_count
+
+    def getSpawnProbability(self, road: Road) -> float:
+        """Spawn probability per fixed step (traffic intensities are given per nominal frame)"""
+        return road.getTrafficIntensity() / self.substeps
+
+    def drawSpawnChance(self, road: Road) -> float:
+        """Next spawn draw of the road, taking draws made ahead of time by adaptive stepping first"""
+        if self.spawn_draw_buffer:
+            return self.spawn_draw_buffer.popleft()
+        return road.draw_spawn_chance()
+
+    def advanceAdaptiveStep(self) -> int:
+        """Advance one adaptive step and return how many fixed steps it covered.
+
+        While no vehicle is near its stop line or leader, no signal is about to change and no spawn is
+        due, many fixed steps are advanced at once with the same floating-point updates they would
+        have made one by one, so results match fixed stepping exactly. Otherwise a normal fixed step is taken.
+        """
+        quiescent_steps = 0 if self.spawn_draw_buffer else self.getQuiescentSteps()
+        if quiescent_steps > 1:
+            spawn_free_steps = self.prefetchSpawnFreeSteps(quiescent_steps)
+            if spawn_free_steps > 0:
+                self.advanceQuiescentSteps(spawn_free_steps)
+                return spawn_free_steps
+        self.stepSimulation(self.step_time)
+        return 1
+
+    def getQuiescentSteps(self) -> int:
+        """Number of upcoming fixed steps in which no simulatable can change state"""
+        # Never jump past the termination check
+        steps = min(self.config.ADAPTIVE_MAX_STEPS, int((self.stop_virtual_time - self.timer) / self.step_time) - 1)
+        # Sleeping vehicles can't change state before a signal change, which bounds the controller's steps
+        for simulatable in self.scenario.activity.get_awake():
+            if steps <= 1:
+                break
+            steps = min(steps, simulatable.get_quiescent_steps(self.step_time))
+        if self.steady_state is not None:
+            steps = min(steps, self.steady_state.get_steps_to_batch_end())  # End on the next convergence check
+        return steps
+
+    def prefetchSpawnFreeSteps(self, max_steps: int) -> int:
+        """Draw spawn chances ahead of time, in the same order stepSimulation would, up to max_steps steps
+        or the first successful draw. Returns the number of steps with no spawn; the draws of the step
+        containing the first successful draw are kept in spawn_draw_buffer for stepSimulation to use.
+        """
+        roads = self.scenario.getRoads()
+        if any(road.arrival_schedule is not None for road in roads):
+            return self.getArrivalFreeSteps(max_steps)
+        spawn_free_steps = 0
+        while spawn_free_steps < max_steps:
+            step_draws = []
+            for road in roads:
+                draw = road.draw_spawn_chance()
+                step_draws.append(draw)
+                if draw < self.getSpawnProbability(road):
+                    self.spawn_draw_buffer.extend(step_draws)
+                    return spawn_free_steps
+            spawn_free_steps += 1
+        return spawn_free_steps
+
+    def getArrivalFreeSteps(self, max_steps: int) -> int:
+        """Number of upcoming steps, up to max_steps, before the step of the next scheduled arrival"""
+        next_arrival_time = min(road.arrival_schedule.get_next_time() for road in self.scenario.getRoads())
+        # Same floating-point additions as the steps will make, so the arrival lands in the same step
+        timer = self.timer
+        arrival_free_steps = 0
+        while arrival_free_steps < max_steps:
+            timer += self.step_time
+            if timer >= next_arrival_time:
+                break
+            arrival_free_steps += 1
+        return arrival_free_steps
+
+    def advanceQuiescentSteps(self, steps: int) -> None:
+        """Advance `steps` fixed steps known to be quiescent (see getQuiescentSteps and prefetchSpawnFreeSteps)"""
+        virtual_time_per_frame = self.step_time
+        self.step_count += 1
+
+        # Waiting counts can't change during quiescent steps
+        awake = self.scenario.activity.get_awake()
+        self.scenario.activity.advance(steps, virtual_time_per_frame)
+        waiting_vehicles = [simulatable for simulatable in awake if isinstance(simulatable, Vehicle) and simulatable.state == VehicleState.WAITING]
+        vertical_waiting_count, horizontal_waiting_count = self.getWaitingCountsByRoad()
+        waiting_vehicles_count = vertical_waiting_count + horizontal_waiting_count
+
+        # Same per-step metric updates as stepSimulation
+        step_times = []
+        for _ in range(steps):
+            self.timer += virtual_time_per_frame
+            step_times.append(self.timer)
+            self.metrics["time_series"].append(self.timer, (waiting_vehicles_count, vertical_waiting_count, horizontal_waiting_count))
+            self.metrics["integral_waiting"] += waiting_vehicles_count * virtual_time_per_frame
+            self.metrics["integral_vertical_waiting"] += vertical_waiting_count * virtual_time_per_frame
+            self.metrics["integral_horizontal_waiting"] += horizontal_waiting_count * virtual_time_per_frame
+            self.metrics["total_virtual_time"] += virtual_time_per_frame
+            if self.steady_state is not None:
+                self.steady_state.add_step(waiting_vehicles_count, vertical_waiting_count, horizontal_waiting_count)
+        self.scenario.virtual_time = self.timer
+        for vehicle in waiting_vehicles:
+            for _ in range(steps):
+                vehicle.wait_time += virtual_time_per_frame
+
+        # Advance simulatables; vehicles that leave the screen are removed in the order stepping would have
+        exited_vehicles = []
+        for simulatable in awake:
+            steps_advanced = simulatable.advance_quiescent(virtual_time_per_frame, steps)
+            if isinstance(simulatable, Vehicle) and simulatable.is_off_screen():
+                exited_vehicles.append((steps_advanced, simulatable))
+        exited_vehicles.sort(key=lambda exited: exited[0])
+        for steps_advanced, vehicle in exited_vehicles:
+            self.finalizeVehicleTrip(vehicle, step_times[steps_advanced - 1])
+            self.scenario.removeComponent(vehicle)
+
     def cleanup(self) -> None:
         """Cleanup resources used by the scenario handler"""
-        while self.scenario.getComponents():
-            component = self.scenario.getComponents()[0]
-            self.scenario.removeComponent(component)
+        self.scenario.removeAllComponents()
 
     def finalizeVehicleMetrics(self) -> None:
-        """Finalize vehicle waiting time metrics for all remaining vehicles in the scenario"""
+        """Record the trips of all vehicles still in the scenario (they have no exit time)"""
+        self.scenario.activity.settle_all()
         for vehicle in self.scenario.getVehicles():
-            vehicle_id = id(vehicle)
-            # Finalize wait time entry
-            if vehicle_id in self.metrics["vehicle_wait_map"] and vehicle_id in self.metrics["vehicle_spawn_index"]:
-                self.metrics["final_wait_times"].append((
-                    self.metrics["vehicle_spawn_index"][vehicle_id],
-                    self.metrics["vehicle_wait_map"][vehicle_id]
-                ))
-                # Delete mappings to free memory
-                del self.metrics["vehicle_wait_map"][vehicle_id]
-                del self.metrics["vehicle_spawn_index"][vehicle_id]
+            self.finalizeVehicleTrip(vehicle, float("nan"))
+
+    def finalizeVehicleTrip(self, vehicle: Vehicle, exit_time: float) -> None:
+        """Append a vehicle's trip (accumulated waiting time, stops, ...) to the trip records"""
+        if vehicle.spawn_index is not None:
+            self.metrics["trips"].append(vehicle, exit_time)
+            self.metrics["wait_statistics"].add(vehicle.road_id, vehicle.lane_id, vehicle.wait_time)
+            if self.steady_state is not None and not math.isnan(exit_time):
+                self.steady_state.add_wait_time(exit_time, vehicle.wait_time)
+
+    def finalizeSteadyStateMetrics(self) -> None:
+        """With EARLY_STOPPING, record the warm-up that the averages exclude and the final confidence intervals"""
+        if self.steady_state is None:
+            return
+        self.steady_state.finish()
+        self.metrics["warmup_time"] = self.steady_state.get_warmup_time()
+        (self.metrics["warmup_integral_waiting"], self.metrics["warmup_integral_vertical_waiting"],
+         self.metrics["warmup_integral_horizontal_waiting"]) = self.steady_state.get_warmup_integrals()
+        self.metrics["steady_state_converged"] = self.steady_state.converged
+        self.metrics["confidence_intervals"] = self.steady_state.confidence_intervals
+        if self.metrics["warmup_time"] > 0.0:
+            self.metrics["wait_statistics"] = self.collectWaitStatistics(self.metrics["warmup_time"])
+
+    def collectWaitStatistics(self, min_spawn_time: float) -> WaitTimeStatistics:
+        """Wait time statistics of the recorded trips of vehicles spawned at or after min_spawn_time"""
+        trips = self.metrics["trips"]
+        selected = trips.column("spawn_time") >= min_spawn_time
+        wait_statistics = WaitTimeStatistics(self.config)
+        for road, lane, wait_time in zip(trips.column("road")[selected].tolist(), trips.column("lane")[selected].tolist(),
+                                         trips.column("total_wait")[selected].tolist()):
+            wait_statistics.add(trips.roads[road], TripRecords.LANES[lane], wait_time)
+        return wait_statistics
+
+    def getFinalWaitTimes(self, metrics: dict = None) -> tuple:
+        """Spawn indices and waiting times of all finished trips as arrays, in exit order.
+        Stepped runs keep them in the trip records, the other engines in a final_wait_times list."""
+        metrics = self.metrics if metrics is None else metrics
+        if "trips" in metrics:
+            return metrics["trips"].column("spawn_index"), metrics["trips"].column("total_wait")
+        final_wait_times = np.array(metrics["final_wait_times"], dtype=np.float64).reshape(-1, 2)
+        return final_wait_times[:, 0].astype(np.int64), final_wait_times[:, 1]
+
+    def getTimeSeries(self, metrics: dict = None) -> TimeSeriesStore:
+        """Waiting count time series of a run as a TimeSeriesStore (the event and batch engines keep plain lists/arrays)"""
+        metrics = self.metrics if metrics is None else metrics
+        if "time_series" in metrics:
+            return metrics["time_series"]
+        return TimeSeriesStore.from_arrays(metrics["times"], **{name: metrics[name] for name in TimeSeriesStore.WAITING_COUNT_CHANNELS})
 
     def calculateTotalAverageWaitingVehicles(self) -> float:
-        """Calculate the average number of waiting vehicles over the entire simulation run"""
-        if self.metrics["total_virtual_time"] == 0.0:
-            return 0.0
-        return self.metrics["integral_waiting"] / self.metrics["total_virtual_time"]
+        """Calculate the average number of waiting vehicles over the simulation run (after warm-up, if detected)"""
+        return self.calculateAverageAfterWarmup("integral_waiting")
     
     def calculateVerticalAverageWaitingVehicles(self) -> float:
-        if not self.metrics["vertical_waiting_counts"]:
-            return 0.0
-        return sum(self.metrics["vertical_waiting_counts"]) / len(self.metrics["vertical_waiting_counts"])
+        """Time-weighted average number of waiting vehicles on the vertical road"""
+        return self.calculateAverageAfterWarmup("integral_vertical_waiting")
 
     def calculateHorizontalAverageWaitingVehicles(self) -> float:
-        if not self.metrics["horizontal_waiting_counts"]:
+        """Time-weighted average number of waiting vehicles on the horizontal road"""
+        return self.calculateAverageAfterWarmup("integral_horizontal_waiting")
+
+    def calculateAverageAfterWarmup(self, integral_name: str) -> float:
+        """Time average of a waiting count integral, leaving out the warm-up (see finalizeSteadyStateMetrics)"""
+        duration = self.metrics["total_virtual_time"] - self.metrics.get("warmup_time", 0.0)
+        if duration <= 0.0:
             return 0.0
-        return sum(self.metrics["horizontal_waiting_counts"]) / len(self.metrics["horizontal_waiting_counts"])
+        return (self.metrics[integral_name] - self.metrics.get(f"warmup_{integral_name}", 0.0)) / duration
 
     def calculateAverageVehicleWaitingTime(self) -> float:
-        """Calculate the average waiting time of all vehicles in the scenario"""
-        if not self.metrics["final_wait_times"]:
+        """Calculate the average waiting time of all vehicles in the scenario (spawned after warm-up, if detected)"""
+        _, wait_times = self.getFinalWaitTimes()
+        warmup_time = self.metrics.get("warmup_time", 0.0)
+        if warmup_time > 0.0:
+            wait_times = wait_times[self.metrics["trips"].column("spawn_time") >= warmup_time]
+        if len(wait_times) == 0:
             return 0.0
-        total_wait_time = sum(wait_time for _, wait_time in self.metrics["final_wait_times"])
-        return total_wait_time / len(self.metrics["final_wait_times"])
+        return float(wait_times.mean())
     
+    def summarizeReplications(self) -> dict:
+        """Mean and 95% confidence half-width (normal approximation) across replication_metrics of the
+        average number of waiting vehicles and the average vehicle waiting time"""
+        averages = {"average_waiting_vehicles": [], "average_vehicle_wait_time": []}
+        for metrics in self.replication_metrics:
+            average_waiting_vehicles = metrics["integral_waiting"] / metrics["total_virtual_time"] if metrics["total_virtual_time"] > 0.0 else 0.0
+            _, wait_times = self.getFinalWaitTimes(metrics)
+            averages["average_waiting_vehicles"].append(average_waiting_vehicles)
+            averages["average_vehicle_wait_time"].append(float(wait_times.mean()) if len(wait_times) else 0.0)
+
+        summary = {}
+        for name, values in averages.items():
+            values = np.array(values)
+            half_width = 1.96 * values.std(ddof=1) / np.sqrt(len(values)) if len(values) > 1 else float("nan")
+            summary[name] = (float(values.mean()), float(half_width))
+        return summary
+
     def createSimulationResultPlots(self) -> None:
         """Create plots for simulation results using matplotlib"""
         average_waiting_vehicles = self.calculateTotalAverageWaitingVehicles()
@@ -215,8 +527,13 @@ class ScenarioHandler:
 
         # Plot 1: show number of waiting vehicles over time
         fig1, ax1 = plt.subplots(figsize=(6, 5))
-        ax1.plot(self.metrics["times"], self.metrics["vertical_waiting_counts"], label="Vertical Road", color='blue', linewidth=1.5)
-        ax1.plot(self.metrics["times"], self.metrics["horizontal_waiting_counts"], label="Horizontal Road", color='red', linewidth=1.5)
+        # Long runs are drawn as blocks: mean line with the min-max range shaded
+        time_series = self.getTimeSeries()
+        for name, label, color in (("vertical_waiting_counts", "Vertical Road", 'blue'), ("horizontal_waiting_counts", "Horizontal Road", 'red')):
+            times, min_counts, max_counts, mean_counts = time_series.get_plot_series(name, self.config.TIME_SERIES_PLOT_POINTS)
+            ax1.step(times, mean_counts, where='post', label=label, color=color, linewidth=1.5)
+            if np.any(min_counts != max_counts):
+                ax1.fill_between(times, min_counts, max_counts, step='post', color=color, alpha=0.2)
         # Add horizontal mean lines
         ax1.axhline(y=vertical_average_waiting_vehicles, color='blue', linestyle='--', linewidth=1.2, alpha=0.7, label=f'Vertical Road Avg = {vertical_average_waiting_vehicles:.2f}')
         ax1.axhline(y=horizontal_average_waiting_vehicles, color='red', linestyle='--', linewidth=1.2, alpha=0.7, label=f'Horizontal Road Avg = {horizontal_average_waiting_vehicles:.2f}')
@@ -225,14 +542,15 @@ class ScenarioHandler:
         ax1.set_title(f"Waiting Vehicles Over Time (Avg Total: {average_waiting_vehicles:.2f})")
         ax1.grid(True, alpha=0.3)
         ax1.legend()
-        ax1.set_ylim(0, SimulationConfig.Y_AXIS_WAITING_VEHICLES_MAX)
-        ax1.set_yticks(range(0, SimulationConfig.Y_AXIS_WAITING_VEHICLES_MAX + 1, 2))
+        ax1.set_ylim(0, self.config.Y_AXIS_WAITING_VEHICLES_MAX)
+        ax1.set_yticks(range(0, self.config.Y_AXIS_WAITING_VEHICLES_MAX + 1, 2))
         fig1.tight_layout()
 
         # Plot 2: show waiting time per vehicle spawn index
-        final_sorted_waits = sorted(self.metrics["final_wait_times"], key=lambda t: t[0]) # Sort by spawn index
-        xs = [idx for idx, _ in final_sorted_waits]
-        ys = [wt for _, wt in final_sorted_waits]
+        spawn_indices, wait_times = self.getFinalWaitTimes()
+        spawn_order = np.argsort(spawn_indices, kind="stable") # Sort by spawn index
+        xs = spawn_indices[spawn_order]
+        ys = wait_times[spawn_order]
 
         fig2, ax2 = plt.subplots(figsize=(6, 5))
         ax2.scatter(xs, ys, s=10, color='blue', alpha=0.6)
@@ -242,8 +560,8 @@ class ScenarioHandler:
         # Add horizontal mean line
         ax2.axhline(y=average_vehicle_wait_time, color='red', linestyle='--', label='Average Waiting Time')
         ax2.legend()
-        ax2.set_ylim(0, SimulationConfig.Y_AXIS_VEHICLE_WAIT_TIME_MAX)
-        ax2.set_yticks(range(0, SimulationConfig.Y_AXIS_VEHICLE_WAIT_TIME_MAX + 1, 5))
+        ax2.set_ylim(0, self.config.Y_AXIS_VEHICLE_WAIT_TIME_MAX)
+        ax2.set_yticks(range(0, self.config.Y_AXIS_VEHICLE_WAIT_TIME_MAX + 1, 5))
         ax2.grid(True, alpha=0.3)
         fig2.tight_layout()
 
@@ -0,0 +1,83 @@
+from Graphics.SimulationGraphicConfig import SimulationGraphicConfig
+from Vehicle.Vehicle import Vehicle
+
+import io
+import itertools
+import os
+import pickle
+import random
+import tempfile
+import zlib
+
+SNAPSHOT_MAGIC = b"TRAFFICSNAPSHOT1"  # Format marker at the start of every snapshot
+
+class SnapshotPickler(pickle.Pickler):
+    """Pickles images (pygame surfaces can't be pickled) as their key in the scenario's images dictionary"""
+
+    def __init__(self, file, images: dict):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.image_keys = {id(image): key for key, image in images.items() if image is not None}
+
+    def persistent_id(self, obj):
+        key = self.image_keys.get(id(obj))
+        return ("image", key) if key is not None else None
+
+
+class SnapshotUnpickler(pickle.Unpickler):
+    """Resolves the image keys written by SnapshotPickler against the images of the restoring process"""
+
+    def __init__(self, file, images: dict):
+        super().__init__(file)
+        self.images = images
+
+    def persistent_load(self, persistent_id):
+        _, key = persistent_id
+        return self.images[key]
+
+
+def take_snapshot(handler) -> bytes:
+    """Compressed binary snapshot of a stepped run: the scenario with its components, lane queues,
+    vehicle pools and signal controller timers, the handler's clocks and metrics accumulators, and the
+    random module state. Taking a snapshot doesn't change the run.
+
+    Only runs driven by the handler's own stepping (runSimulation, runHeadlessSimulation) can be
+    snapshotted; the event and batch engines keep their state outside the scenario.
+    """
+    # itertools.count can't be pickled: read the next vehicle id and restart the counter there
+    next_vehicle_id = next(Vehicle.id_counter)
+    Vehicle.id_counter = itertools.count(next_vehicle_id)
+    state = {"handler": handler, "random_state": random.getstate(), "next_vehicle_id": next_vehicle_id}
+    buffer = io.BytesIO()
+    SnapshotPickler(buffer, handler.scenario.images).dump(state)
+    return SNAPSHOT_MAGIC + zlib.compress(buffer.getbuffer(), 1)
+
+def restore_snapshot(snapshot: bytes, images: dict = None, display=None):
+    """ScenarioHandler continuing exactly where the snapshot was taken (see ScenarioHandler.resumeHeadlessSimulation).
+
+    Also restores the random module state, so the continuation is identical to the original run, and
+    moves the vehicle id counter past the snapshot's vehicle ids. The counter never moves back, so forks
+    restored and run one after another in a process don't reuse each other's ids (see TripRecords). `images` must have the keys of the images the snapshotted scenario used
+    (default: headless placeholders); `display` attaches a window for runSimulation-style resuming.
+    """
+    if not snapshot.startswith(SNAPSHOT_MAGIC):
+        raise ValueError("Not a scenario snapshot")
+    images = images if images is not None else SimulationGraphicConfig.load_placeholder_images()
+    state = SnapshotUnpickler(io.BytesIO(zlib.decompress(snapshot[len(SNAPSHOT_MAGIC):])), images).load()
+    random.setstate(state["random_state"])
+    Vehicle.id_counter = itertools.count(max(next(Vehicle.id_counter), state["next_vehicle_id"]))
+    handler = state["handler"]
+    handler.display = display
+    return handler
+
+def save_snapshot(handler, path: str) -> None:
+    """Write a snapshot to `path`, atomically: a crash while writing leaves the previous file intact"""
+    snapshot = take_snapshot(handler)
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(file_descriptor, "wb") as file:
+        file.write(snapshot)
+    os.replace(temporary_path, path)
+
+def load_snapshot(path: str, images: dict = None, display=None):
+    with open(path, "rb") as file:
+        return restore_snapshot(file.read(), images, display)
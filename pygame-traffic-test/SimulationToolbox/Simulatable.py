@@ -1,7 +1,23 @@
 class Simulatable:
+    __slots__ = ()  # Lets subclasses such as Vehicle use __slots__
+
     def simulate(self):
         """Abstract method meant to be implemented by subclasses:
         - Vehicle
         """
         pass
-    
\ No newline at end of file
+
+    def get_quiescent_steps(self, delta_time) -> int:
+        """Number of upcoming steps of delta_time during which this component is guaranteed not to
+        change state, so adaptive time stepping can advance them in one go with advance_quiescent().
+        Components that don't know return 0, which forces normal fixed stepping.
+        """
+        return 0
+
+    def advance_quiescent(self, delta_time, steps) -> int:
+        """Advance `steps` steps of delta_time that get_quiescent_steps() guaranteed to be quiescent.
+        Returns the number of steps actually advanced (less than `steps` if the component left the scenario).
+        """
+        for _ in range(steps):
+            self.simulate(delta_time)
+        return steps
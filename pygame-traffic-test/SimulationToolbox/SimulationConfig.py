@@ -1,4 +1,19 @@
-class SimulationConfig:
+from Graphics.SimulationGraphicConfig import SimulationGraphicConfig
+from SimulationToolbox.InstanceConfig import InstanceConfig
+from Vehicle.VehicleState import VehicleState
+
+import json
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11: JSON configs only
+    tomllib = None
+
+class SimulationConfig(InstanceConfig):
+    """Simulation constants. The class values are the defaults; each Scenario holds an instance
+    (see InstanceConfig) that may override some of them, plus the SimulationGraphicConfig instance
+    its roads and vehicles are laid out with, so differently configured scenarios can run side by side."""
+
     VEHICLE_VELOCITY_MPS = 11.11    # 40 km/h = 11.11 m/s
     PIXELS_PER_METER = 10   # 10 pixels = 1 meter, 0.1 meter = 10 pixels
 
@@ -8,18 +23,106 @@ class SimulationConfig:
     TIMER = 0.0             # Virtual time elapsed in seconds
     FRAME_COUNT = 0         # Frame counter
     STOP_VIRTUAL_TIME = 500.0 # Stop simulation after 500 virtual-time seconds
+    RUN_SEED = None         # Seed of the roads' own random streams (see SimulationToolbox.RandomStreams); None: the global random module
+    VERBOSE = True          # Print per-vehicle/per-signal debug messages (turn off for headless batch runs)
+
+    SUBSTEPS = 1                # Fixed simulation steps per frame; each step advances SPEED_FACTOR / FPS / SUBSTEPS virtual seconds
+    MAX_STEPS_PER_FRAME = 5     # Max frames of fixed steps caught up per rendered frame (drops the backlog after a very slow frame)
+    ADAPTIVE_TIME_STEP = False  # Headless only: take large steps while no vehicle is near a stop line, a leader or a signal change
+    ADAPTIVE_MAX_STEPS = 200    # Largest adaptive step, in fixed steps
+    SLEEP_STATIONARY_VEHICLES = True  # Skip simulate() for vehicles queued at a red signal until it turns green or their leader wakes (see SimulationToolbox.ActivityScheduler)
+
+    TIME_SERIES_POLICY = "memory"   # Waiting count time series storage: "memory", "ring", "pyramid" or "memmap" (see Metrics.TimeSeriesStore)
+    TIME_SERIES_CAPACITY = 65536    # Samples kept by "ring", entries per level for "pyramid"
+    TIME_SERIES_CHUNK = 1024        # Samples buffered before they are written to the store
+    TIME_SERIES_SPILL_PATH = None   # File for "memmap" (None: anonymous temporary file)
+    WAIT_SKETCH_RELATIVE_ACCURACY = 0.01  # Relative error of the wait time quantile sketches (see Metrics.WaitTimeStatistics)
+    WAIT_HISTOGRAM_BIN_WIDTH = 1.0        # Wait time histogram bin width in virtual seconds
+    WAIT_HISTOGRAM_BINS = 120             # Wait time histogram bins (the last one also counts longer waits)
+    TIME_SERIES_PLOT_POINTS = 2000  # Max points per plotted time series (longer series are shown as min/max/mean blocks)
+
+    EARLY_STOPPING = False                  # Stop once warm-up is over and the averages are precise enough (see Metrics.SteadyStateDetector)
+    STEADY_STATE_BATCH_SECONDS = 15.0       # Batch length in virtual seconds for warm-up detection and batch means
+    STEADY_STATE_BATCHES = 20               # Batch means the confidence intervals are computed from
+    STEADY_STATE_RELATIVE_PRECISION = 0.10  # Stop when both 95% CI half-widths are below this fraction of their means (0.05 takes ~4000-8000 s)
+    STEADY_STATE_MIN_VIRTUAL_TIME = 300.0   # Never stop early before this many virtual seconds
+    STEADY_STATE_MAX_VIRTUAL_TIME = 5000.0  # Replaces STOP_VIRTUAL_TIME as the run length limit with EARLY_STOPPING
+    CHECKPOINT_INTERVAL = 600.0             # Virtual seconds between headless checkpoints (see ScenarioHandler.checkpoint_path)
 
     MIN_GREEN_DURATION = 5.0   # Minimum green signal duration in real-time seconds
     MAX_GREEN_DURATION = 10.0  # Maximum green signal duration in real-time seconds
     VERTICAL_ROAD_CAR_THRESHOLD = 4.0 # Max number of cars behind vertical road intersection to not change signal
     HORIZONTAL_ROAD_CAR_THRESHOLD = 7.0 # Max number of cars behind horizontal road intersection to not change signal
     BOTH_SIGNALS_RED_DURATION = 1.0  # Duration when both signals are red in real-time seconds
+    SIGNAL_CONTROL_MODE = "threshold"  # "threshold" (red queue vs threshold) or "lookahead" (see SignalController.LookaheadSignalController)
+    LOOKAHEAD_HORIZON = 20.0           # Virtual seconds each candidate action is rolled forward
+    LOOKAHEAD_DECISION_INTERVAL = 1.5  # Virtual seconds between look-ahead decisions after the minimum green
+    LOOKAHEAD_STEP_MULTIPLE = 2        # Rollout step in simulation steps (coarser rollouts are proportionally cheaper)
+    LOOKAHEAD_SEED = 0                 # Seed of the rollouts' spawn draws (independent of the run's random stream)
+
+    QUEUE_MODEL_SATURATION_HEADWAY = 0.0    # Queue model: virtual seconds between vehicles leaving a green lane (0: the whole queue at once)
+    QUEUE_MODEL_JAM_SPACING_METERS = 8.5    # Queue model: road length per queued vehicle (vehicle length plus gap)
+
+    ARRIVAL_MODEL = "bernoulli"         # "bernoulli" (one spawn draw per road per step) or "schedule" (precomputed arrival times, see Road.ArrivalSchedule)
+    ARRIVAL_SCHEDULE_CHUNK = 300.0      # Virtual seconds of arrivals drawn at once by "schedule"
+    DEMAND_PROFILE = "constant"         # "schedule" demand: "constant", "rush_hour" or the path of a CSV trace (see Road.DemandProfile)
+    DEMAND_PROFILE_START_TIME = 0.0     # Time of day (rush_hour) or of the trace (CSV) in seconds at the start of the run
+    DEMAND_PROFILE_RESOLUTION = 60.0    # Seconds per constant-rate segment of the rush_hour curve
+    DEMAND_RUSH_HOUR_BASE = 1.0         # rush_hour traffic outside the peaks, in multiples of the road's traffic intensity
+    DEMAND_RUSH_HOUR_PEAKS = [[8 * 3600.0, 3600.0, 1.0], [17 * 3600.0, 3600.0, 1.0]]  # Time of day, width (s) and extra multiple of each peak
 
     ROAD_IDS = {"Vertical Road": "vertical_road", "Horizontal Road": "horizontal_road"}
     TRAFFIC_INTENSITIES = {"high": 0.045, "medium": 0.03, "low": 0.015} # Chance of spawning a vehicle per frame per road
     # 18, 12, 6 vehicles per minute at 20 FPS
     TRAFFIC_SIGNAL_STATES = {"Red": "signal_red", "Green": "signal_green"}
-    VEHICLE_STATES = {"moving": "moving", "waiting": "waiting"}
+    VEHICLE_STATES = {"moving": VehicleState.MOVING, "waiting": VehicleState.WAITING}
 
     Y_AXIS_WAITING_VEHICLES_MAX = 14  # Max y-axis limit for waiting vehicles plot
-    Y_AXIS_VEHICLE_WAIT_TIME_MAX = 40   # Max y-axis limit for vehicle wait time plot
\ No newline at end of file
+    Y_AXIS_VEHICLE_WAIT_TIME_MAX = 40   # Max y-axis limit for vehicle wait time plot
+
+    def __init__(self, overrides: dict = None, graphics: SimulationGraphicConfig = None):
+        self.graphics = graphics if graphics is not None else SimulationGraphicConfig()
+        super().__init__(overrides)
+
+    def copy(self, overrides: dict = None):
+        config = super().copy(overrides)
+        config.graphics = self.graphics.copy()
+        return config
+
+    @classmethod
+    def load(cls, path: str, overrides: dict = None):
+        """Config from a JSON or TOML (by extension) file of constant names and values. A table
+        under a dictionary constant's name overrides just those entries, and a "graphics" table
+        holds SimulationGraphicConfig constants, e.g. in TOML:
+
+            MIN_GREEN_DURATION = 7.0
+            [TRAFFIC_INTENSITIES]
+            medium = 0.04
+            [graphics]
+            VEHICLE_MIN_GAP_METERS = 1.0
+
+        `overrides` are applied on top of the file's values.
+        """
+        if path.endswith(".toml"):
+            if tomllib is None:
+                raise ImportError("Loading TOML configs requires Python 3.11 or newer (tomllib)")
+            with open(path, "rb") as file:
+                values = tomllib.load(file)
+        else:
+            with open(path) as file:
+                values = json.load(file)
+        graphics_values = values.pop("graphics", {})
+        graphics = SimulationGraphicConfig(flatten_config_tables(SimulationGraphicConfig, graphics_values))
+        return cls({**flatten_config_tables(cls, values), **(overrides or {})}, graphics)
+
+
+def flatten_config_tables(config_class, values: dict) -> dict:
+    """Turn {NAME: {key: value}} tables for dictionary constants into "NAME.key" overrides"""
+    overrides = {}
+    for name, value in values.items():
+        if isinstance(value, dict) and isinstance(getattr(config_class, name, None), dict):
+            for key, entry in value.items():
+                overrides[f"{name}.{key}"] = entry
+        else:
+            overrides[name] = value
+    return overrides
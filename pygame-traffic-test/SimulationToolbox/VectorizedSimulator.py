@@ -0,0 +1,350 @@
+from SignalController.SignalController import SignalController
+from Vehicle.VehicleState import VehicleState
+from Metrics.TimeSeriesStore import TimeSeriesStore
+from Metrics.WaitTimeStatistics import WaitTimeStatistics
+
+import numpy as np
+
+
+class LaneArrays:
+    """Struct-of-arrays storage for the vehicles of one lane.
+
+    Vehicles are kept front first (furthest along the road first), which is also spawn order, so the
+    leader of the vehicle at index i is the one at index i - 1. Positions are along the direction of
+    travel (y on the vertical road, x on the horizontal road). Vehicles spawn at the back and leave
+    from the front, so the live vehicles are the slice [head, tail) of the arrays.
+    """
+
+    # Plain ints: NumPy probes enum members for array interfaces on every comparison
+    MOVING = int(VehicleState.MOVING)
+    WAITING = int(VehicleState.WAITING)
+
+    def __init__(self, road_id: str, lane_id: str, capacity: int = 64):
+        self.road_id = road_id
+        self.lane_id = lane_id
+        self.head = 0
+        self.tail = 0
+        self.position = np.zeros(capacity, dtype=np.float64)
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.wait_time = np.zeros(capacity, dtype=np.float64)
+        self.spawn_index = np.zeros(capacity, dtype=np.int64)
+        self.waiting_count = 0  # Kept up to date by whoever writes `state`
+
+    def __len__(self) -> int:
+        return self.tail - self.head
+
+    def live(self) -> slice:
+        return slice(self.head, self.tail)
+
+    def append(self, position: float, spawn_index: int) -> None:
+        """Add a moving vehicle at the back of the lane"""
+        if self.tail == len(self.position):
+            self.make_room()
+        self.position[self.tail] = position
+        self.state[self.tail] = self.MOVING
+        self.wait_time[self.tail] = 0.0
+        self.spawn_index[self.tail] = spawn_index
+        self.tail += 1
+
+    def make_room(self) -> None:
+        """Move the live slice to the start of the arrays, doubling them if they are more than half full"""
+        count = len(self)
+        capacity = len(self.position) * 2 if count * 2 > len(self.position) else len(self.position)
+        for name in ("position", "state", "wait_time", "spawn_index"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:count] = old[self.head:self.tail]
+            setattr(self, name, new)
+        self.head = 0
+        self.tail = count
+
+    def pop_front(self, count: int) -> list:
+        """Remove the first `count` vehicles and return their (spawn_index, wait_time) pairs"""
+        removed = list(zip(self.spawn_index[self.head:self.head + count].tolist(), self.wait_time[self.head:self.head + count].tolist()))
+        self.head += count
+        self.count_waiting()
+        return removed
+
+    def count_waiting(self) -> None:
+        self.waiting_count = int(np.count_nonzero(self.state[self.head:self.tail] == self.WAITING))
+
+
+class VectorizedSimulator:
+    """Struct-of-arrays model of the same intersection as ScenarioHandler.runSimulation, used for the
+    rollouts of LookaheadSignalController.
+
+    Instead of one Vehicle object per car running simulate() every step, each lane keeps its vehicles'
+    position, state and cumulative wait in NumPy arrays (LaneArrays) and the rules of Vehicle.simulate
+    (leader gaps, the stop-line clamping of handle_red_signal and movement) are applied to a whole lane
+    with array operations. The floating-point updates are the same as the stepped loop's, and a rollout
+    can start from a cheap array copy of the current vehicles (see load_lanes).
+
+    It is not offered as an engine for whole runs: with the few dozen vehicles of the intersection the
+    per-call overhead of NumPy dominates, and a step costs several times more than a stepped-loop step
+    that skips the sleeping vehicles, even with all lanes batched into one array pass.
+    """
+
+    def __init__(self, scenario, step_time: float, spawn_probabilities: dict, config=None, signals: dict = None,
+                 controller: SignalController = None, rng=None):
+        """`scenario` must already be built; spawn_probabilities maps road id to spawn chance per step.
+
+        By default the engine drives the scenario's own signals and controller and draws spawns from the
+        roads' streams (Road.draw_spawn_chance). Rollouts (see LookaheadSignalController) pass cloned signals (by road id)
+        and controller, their own random.Random and a config of their own instead.
+        """
+        self.config = config if config is not None else scenario.config
+        self.scenario = scenario
+        self.rng = rng  # None: each road's own draws (Road.draw_spawn_chance and Road.choose_spawn_lane)
+        self.step_time = step_time
+        self.spawn_probabilities = spawn_probabilities
+        self.roads = scenario.getRoads()
+        self.step_pixels = self.config.VEHICLE_VELOCITY_MPS * step_time * self.config.PIXELS_PER_METER
+        self.min_gap = self.config.graphics.VEHICLE_MIN_GAP_METERS * self.config.PIXELS_PER_METER
+        self.spawn_gap = self.config.graphics.VEHICLE_SPAWN_GAP_METERS * self.config.PIXELS_PER_METER
+        self.vehicle_length = self.config.graphics.VEHICLE_WIDTH  # Vehicles are VEHICLE_WIDTH long along both roads
+
+        self.lanes = {
+            road.getRoadID(): {lane_id: LaneArrays(road.getRoadID(), lane_id) for lane_id in road.vehicle_lanes}
+            for road in self.roads
+        }
+        self.signals = signals if signals is not None else {road.getRoadID(): scenario.get_signal_for_road(road.getRoadID()) for road in self.roads}
+        self.controller = controller
+        if controller is None:
+            for simulatable in scenario.getSimulatables():
+                if isinstance(simulatable, SignalController):
+                    self.controller = simulatable
+        if self.controller is not None:
+            # Let the controller read red-road queues and vehicles from the arrays instead of the (empty) lane lists
+            self.controller.waiting_vehicle_counter = self.count_waiting_vehicles
+            self.controller.lane_state_source = self.capture_lanes
+
+        self.step_index = 0
+        self.timer = 0.0
+        self.metrics = {
+            "time_series": TimeSeriesStore.create(TimeSeriesStore.WAITING_COUNT_CHANNELS, config=self.config),
+            "integral_waiting": 0.0,
+            "integral_vertical_waiting": 0.0,
+            "integral_horizontal_waiting": 0.0,
+            "total_virtual_time": 0.0,
+
+            "next_vehicle_spawn_index": 0,
+            "final_wait_times": [],
+            "wait_statistics": WaitTimeStatistics(self.config)
+        }
+
+    # ----------------------------------
+    # === RUN LOOP
+    # ----------------------------------
+    def step(self) -> None:
+        """Advance one fixed step in the same order as ScenarioHandler.stepSimulation"""
+        delta_time = self.step_time
+        self.step_index += 1
+        self.timer += delta_time
+        self.record_waiting_sample(delta_time)
+
+        for road in self.roads:
+            if (self.rng.random() if self.rng is not None else road.draw_spawn_chance()) < self.spawn_probabilities[road.getRoadID()]:
+                self.try_spawn_vehicle(road)
+
+        if self.controller is not None:
+            self.controller.simulate(delta_time)
+
+        exited = []
+        for road_id, lanes in self.lanes.items():
+            signal = self.signals[road_id]
+            stop_line_position = self.config.graphics.STOP_LINE_POSITIONS[road_id]
+            for lane in lanes.values():
+                if len(lane) == 0:
+                    continue
+                if signal.is_red():
+                    self.update_lane_red(lane, stop_line_position)
+                else:
+                    self.update_lane(lane, signal.is_green())
+                exited.extend(self.remove_exited_vehicles(lane))
+        # Vehicles are removed in simulation (spawn) order, as in stepSimulation
+        exited.sort()
+        self.metrics["final_wait_times"].extend(exited)
+
+    # ----------------------------------
+    # === LANE STATE
+    # ----------------------------------
+    @staticmethod
+    def capture_scenario_lanes(scenario) -> dict:
+        """Position, state and wait time arrays (front first) of the Vehicle objects in each lane of a
+        stepped scenario, by (road id, lane id), in the form load_lanes takes"""
+        lane_state = {}
+        vertical_road_id = scenario.config.ROAD_IDS["Vertical Road"]
+        scenario.activity.settle_all()
+        for road in scenario.getRoads():
+            road_id = road.getRoadID()
+            for lane_id, lane_queue in road.vehicle_lanes.items():
+                vehicles = list(lane_queue)
+                positions = [vehicle.y for vehicle in vehicles] if road_id == vertical_road_id else [vehicle.x for vehicle in vehicles]
+                lane_state[(road_id, lane_id)] = (np.array(positions, dtype=np.float64),
+                                                  np.array([vehicle.state for vehicle in vehicles], dtype=np.int8),
+                                                  np.array([vehicle.wait_time for vehicle in vehicles], dtype=np.float64))
+        return lane_state
+
+    def capture_lanes(self) -> dict:
+        """capture_scenario_lanes for this engine's own lane arrays"""
+        lane_state = {}
+        for road_id, lanes in self.lanes.items():
+            for lane_id, lane in lanes.items():
+                live = lane.live()
+                lane_state[(road_id, lane_id)] = (lane.position[live].copy(), lane.state[live].copy(), lane.wait_time[live].copy())
+        return lane_state
+
+    def load_lanes(self, lane_state: dict) -> None:
+        """Replace the vehicles of every lane with copies of captured ones (see capture_scenario_lanes),
+        so several engines can start from one capture without affecting each other"""
+        for (road_id, lane_id), (positions, states, wait_times) in lane_state.items():
+            lane = LaneArrays(road_id, lane_id, max(64, 2 * len(positions)))
+            count = len(positions)
+            lane.position[:count] = positions
+            lane.state[:count] = states
+            lane.wait_time[:count] = wait_times
+            lane.spawn_index[:count] = -1  # Not tracked: loaded vehicles have no spawn index here
+            lane.tail = count
+            lane.count_waiting()
+            self.lanes[road_id][lane_id] = lane
+
+    # ----------------------------------
+    # === METRICS
+    # ----------------------------------
+    def count_waiting_vehicles(self, road_id: str) -> int:
+        return sum(lane.waiting_count for lane in self.lanes[road_id].values())
+
+    def record_waiting_sample(self, delta_time: float) -> None:
+        """Per-step waiting counts, integrals and per-vehicle wait accumulation (states from the previous step)"""
+        vertical_waiting_count = self.count_waiting_vehicles(self.config.ROAD_IDS["Vertical Road"])
+        horizontal_waiting_count = self.count_waiting_vehicles(self.config.ROAD_IDS["Horizontal Road"])
+        waiting_vehicles_count = vertical_waiting_count + horizontal_waiting_count
+        self.metrics["time_series"].append(self.timer, (waiting_vehicles_count, vertical_waiting_count, horizontal_waiting_count))
+        self.metrics["integral_waiting"] += waiting_vehicles_count * delta_time
+        self.metrics["integral_vertical_waiting"] += vertical_waiting_count * delta_time
+        self.metrics["integral_horizontal_waiting"] += horizontal_waiting_count * delta_time
+        self.metrics["total_virtual_time"] += delta_time
+
+        for lanes in self.lanes.values():
+            for lane in lanes.values():
+                if lane.waiting_count == 0:
+                    continue
+                live = lane.live()
+                wait_time = lane.wait_time[live]
+                wait_time[lane.state[live] == LaneArrays.WAITING] += delta_time
+
+    # ----------------------------------
+    # === SPAWNING
+    # ----------------------------------
+    def get_start_position(self, road_id: str, lane_id: str) -> float:
+        x, y = self.config.graphics.LANE_STARTING_POSITIONS[f"{road_id}_{lane_id}"]
+        return y if road_id == self.config.ROAD_IDS["Vertical Road"] else x
+
+    def can_spawn_in_lane(self, lane: LaneArrays) -> bool:
+        """Same test as Road.can_spawn_in_lane (pygame.Rect truncates positions to ints) on the lane arrays"""
+        if len(lane) == 0:
+            return True
+        start_position = self.get_start_position(lane.road_id, lane.lane_id)
+        # Extent of the spawn rectangle along the direction of travel
+        if lane.road_id == self.config.ROAD_IDS["Vertical Road"]:
+            spawn_length = self.config.graphics.VEHICLE_HEIGHT
+        else:
+            spawn_length = self.config.graphics.VEHICLE_WIDTH
+        vehicle_starts = np.trunc(lane.position[lane.live()] + self.spawn_gap)
+        overlaps = (vehicle_starts + self.vehicle_length > start_position) & (vehicle_starts < start_position + spawn_length)
+        return not overlaps.any()
+
+    def try_spawn_vehicle(self, road) -> None:
+        """Same lane choice as Road.try_spawn_vehicle_in_lane (Road.choose_spawn_lane, or drawn from self.rng)"""
+        road_id = road.getRoadID()
+        first_lane = self.rng.choice(list(road.vehicle_lanes)) if self.rng is not None else road.choose_spawn_lane()
+        second_lane = "left_lane" if first_lane == "right_lane" else "right_lane"
+        for lane_id in (first_lane, second_lane):
+            lane = self.lanes[road_id][lane_id]
+            if self.can_spawn_in_lane(lane):
+                lane.append(self.get_start_position(road_id, lane_id), self.metrics["next_vehicle_spawn_index"])
+                self.metrics["next_vehicle_spawn_index"] += 1
+                return
+
+    # ----------------------------------
+    # === VEHICLE UPDATES
+    # ----------------------------------
+    def update_lane(self, lane: LaneArrays, is_green: bool) -> None:
+        """Green (everyone moves) or any other non-red signal state (no state changes)"""
+        live = lane.live()
+        if is_green:
+            lane.state[live] = LaneArrays.MOVING
+            lane.waiting_count = 0
+            lane.position[live] -= self.step_pixels
+        else:
+            position = lane.position[live]
+            position[lane.state[live] == LaneArrays.MOVING] -= self.step_pixels
+
+    def update_lane_red(self, lane: LaneArrays, stop_line_position: float) -> None:
+        """Vectorized Vehicle.handle_red_signal followed by move() for a whole lane.
+
+        Every vehicle reacts to its leader's position and state after the leader's own update, which
+        is a front-to-back recurrence. It is solved by fixed-point iteration: each pass recomputes all
+        vehicles from the previous pass's leader results, and a vehicle's result is final once its
+        leader's is, so the iteration converges in at most one pass per vehicle in the longest chain of
+        interacting vehicles (usually two or three passes).
+        """
+        live = lane.live()
+        position = lane.position[live]
+        is_waiting = lane.state[live] == LaneArrays.WAITING
+        next_position = position - self.step_pixels
+
+        # Rules that don't depend on the leader
+        stops_at_line = (position > stop_line_position) & (next_position < stop_line_position)
+        in_stop_zone = (stop_line_position - 5 <= position) & (position <= stop_line_position)
+        past_line = position < stop_line_position - 5
+        own_waiting = np.where(stops_at_line | in_stop_zone, True, np.where(past_line, False, is_waiting))
+        checks_leader = ~(stops_at_line | in_stop_zone | past_line)
+
+        new_waiting = own_waiting.copy()
+        new_position = np.where(stops_at_line, stop_line_position, np.where(own_waiting, position, next_position))
+        if len(position) == 1:
+            self.write_lane(lane, new_position, new_waiting)
+            return
+
+        follower_position = position[1:]
+        follower_next_position = next_position[1:]
+        follower_stops_at_line = stops_at_line[1:]
+        follower_checks_leader = checks_leader[1:]
+        follower_own_waiting = own_waiting[1:]
+        while True:
+            leader_position = new_position[:-1]
+            # A leader that left the screen in this step is already removed when its follower updates
+            has_leader = leader_position >= 0 - self.vehicle_length
+            leader_waiting = new_waiting[:-1] & has_leader
+            # Predictive clamp behind the leader regardless of its state
+            allowed_position = (leader_position + self.vehicle_length) + self.min_gap
+            clamped = has_leader & (follower_next_position < allowed_position)
+            # check_ahead_vehicle_gap: follow a waiting leader's state depending on the gap to it
+            gap = (follower_position - leader_position) - self.vehicle_length
+            waiting = np.where(clamped, True, np.where(follower_checks_leader & leader_waiting, gap <= self.min_gap, follower_own_waiting))
+            positions = np.where(clamped, allowed_position, np.where(follower_stops_at_line, stop_line_position, np.where(waiting, follower_position, follower_next_position)))
+            if np.array_equal(waiting, new_waiting[1:]) and np.array_equal(positions, new_position[1:]):
+                break
+            new_waiting[1:] = waiting
+            new_position[1:] = positions
+        self.write_lane(lane, new_position, new_waiting)
+
+    def write_lane(self, lane: LaneArrays, new_position, new_waiting) -> None:
+        live = lane.live()
+        lane.position[live] = new_position
+        lane.state[live] = np.where(new_waiting, LaneArrays.WAITING, LaneArrays.MOVING)
+        lane.waiting_count = int(np.count_nonzero(new_waiting))
+
+    def remove_exited_vehicles(self, lane: LaneArrays) -> list:
+        """Remove vehicles that left the screen; they are always at the front of the lane"""
+        exited_count = int(np.count_nonzero(lane.position[lane.live()] < 0 - self.vehicle_length))
+        if exited_count == 0:
+            return []
+        return self.record_wait_times(lane, lane.pop_front(exited_count))
+
+    def record_wait_times(self, lane: LaneArrays, removed: list) -> list:
+        """Add the wait times of vehicles removed from a lane to the wait time statistics"""
+        for _, wait_time in removed:
+            self.metrics["wait_statistics"].add(lane.road_id, lane.lane_id, wait_time)
+        return removed
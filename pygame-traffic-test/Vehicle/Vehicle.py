@@ -2,29 +2,61 @@ from Animation.Animatable import Animatable
 from SimulationToolbox.Simulatable import Simulatable
 from Graphics.SimulationGraphicConfig import SimulationGraphicConfig
 from SimulationToolbox.SimulationConfig import SimulationConfig
+from Vehicle.VehicleState import VehicleState
+
+import itertools
+
+# Config of vehicles created without one (Road always passes its own), shared so they don't each carry a copy
+default_config = SimulationConfig()
 
 class Vehicle(Animatable, Simulatable):
-    def __init__(self, width, height, velocity, image, road_id, lane_id):
+    __slots__ = ("width", "height", "velocity", "image", "road_id", "lane_id", "x", "y", "state",
+                 "stop_line_position", "scenario", "leader", "follower", "lane_queue", "road",
+                 "behind_stop_line", "vehicle_id", "spawn_index", "spawn_time", "stop_line_time", "wait_time",
+                 "stop_count", "config")
+
+    id_counter = itertools.count()  # Shared by all vehicles: ids are never reused, not even by pooled vehicles
+
+    def __init__(self, width, height, velocity, image, road_id, lane_id, config: SimulationConfig = None):
+        self.config = config if config is not None else default_config  # Shared with the vehicle's Road
         self.width = width
         self.height = height
         self.velocity = velocity # 11.11 m/s
-        self.image = image
         self.road_id = road_id
+        self.stop_line_position = self.config.graphics.STOP_LINE_POSITIONS[road_id]
+        self.reset(image, lane_id)
+
+    def reset(self, image, lane_id) -> None:
+        """Start a new trip in the given lane: used by __init__ and when Road reuses a pooled vehicle"""
+        self.vehicle_id = next(Vehicle.id_counter)  # Stable id for metrics
+        self.image = image
         self.lane_id = lane_id
-        self.x, self.y = SimulationGraphicConfig.LANE_STARTING_POSITIONS[f"{road_id}_{lane_id}"]
-        self.state = SimulationConfig.VEHICLE_STATES["moving"]  # default is "moving", can change to "waiting"
-        self.stop_line_position = SimulationGraphicConfig.STOP_LINE_POSITIONS[road_id]
+        self.x, self.y = self.config.graphics.LANE_STARTING_POSITIONS[f"{self.road_id}_{lane_id}"]
+        self.state = VehicleState.MOVING  # default is "moving", can change to "waiting"
         self.scenario = None  # to be set when added to scenario
+        self.leader = None      # Vehicle ahead in the same lane, maintained by Road.LaneQueue
+        self.follower = None    # Vehicle behind in the same lane, maintained by Road.LaneQueue
+        self.lane_queue = None  # LaneQueue this vehicle is registered in
+        self.road = None        # Road whose lane this vehicle is registered in (keeps its queue counters)
+        self.behind_stop_line = self.is_behind_stop_line()
+
+        # Trip metrics, written to the handler's TripRecords when the vehicle leaves
+        self.spawn_index = None            # Set by ScenarioHandler when the vehicle spawns
+        self.spawn_time = float("nan")     # Virtual time of spawning
+        self.stop_line_time = float("nan") # Virtual time the vehicle fully crossed its stop line
+        self.wait_time = 0.0               # Virtual seconds spent in 'waiting' state
+        self.stop_count = 0                # Number of times the vehicle came to a stop
 
     # ----------------------------------
     # === BASIC MOVEMENT AND DRAWING
     # ----------------------------------
-    def move(self):
-        distance_pixels = self.velocity * self.delta_time * SimulationConfig.PIXELS_PER_METER # 16.665 pixels per frame at 20 FPS
+    def move(self, delta_time):
+        distance_pixels = self.velocity * delta_time * self.config.PIXELS_PER_METER # 16.665 pixels per frame at 20 FPS
         if self.road_id == "vertical_road":
             self.y -= distance_pixels
         elif self.road_id == "horizontal_road":
             self.x -= distance_pixels
+        self.update_stop_line_side()
 
     def draw(self, screen):
         screen.blit(self.image, (self.x, self.y))
@@ -32,48 +64,50 @@ class Vehicle(Animatable, Simulatable):
     def is_off_screen(self):
         return self.x < 0 - self.width or self.y < 0 - self.height
 
+    # ----------------------------------
+    # === STATE AND QUEUE COUNTERS
+    # ----------------------------------
+    def set_state(self, state) -> None:
+        """Change the vehicle state, keeping the road's waiting counters in sync"""
+        if state == self.state:
+            return
+        previous_state = self.state
+        self.state = state
+        if state == VehicleState.WAITING:
+            self.stop_count += 1
+        if self.road is not None:
+            self.road.on_vehicle_state_changed(self, previous_state)
+
+    def is_behind_stop_line(self) -> bool:
+        """Check if any part of the vehicle is still behind the stop line"""
+        if self.road_id == "vertical_road":
+            return self.y + self.height > self.stop_line_position
+        elif self.road_id == "horizontal_road":
+            return self.x + self.width > self.stop_line_position
+        return False
+
+    def update_stop_line_side(self) -> None:
+        """Call after every position change: tells the road when the vehicle crosses its stop line"""
+        behind_stop_line = self.is_behind_stop_line()
+        if behind_stop_line != self.behind_stop_line:
+            self.behind_stop_line = behind_stop_line
+            if not behind_stop_line and self.scenario is not None:
+                self.stop_line_time = self.scenario.virtual_time
+            if self.road is not None:
+                self.road.on_vehicle_crossed_stop_line(self)
+
     # ----------------------------------
     # === AHEAD VEHICLE LOGIC
     # ----------------------------------
     def get_nearest_ahead_vehicle(self):
-        """Get the nearest vehicle ahead in the same lane, if any"""
-        road = None
-        for road_component in self.scenario.getRoads():
-            if road_component.getRoadID() == self.road_id:
-                road = road_component
-        lane_list = road.vehicle_lanes[self.lane_id] # Current lane of the current road of the current vehicle
-        
-        vehicles = [v for v in lane_list if v is not self]
-        
-        ahead_vehicles = []
-        if self.road_id == "horizontal_road":
-            for vehicle in vehicles:
-                if vehicle.x < self.x:
-                    ahead_vehicles.append(vehicle)
-                
-            if not ahead_vehicles:
-                return None   # No car ahead, safe to move
-            
-            nearest_vehicle = max(ahead_vehicles, key=lambda v: v.x)
-            return nearest_vehicle
-        
-        elif self.road_id == "vertical_road":
-            for vehicle in vehicles:
-                if vehicle.y < self.y:
-                    ahead_vehicles.append(vehicle)
-
-            if not ahead_vehicles:
-                return None   # No car ahead, safe to move
-            
-            nearest_vehicle = max(ahead_vehicles, key=lambda v: v.y)
-            return nearest_vehicle
-        return None
+        """Get the nearest vehicle ahead in the same lane, if any (kept up to date by the lane's LaneQueue)"""
+        return self.leader
 
     def is_nearest_ahead_vehicle_waiting(self):
         """Check if the nearest ahead vehicle is in 'waiting' state"""
         vehicle = self.get_nearest_ahead_vehicle()
         if vehicle:
-            return vehicle.state == SimulationConfig.VEHICLE_STATES["waiting"]
+            return vehicle.state == VehicleState.WAITING
         return False
     
     def get_ahead_vehicle_gap(self):
@@ -109,11 +143,11 @@ class Vehicle(Animatable, Simulatable):
     def check_ahead_vehicle_gap(self, gap) -> None:
         """Check the gap to the nearest ahead vehicle and adjust state if needed"""
         if gap is not None and self.is_nearest_ahead_vehicle_waiting():
-            min_gap = SimulationGraphicConfig.VEHICLE_MIN_GAP_METERS * SimulationConfig.PIXELS_PER_METER
+            min_gap = self.config.graphics.VEHICLE_MIN_GAP_METERS * self.config.PIXELS_PER_METER
             if gap <= min_gap:
-                self.state = SimulationConfig.VEHICLE_STATES["waiting"]
+                self.set_state(VehicleState.WAITING)
             else:
-                self.state = SimulationConfig.VEHICLE_STATES["moving"]
+                self.set_state(VehicleState.MOVING)
 
     def handle_red_signal(self, distance_pixels, gap) -> None:
         """Handle vehicle behavior when the traffic signal is red"""
@@ -122,22 +156,25 @@ class Vehicle(Animatable, Simulatable):
             # Predictive clamp behind the nearest ahead vehicle regardless of its state.
             ahead = self.get_nearest_ahead_vehicle()
             if ahead is not None:
-                min_gap_px = SimulationGraphicConfig.VEHICLE_MIN_GAP_METERS * SimulationConfig.PIXELS_PER_METER
+                min_gap_px = self.config.graphics.VEHICLE_MIN_GAP_METERS * self.config.PIXELS_PER_METER
                 # Vehicle ahead's back bumper position plus minimum gap defines the furthest forward we can be (largest y)
                 allowed_min_y = ahead.y + ahead.height + min_gap_px
                 # If our next step would violate the gap, clamp and wait
                 if next_frame_y < allowed_min_y:
                     self.y = allowed_min_y
-                    self.state = SimulationConfig.VEHICLE_STATES["waiting"]
+                    self.update_stop_line_side()
+                    self.set_state(VehicleState.WAITING)
                     return
             if self.should_stop_at_signal(next_frame_y):
                 self.y = self.stop_line_position
-                self.state = SimulationConfig.VEHICLE_STATES["waiting"]
-                print(f"Vehicle at ({self.x}, {self.y}) stopped at vertical line {self.stop_line_position}.")
+                self.update_stop_line_side()
+                self.set_state(VehicleState.WAITING)
+                if self.config.VERBOSE:
+                    print(f"Vehicle at ({self.x}, {self.y}) stopped at vertical line {self.stop_line_position}.")
             elif self.within_stop_zone():
-                self.state = SimulationConfig.VEHICLE_STATES["waiting"]
+                self.set_state(VehicleState.WAITING)
             elif self.y < self.stop_line_position - 5: # Already 5 pixels past the stop line
-                self.state = SimulationConfig.VEHICLE_STATES["moving"]
+                self.set_state(VehicleState.MOVING)
             else:
                 self.check_ahead_vehicle_gap(gap)
         elif self.road_id == "horizontal_road":
@@ -145,20 +182,23 @@ class Vehicle(Animatable, Simulatable):
             # Predictive clamp behind the nearest ahead vehicle regardless of its state.
             ahead = self.get_nearest_ahead_vehicle()
             if ahead is not None:
-                min_gap_px = SimulationGraphicConfig.VEHICLE_MIN_GAP_METERS * SimulationConfig.PIXELS_PER_METER
+                min_gap_px = self.config.graphics.VEHICLE_MIN_GAP_METERS * self.config.PIXELS_PER_METER
                 allowed_min_x = ahead.x + ahead.width + min_gap_px
                 if next_frame_x < allowed_min_x:
                     self.x = allowed_min_x
-                    self.state = SimulationConfig.VEHICLE_STATES["waiting"]
+                    self.update_stop_line_side()
+                    self.set_state(VehicleState.WAITING)
                     return
             if self.should_stop_at_signal(next_frame_x):
                 self.x = self.stop_line_position
-                self.state = SimulationConfig.VEHICLE_STATES["waiting"]
-                print(f"Vehicle at ({self.x}, {self.y}) stopped at horizontal line {self.stop_line_position}.")
+                self.update_stop_line_side()
+                self.set_state(VehicleState.WAITING)
+                if self.config.VERBOSE:
+                    print(f"Vehicle at ({self.x}, {self.y}) stopped at horizontal line {self.stop_line_position}.")
             elif self.within_stop_zone():
-                self.state = SimulationConfig.VEHICLE_STATES["waiting"]
+                self.set_state(VehicleState.WAITING)
             elif self.x < self.stop_line_position - 5: # Already 5 pixels past the stop line
-                self.state = SimulationConfig.VEHICLE_STATES["moving"]
+                self.set_state(VehicleState.MOVING)
             else:
                 self.check_ahead_vehicle_gap(gap)
 
@@ -167,18 +207,112 @@ class Vehicle(Animatable, Simulatable):
         if signal.is_red():
             self.handle_red_signal(distance_pixels, gap)
         elif signal.is_green():
-            self.state = SimulationConfig.VEHICLE_STATES["moving"]
+            self.set_state(VehicleState.MOVING)
 
     def simulate(self, delta_time):
         """Simulate vehicle behavior for the given delta time"""
-        self.delta_time = delta_time
         signal = self.scenario.get_signal_for_road(self.road_id)
         ahead_vehicle_gap = self.get_ahead_vehicle_gap()
-        distance_pixels = self.velocity * delta_time * SimulationConfig.PIXELS_PER_METER
+        distance_pixels = self.velocity * delta_time * self.config.PIXELS_PER_METER
 
         # Update vehicle state based on traffic signal
         self.handle_signal_behavior(signal, distance_pixels, ahead_vehicle_gap)
 
         # Move vehicle if in "moving" state
-        if self.state == SimulationConfig.VEHICLE_STATES["moving"]:
-            self.move()
\ No newline at end of file
+        if self.state == VehicleState.MOVING:
+            self.move(delta_time)
+        elif self.config.SLEEP_STATIONARY_VEHICLES and self.can_sleep(signal, distance_pixels):
+            self.scenario.activity.sleep(self)
+
+    def can_sleep(self, signal, distance_pixels) -> bool:
+        """Check if simulate() can't change this waiting vehicle until its signal turns green or its
+        leader wakes: clamped behind a sleeping leader, or without a leader and held in the stop zone or
+        behind the stop line (mirrors the red signal checks of handle_red_signal)"""
+        if self.state != VehicleState.WAITING or not signal.is_red():
+            return False
+        if self.road_id == "vertical_road":
+            position = self.y
+        else:
+            position = self.x
+        ahead = self.get_nearest_ahead_vehicle()
+        if ahead is not None:
+            if not self.scenario.activity.is_asleep(ahead):
+                return False
+            min_gap_px = self.config.graphics.VEHICLE_MIN_GAP_METERS * self.config.PIXELS_PER_METER
+            if self.road_id == "vertical_road":
+                return position == ahead.y + ahead.height + min_gap_px
+            return position == ahead.x + ahead.width + min_gap_px
+        if self.stop_line_position - 5 <= position <= self.stop_line_position:
+            return True
+        return position - distance_pixels > self.stop_line_position
+
+    # ----------------------------------
+    # === ADAPTIVE TIME STEPPING
+    # ----------------------------------
+    def get_quiescent_steps(self, delta_time) -> int:
+        """Number of upcoming steps of delta_time in which this vehicle cannot change state, reach its
+        stop line, close up on its leader (mirrors the checks in handle_red_signal) or clear its stop
+        line (so stop_line_time is taken from a normal step's virtual time)"""
+        steps = self.get_steps_before_state_change(delta_time)
+        if steps > 0 and self.behind_stop_line and self.state == VehicleState.MOVING:
+            distance_pixels = self.velocity * delta_time * self.config.PIXELS_PER_METER
+            if self.road_id == "vertical_road":
+                behind_pixels = self.y + self.height - self.stop_line_position
+            else:
+                behind_pixels = self.x + self.width - self.stop_line_position
+            steps = min(steps, self.steps_before_reaching(behind_pixels, distance_pixels))
+        return steps
+
+    def get_steps_before_state_change(self, delta_time) -> int:
+        """Quiescent steps as far as the signal, stop line and leader checks of handle_red_signal go"""
+        max_steps = self.config.ADAPTIVE_MAX_STEPS
+        is_waiting = self.state == VehicleState.WAITING
+        signal = self.scenario.get_signal_for_road(self.road_id)
+        if signal.is_green():
+            # Green: always moving, no stop line or leader checks
+            return 0 if is_waiting else max_steps
+
+        distance_pixels = self.velocity * delta_time * self.config.PIXELS_PER_METER
+        if self.road_id == "vertical_road":
+            position = self.y
+        else:
+            position = self.x
+
+        ahead = self.get_nearest_ahead_vehicle()
+        if ahead is not None:
+            min_gap_px = self.config.graphics.VEHICLE_MIN_GAP_METERS * self.config.PIXELS_PER_METER
+            if self.road_id == "vertical_road":
+                allowed_position = ahead.y + ahead.height + min_gap_px
+            else:
+                allowed_position = ahead.x + ahead.width + min_gap_px
+            if ahead.state == VehicleState.WAITING:
+                if is_waiting:
+                    # Stable only when already clamped exactly behind the stopped leader
+                    return max_steps if position == allowed_position else 0
+                return self.steps_before_reaching(position - allowed_position, distance_pixels)
+            # Leader moves at the same speed, so the gap holds as long as it is clear of the clamp
+            if position - allowed_position <= 1e-6:
+                return 0
+
+        if position < self.stop_line_position - 5:
+            return 0 if is_waiting else max_steps  # past the stop line: always moving
+        if position <= self.stop_line_position:
+            return max_steps if is_waiting else 0  # in the stop zone: always waiting
+        if is_waiting:
+            # Stopped behind the line with no stopped leader: stays put unless it would snap to the line
+            return max_steps if position - distance_pixels > self.stop_line_position else 0
+        return self.steps_before_reaching(position - self.stop_line_position, distance_pixels)
+
+    def steps_before_reaching(self, free_pixels, distance_pixels) -> int:
+        """Whole steps the vehicle can move while staying at least one more step away from an obstacle"""
+        return max(0, min(int(free_pixels / distance_pixels) - 1, self.config.ADAPTIVE_MAX_STEPS))
+
+    def advance_quiescent(self, delta_time, steps) -> int:
+        """Move through `steps` quiescent steps; stops early (and returns the steps taken) once off-screen"""
+        if self.state == VehicleState.WAITING:
+            return steps
+        for step in range(steps):
+            self.move(delta_time)
+            if self.is_off_screen():
+                return step + 1
+        return steps
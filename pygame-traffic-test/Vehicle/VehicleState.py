@@ -0,0 +1,7 @@
+from enum import IntEnum
+
+
+class VehicleState(IntEnum):
+    """Vehicle state codes (SimulationConfig.VEHICLE_STATES maps the state names to these)"""
+    MOVING = 0
+    WAITING = 1
@@ -0,0 +1,48 @@
+from Experiments.ResultCache import ResultCache
+
+import argparse
+import time
+
+def parse_size(text: str) -> int:
+    """Byte count such as 500000, 200KB, 500MB or 2GB"""
+    units = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+    for unit, factor in units.items():
+        if text.upper().endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+parser = argparse.ArgumentParser(description="Inspect or prune the simulation result cache")
+parser.add_argument("--dir", default=".simulation_cache", help="cache directory")
+subparsers = parser.add_subparsers(dest="command", required=True)
+subparsers.add_parser("stats", help="number of entries and total size")
+subparsers.add_parser("list", help="entries, least recently used first")
+show_parser = subparsers.add_parser("show", help="summary metrics of one entry")
+show_parser.add_argument("key", help="entry key (as printed by list)")
+prune_parser = subparsers.add_parser("prune", help="evict least recently used entries")
+prune_parser.add_argument("--max-size", type=parse_size, default=None, help="evict until the cache fits, e.g. 500MB")
+prune_parser.add_argument("--older-than-days", type=float, default=None, help="evict entries not used for this many days")
+subparsers.add_parser("clear", help="remove every entry")
+args = parser.parse_args()
+
+cache = ResultCache(args.dir)
+if args.command == "stats":
+    entries = cache.get_entries()
+    total_size = sum(size for _, size, _ in entries)
+    print(f"{len(entries)} entries, {total_size / 1024 ** 2:.2f} MB (bound {cache.max_bytes / 1024 ** 2:.0f} MB) in {args.dir}")
+elif args.command == "list":
+    for key, size, last_used in cache.get_entries():
+        print(f"{key}  {size / 1024:10.1f} KB  last used {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_used))}")
+elif args.command == "show":
+    result = cache.load(args.key)
+    if result is None:
+        print(f"No entry {args.key} in {args.dir}")
+    else:
+        for name, value in result["summary"].items():
+            print(f"{name}: {value}")
+        print(f"trip records: {len(next(iter(result['trips'].values()), []))}, time series samples: {len(result['time_series']['times'])}")
+elif args.command == "prune":
+    older_than_seconds = args.older_than_days * 86400.0 if args.older_than_days is not None else None
+    max_bytes = args.max_size if args.max_size is not None or older_than_seconds is not None else cache.max_bytes
+    print(f"Removed {cache.prune(max_bytes, older_than_seconds)} entries")
+elif args.command == "clear":
+    print(f"Removed {cache.clear()} entries")
@@ -3,30 +3,112 @@ from Graphics.SimulationGraphicConfig import SimulationGraphicConfig
 from Animation.Display import Display
 from SimulationToolbox.Scenario import Scenario
 from SimulationToolbox.ScenarioHandler import ScenarioHandler
+from SimulationToolbox.ScenarioSnapshot import load_snapshot
+from SimulationToolbox.SimulationConfig import SimulationConfig
 
+import argparse
 import pygame
+import random
 
-pygame.init()
+parser = argparse.ArgumentParser(description="Traffic Simulation Test")
+parser.add_argument("--headless", action="store_true", help="run as fast as possible without a window and print a metrics summary")
+parser.add_argument("--adaptive", action="store_true", help="with --headless: take large time steps while nothing is about to happen")
+parser.add_argument("--engine", choices=["step", "event"], default="step", help="with --headless: frame-stepped loop or discrete-event engine")
+parser.add_argument("--replications", type=int, default=1, help="with --headless: run this many independent replications in lock step and report confidence intervals")
+parser.add_argument("--trips-out", default=None, help="with --headless and the step engine: export the per-vehicle trip records (.npz, .csv or .parquet)")
+parser.add_argument("--time-series", choices=["memory", "ring", "pyramid", "memmap"], default=None, help="storage for the waiting count time series: all samples in memory, last samples only, min/max/mean pyramid or spilled to disk (default SimulationConfig.TIME_SERIES_POLICY)")
+parser.add_argument("--early-stopping", action="store_true", help="stop once the averages after warm-up are precise enough (steady-state detection, see SimulationConfig.STEADY_STATE_*; step engine only)")
+parser.add_argument("--checkpoint", default=None, metavar="PATH", help="with --headless and the step engine: write a scenario snapshot to PATH every --checkpoint-every virtual seconds")
+parser.add_argument("--checkpoint-every", type=float, default=None, metavar="SECONDS", help="virtual seconds between checkpoints (default SimulationConfig.CHECKPOINT_INTERVAL)")
+parser.add_argument("--resume", default=None, metavar="PATH", help="with --headless: continue the run saved in a snapshot or checkpoint instead of starting a new one")
+parser.add_argument("--controller", choices=["threshold", "lookahead"], default=None, help="signal control: red queue threshold or model-predictive look-ahead (default SimulationConfig.SIGNAL_CONTROL_MODE; look-ahead needs the step engine)")
+parser.add_argument("--demand", default=None, metavar="PROFILE", help="spawn precomputed arrivals (SimulationConfig.ARRIVAL_MODEL \"schedule\") with this demand profile: constant, rush_hour or a CSV trace of counts (step engine only)")
+parser.add_argument("--config", default=None, metavar="PATH", help="JSON or TOML file of SimulationConfig overrides (see SimulationConfig.load)")
+parser.add_argument("--seed", type=int, default=None, help="run seed: every road and lane draws from its own stream derived from it (SimulationConfig.RUN_SEED)")
+args = parser.parse_args()
 
-# Create the window
-screen = pygame.display.set_mode((SimulationGraphicConfig.SCREEN_WIDTH, SimulationGraphicConfig.SCREEN_HEIGHT))
+if args.seed is not None:
+    random.seed(args.seed)
+config = SimulationConfig.load(args.config) if args.config is not None else SimulationConfig()
+if args.seed is not None:
+    config.RUN_SEED = args.seed
+if args.time_series is not None:
+    config.TIME_SERIES_POLICY = args.time_series
+if args.early_stopping:
+    config.EARLY_STOPPING = True
+if args.controller is not None:
+    config.SIGNAL_CONTROL_MODE = args.controller
+if args.demand is not None:
+    config.ARRIVAL_MODEL = "schedule"
+    config.DEMAND_PROFILE = args.demand
 
-# Set the window title
-pygame.display.set_caption("Traffic Simulation Test")
+if args.headless:
+    # No window, no clock throttling, no rendering: just step the scenario and report the metrics
+    config.VERBOSE = False
+    config.ADAPTIVE_TIME_STEP = args.adaptive
+    if args.resume is not None:
+        handler = load_snapshot(args.resume)
+    else:
+        scenario = Scenario(SimulationGraphicConfig.load_placeholder_images(), config)
+        handler = ScenarioHandler(scenario)
+    if args.checkpoint is not None:
+        handler.checkpoint_path = args.checkpoint
+        if args.checkpoint_every is not None:
+            handler.checkpoint_interval = args.checkpoint_every
+            handler.next_checkpoint_time = handler.timer + args.checkpoint_every
+    if args.replications > 1:
+        handler.runReplicatedSimulation(args.replications, args.seed)
+        summary = handler.summarizeReplications()
+        print(f"Simulated {args.replications} replications of {handler.timer:.2f} virtual seconds in {handler.real_time:.2f} wall seconds")
+        print(f"Average waiting vehicles: {summary['average_waiting_vehicles'][0]:.2f} +/- {summary['average_waiting_vehicles'][1]:.2f} (95% CI)")
+        print(f"Average vehicle waiting time: {summary['average_vehicle_wait_time'][0]:.2f} +/- {summary['average_vehicle_wait_time'][1]:.2f} virtual seconds (95% CI)")
+    else:
+        if args.resume is not None:
+            handler.resumeHeadlessSimulation()
+        elif args.engine == "event":
+            handler.runEventSimulation()
+        else:
+            handler.runHeadlessSimulation()
 
-# Load images
-images = SimulationGraphicConfig.load_images()
+        print(f"Simulated {handler.metrics['total_virtual_time']:.2f} virtual seconds in {handler.real_time:.2f} wall seconds ({handler.frame_count} fixed steps, {handler.step_count} executed)")
+        print(f"Average waiting vehicles: {handler.calculateTotalAverageWaitingVehicles():.2f}")
+        print(f"Average vehicle waiting time: {handler.calculateAverageVehicleWaitingTime():.2f} virtual seconds")
+        if "warmup_time" in handler.metrics:
+            outcome = "converged" if handler.metrics["steady_state_converged"] else "did not converge before the time limit"
+            print(f"Warm-up: first {handler.metrics['warmup_time']:.2f} virtual seconds excluded from the averages; {outcome}")
+            for name, (mean, half_width) in handler.metrics["confidence_intervals"].items():
+                print(f"Batch means {name.replace('_', ' ')}: {mean:.2f} +/- {half_width:.2f} (95% CI)")
+        if "wait_statistics" in handler.metrics:
+            wait_summary = handler.metrics["wait_statistics"].get().summary()
+            print(f"Vehicle waiting time percentiles: p50 {wait_summary['p50']:.2f}, p95 {wait_summary['p95']:.2f}, p99 {wait_summary['p99']:.2f} virtual seconds")
+        if args.trips_out is not None:
+            if "trips" in handler.metrics:
+                handler.metrics["trips"].save(args.trips_out)
+                print(f"Wrote {len(handler.metrics['trips'])} trip records to {args.trips_out}")
+            else:
+                print("Trip records are only kept by the step engine")
+else:
+    pygame.init()
 
-# Create Display object for rendering the simulation
-display = Display(screen, images)
+    # Create the window
+    screen = pygame.display.set_mode((config.graphics.SCREEN_WIDTH, config.graphics.SCREEN_HEIGHT))
 
-# Create Scenario and ScenarioHandler objects and run the simulation
-scenario = Scenario(images)
-handler = ScenarioHandler(scenario, display)
-handler.runSimulation()
+    # Set the window title
+    pygame.display.set_caption("Traffic Simulation Test")
 
-# Close pygame
-pygame.quit()
+    # Load images
+    images = SimulationGraphicConfig.load_images()
 
-# Display simulation results using matplotlib
-handler.displaySimulationResults()
\ No newline at end of file
+    # Create Display object for rendering the simulation
+    display = Display(screen, images)
+
+    # Create Scenario and ScenarioHandler objects and run the simulation
+    scenario = Scenario(images, config)
+    handler = ScenarioHandler(scenario, display)
+    handler.runSimulation()
+
+    # Close pygame
+    pygame.quit()
+
+    # Display simulation results using matplotlib
+    handler.displaySimulationResults()
@@ -0,0 +1,51 @@
+from Experiments.ParameterSweep import SWEEP_METRICS
+from Experiments.SignalTimingOptimizer import DEFAULT_SEARCH_SPACE, SignalTimingOptimizer
+from SimulationToolbox.SimulationConfig import SimulationConfig
+
+import argparse
+
+def parse_range(text: str) -> tuple:
+    """NAME=LOW:HIGH -> (NAME, (LOW, HIGH))"""
+    name, _, bounds = text.partition("=")
+    low, _, high = bounds.partition(":")
+    return name, (float(low), float(high))
+
+parser = argparse.ArgumentParser(description="Search signal timings and thresholds for the lowest headless objective (successive halving)")
+parser.add_argument("--param", action="append", default=[], metavar="NAME=LOW:HIGH",
+                    help="SimulationConfig value to search, e.g. MIN_GREEN_DURATION=2:10 (repeatable; default: "
+                         + ", ".join(DEFAULT_SEARCH_SPACE) + ")")
+parser.add_argument("--candidates", type=int, default=27, help="sampled candidates besides the current config")
+parser.add_argument("--eta", type=int, default=3, help="keep the best 1/eta candidates per rung, with eta times more seeds")
+parser.add_argument("--min-seeds", type=int, default=2, help="seeds every candidate runs in the first rung")
+parser.add_argument("--max-seeds", type=int, default=18, help="seeds of the last rung and of the final comparison")
+parser.add_argument("--objective", choices=SWEEP_METRICS, default="average_vehicle_wait_time", help="summary metric to minimize")
+parser.add_argument("--engine", choices=["step", "event"], default="step", help="simulation engine of each run")
+parser.add_argument("--stop-time", type=float, default=None, help="virtual seconds per run (default SimulationConfig.STOP_VIRTUAL_TIME)")
+parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+parser.add_argument("--out", default="optimizer_runs.csv", help="table of every run, written as rungs finish")
+parser.add_argument("--config", default=None, metavar="PATH", help="JSON or TOML file of SimulationConfig values the candidates override (and the baseline)")
+parser.add_argument("--cache", default=None, metavar="DIR", help="reuse results of identical runs from (and add new ones to) the result cache in DIR")
+parser.add_argument("--seed", type=int, default=0, help="seed for sampling the candidates")
+args = parser.parse_args()
+
+search_space = dict(parse_range(param) for param in args.param) if args.param else None
+config = SimulationConfig.load(args.config) if args.config is not None else None
+optimizer = SignalTimingOptimizer(search_space, args.candidates, args.eta, args.min_seeds, args.max_seeds, args.objective, args.engine,
+                                  args.stop_time, args.workers, args.cache, config, args.seed)
+
+def print_rung(rung: int, seeds: list, ranking: list) -> None:
+    best, best_mean = ranking[0]
+    print(f"Rung {rung}: {len(ranking)} candidates on {len(seeds)} seeds, best #{best} {args.objective} {best_mean:.3f}")
+
+report = optimizer.run(args.out, print_rung)
+print(f"Best parameters (candidate #{report['candidate']}):")
+for name, value in report["parameters"].items():
+    print(f"  {name} = {value}")
+objective, half_width = report["objective"]
+baseline, baseline_half_width = report["baseline_objective"]
+improvement, improvement_half_width = report["improvement"]
+print(f"{args.objective}: {objective:.3f} +/- {half_width:.3f} (95% CI over {report['seeds']} seeds), "
+      f"current config {baseline:.3f} +/- {baseline_half_width:.3f}")
+print(f"Paired improvement over the current config: {improvement:.3f} +/- {improvement_half_width:.3f}")
+print(f"{report['runs']} runs ({report['simulated_hours']:.1f} simulated hours) instead of {report['exhaustive_runs']} for every candidate on every seed")
+print(f"Runs written to {args.out}")
@@ -0,0 +1,107 @@
+from Experiments.QueueModelCalibration import CALIBRATION_METRICS, QueueModelCalibration, run_reference_points, screen_configurations
+from SimulationToolbox.SimulationConfig import SimulationConfig
+
+import argparse
+import ast
+import csv
+import time
+import numpy as np
+
+def parse_value(text: str):
+    """Python literal if possible (numbers, True/False, ...), else the text itself"""
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+def parse_values(text: str) -> list:
+    return [float(value) for value in text.split(",")]
+
+def parse_seeds(text: str) -> list:
+    """"0-9" (inclusive range) or a comma separated list such as "1,5,7" """
+    if "-" in text:
+        first, last = text.split("-", 1)
+        return list(range(int(first), int(last) + 1))
+    return [int(seed) for seed in text.split(",")]
+
+def parse_grid(params: list) -> dict:
+    grid = {}
+    for param in params:
+        name, _, values = param.partition("=")
+        grid[name] = [parse_value(value) for value in values.split(",")]
+    return grid
+
+parser = argparse.ArgumentParser(description="Mesoscopic queue model: calibrate it against the microscopic model, or screen many configurations with it")
+subparsers = parser.add_subparsers(dest="command", required=True)
+
+calibrate_parser = subparsers.add_parser("calibrate", help="fit the QUEUE_MODEL_* values to event engine runs and validate them on held-out points")
+calibrate_parser.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2,...",
+                              help="SimulationConfig value to vary between the reference points (repeatable; default "
+                                   "TRAFFIC_INTENSITIES.medium=0.015,0.03,0.045 and MIN_GREEN_DURATION=3,5,7)")
+calibrate_parser.add_argument("--seeds", default="0-3", help="seeds of the microscopic reference runs: 0-9 or 1,5,7")
+calibrate_parser.add_argument("--headways", type=parse_values, default=[0.0, 0.5, 1.0, 1.5], help="QUEUE_MODEL_SATURATION_HEADWAY candidates")
+calibrate_parser.add_argument("--spacings", type=parse_values, default=[7.5, 8.5, 9.5, 10.5], help="QUEUE_MODEL_JAM_SPACING_METERS candidates")
+calibrate_parser.add_argument("--replications", type=int, default=20, help="queue model instances per point")
+calibrate_parser.add_argument("--workers", type=int, default=None, help="worker processes for the reference runs (default: all cores)")
+calibrate_parser.add_argument("--cache", default=None, metavar="DIR", help="reuse reference runs from (and add new ones to) the result cache in DIR")
+
+screen_parser = subparsers.add_parser("screen", help="rank every combination of the --param values with the queue model")
+screen_parser.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2,...",
+                           help="SimulationConfig value to screen, e.g. MIN_GREEN_DURATION=2,3,4,5,6 (repeatable)")
+screen_parser.add_argument("--replications", type=int, default=10, help="queue model instances per configuration")
+screen_parser.add_argument("--objective", choices=CALIBRATION_METRICS, default="average_vehicle_wait_time", help="summary metric to rank by (lowest first)")
+screen_parser.add_argument("--top", type=int, default=10, help="configurations to print (and verify)")
+screen_parser.add_argument("--verify", default=None, metavar="SEEDS", help="rerun the top configurations with the event engine on these seeds (0-9 or 1,5,7)")
+screen_parser.add_argument("--out", default="screen_results.csv", help="table of every screened configuration, best first")
+screen_parser.add_argument("--workers", type=int, default=None, help="worker processes for --verify (default: all cores)")
+screen_parser.add_argument("--cache", default=None, metavar="DIR", help="reuse --verify runs from (and add new ones to) the result cache in DIR")
+
+for subparser in (calibrate_parser, screen_parser):
+    subparser.add_argument("--stop-time", type=float, default=None, help="virtual seconds per run (default SimulationConfig.STOP_VIRTUAL_TIME)")
+    subparser.add_argument("--config", default=None, metavar="PATH", help="JSON or TOML file of SimulationConfig values the parameters override")
+    subparser.add_argument("--seed", type=int, default=0, help="seed of the queue model runs")
+args = parser.parse_args()
+
+config = SimulationConfig.load(args.config) if args.config is not None else SimulationConfig()
+grid = parse_grid(args.param)
+
+if args.command == "calibrate":
+    grid = grid or {"TRAFFIC_INTENSITIES.medium": [0.015, 0.03, 0.045], "MIN_GREEN_DURATION": [3.0, 5.0, 7.0]}
+    calibration = QueueModelCalibration(grid, parse_seeds(args.seeds), args.stop_time, args.workers, args.cache, config, args.replications)
+    start_time = time.perf_counter()
+    calibration.run_reference()
+    print(f"Microscopic reference: {len(calibration.points)} points x {len(calibration.seeds)} seeds in {time.perf_counter() - start_time:.1f} s")
+    start_time = time.perf_counter()
+    result = calibration.calibrate(args.headways, args.spacings)
+    print(f"Calibrated {len(result['errors'])} parameter pairs on {len(calibration.calibration_points)} points in {time.perf_counter() - start_time:.1f} s")
+    headway = result["QUEUE_MODEL_SATURATION_HEADWAY"]
+    spacing = result["QUEUE_MODEL_JAM_SPACING_METERS"]
+    print(f"Best fit (mean squared relative error {result['errors'][(headway, spacing)]:.4f}):")
+    print(f"  QUEUE_MODEL_SATURATION_HEADWAY = {headway}")
+    print(f"  QUEUE_MODEL_JAM_SPACING_METERS = {spacing}")
+    report = calibration.validate(headway, spacing)
+    print(f"Validation on {len(calibration.validation_points)} held-out points:")
+    for name, values in report.items():
+        print(f"  {name}: mean relative error {values['mean_relative_error']:.1%}, rank correlation {values['rank_correlation']:.3f}")
+else:
+    start_time = time.perf_counter()
+    rows = screen_configurations(grid, args.replications, args.stop_time, config, args.seed)
+    rows.sort(key=lambda row: row[args.objective])
+    print(f"Screened {len(rows)} configurations x {args.replications} replications in {time.perf_counter() - start_time:.1f} s")
+    with open(args.out, "w", newline="") as results_file:
+        writer = csv.DictWriter(results_file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    top = rows[:args.top]
+    verified = None
+    if args.verify is not None:
+        points = [{name: row[name] for name in grid} for row in top]
+        point_rows = run_reference_points(points, parse_seeds(args.verify), "event", args.stop_time, args.workers, args.cache, config)
+        verified = [np.mean([row[args.objective] for row in runs]) for runs in point_rows]
+    for rank, row in enumerate(top):
+        parameters = ", ".join(f"{name}={row[name]}" for name in grid)
+        line = f"{rank + 1}. {parameters}: {args.objective} {row[args.objective]:.3f}"
+        if verified is not None:
+            line += f" (event engine {verified[rank]:.3f})"
+        print(line)
+    print(f"Results written to {args.out}")
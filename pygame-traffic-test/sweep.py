@@ -0,0 +1,69 @@
+from Experiments.ParameterSweep import ParameterSweep
+from Experiments.SweepQueue import SweepQueue, run_queue_workers
+from SimulationToolbox.SimulationConfig import SimulationConfig
+
+import argparse
+import ast
+
+def parse_value(text: str):
+    """Python literal if possible (numbers, True/False, ...), else the text itself"""
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+def parse_seeds(text: str) -> list:
+    """"0-9" (inclusive range) or a comma separated list such as "1,5,7" """
+    if "-" in text:
+        first, last = text.split("-", 1)
+        return list(range(int(first), int(last) + 1))
+    return [int(seed) for seed in text.split(",")]
+
+parser = argparse.ArgumentParser(description="Headless parameter sweep over SimulationConfig values")
+parser.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2,...",
+                    help="SimulationConfig value to sweep, e.g. MIN_GREEN_DURATION=3,5,7 or TRAFFIC_INTENSITIES.medium=0.015,0.03 (repeatable)")
+parser.add_argument("--seeds", default="0", help="seeds to run every combination with: 0-9 or 1,5,7")
+parser.add_argument("--engine", choices=["step", "event"], default="step", help="simulation engine of each run")
+parser.add_argument("--stop-time", type=float, default=None, help="virtual seconds per run (default SimulationConfig.STOP_VIRTUAL_TIME)")
+parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+parser.add_argument("--out", default="sweep_results.csv", help="results table, written as runs finish")
+parser.add_argument("--config", default=None, metavar="PATH", help="JSON or TOML file of SimulationConfig values the swept parameters override")
+parser.add_argument("--from-snapshot", default=None, metavar="PATH",
+                    help="fork every run from this scenario snapshot (e.g. a warmed-up main.py --checkpoint) instead of starting empty; step engine only")
+parser.add_argument("--cache", default=None, metavar="DIR", help="reuse results of identical runs from (and add new ones to) the result cache in DIR")
+parser.add_argument("--queue", default=None, metavar="PATH",
+                    help="use a resumable SQLite work queue instead of running the sweep directly: the --param grid is "
+                         "submitted to it, --work runs workers on it and the finished results are exported to --out")
+parser.add_argument("--work", action="store_true", help="with --queue: run --workers local workers until no point is left to claim")
+args = parser.parse_args()
+
+grid = {}
+for param in args.param:
+    name, _, values = param.partition("=")
+    grid[name] = [parse_value(value) for value in values.split(",")]
+config = SimulationConfig.load(args.config) if args.config is not None else None
+
+if args.queue is not None:
+    # Work-queue mode: any number of these processes, on any hosts sharing the queue file, can run at once
+    queue = SweepQueue(args.queue)
+    if grid:
+        added = queue.submit(grid, parse_seeds(args.seeds), args.engine, args.stop_time)
+        print(f"Submitted {added} new sweep points to {args.queue}")
+    if args.work:
+        completed = run_queue_workers(args.queue, args.workers, cache_dir=args.cache, config=config, snapshot_path=args.from_snapshot)
+        print(f"Completed {completed} sweep points")
+    status = queue.get_status_counts()
+    print(f"Queue status: {status['done']} done, {status['pending']} pending, {status['leased']} leased, {status['failed']} failed")
+    exported = queue.export_csv(args.out)
+    print(f"Results of {exported} finished points written to {args.out}")
+    queue.close()
+else:
+    sweep = ParameterSweep(grid, parse_seeds(args.seeds), args.engine, args.stop_time, args.workers, args.cache, config, args.from_snapshot)
+
+    def print_progress(row: dict, finished: int, total: int) -> None:
+        parameters = ", ".join(f"{name}={row[name]}" for name in grid)
+        print(f"[{finished}/{total}] {parameters} seed={row['seed']}: average waiting vehicles {row['average_waiting_vehicles']:.2f}, "
+              f"average vehicle waiting time {row['average_vehicle_wait_time']:.2f} virtual seconds")
+
+    sweep.run(args.out, print_progress)
+    print(f"Results written to {args.out}")